@@ -1,6 +1,31 @@
-from simulation.simulator import Simulator
+import sys
+import time
+from utilities.argsReader import ArgsReader
 
 
 if __name__ == "__main__":
-    simulator = Simulator()
+    start_time = time.perf_counter()
+
+    if len(sys.argv) > 1 and sys.argv[1] == "sweep":
+        from simulation.parameterSweep import ParameterSweep
+        ParameterSweep(ArgsReader.read_sweep_args(sys.argv[2:])).run()
+        sys.exit()
+
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark":
+        from simulation.benchmarkSuite import BenchmarkSuite
+        sys.exit(BenchmarkSuite.main(ArgsReader.read_benchmark_args(sys.argv[2:])))
+
+    if len(sys.argv) > 1 and sys.argv[1] == "plan":
+        from simulation.memoryPlanner import MemoryPlanner
+        sys.exit(MemoryPlanner.main(ArgsReader.read_plan_args(sys.argv[2:])))
+
+    simulation_args = ArgsReader.read_args()
+
+    if simulation_args.draw_on_screen:
+        from simulation.simulator import Simulator
+        simulator = Simulator(simulation_args)
+    else:
+        from simulation.headlessSimulator import HeadlessSimulator
+        simulator = HeadlessSimulator(simulation_args, start_time)
+
     simulator.run()
@@ -1,16 +1,19 @@
 from typing import Tuple
+import numpy as np
 from .fluidDirectionProvider import FluidDirectionProvider
-from .boltzmannFluidUtils import (
-    BoltzmannFluidState,
-    FluidDensityState,
-    FluidVelocityState
-)
-from .boundaryConditions import NoSlipBoundaryConditions, ConstantVelocityBoundaryConditions
-from .equilibriumFluidSolver import EquilibriumFluidState, EquilibriumWeights, RelaxedBoltzmannFluidState
+from .latticeStencil import LatticeStencil, default_stencil_name, get_stencil
+from .boltzmannFluidUtils import BoltzmannFluidState, MacroscopicFields
+from .boundaryConditions import BoundaryConditions, NoSlipBoundaryConditions, ConstantVelocityBoundaryConditions
+from .computeBackend import create_backend
+from .sharedLattice import SharedLatticeHandle
+from .equilibriumFluidSolver import EquilibriumWeights
+from .phaseTimer import PhaseTimer
+from .sparseLattice import SparseLatticeKernel
 from utilities.DTO.boundaryConditionDTO import (
     BoundaryConditionNoSlipDelta,
     BoundaryConditionConstantVelocityDelta,
-    BoundaryConditionInitialDelta
+    BoundaryConditionInitialDelta,
+    BoundaryCube
 )
 from utilities.DTO.simulationParameters import SimulationParameters
 
@@ -18,46 +21,349 @@ from utilities.DTO.simulationParameters import SimulationParameters
 class BoltzmannFluid:
     '''
     One BoltzmannFluid object represents one frame in the fluid simulation.
+
+    The kernel selects how the collision and streaming are computed:
+    - "reference": every operator builds its own state object,
+    - "fused": moments, relaxation and streaming run in place on two preallocated ping-pong buffers,
+    - "sparse": only the cells outside of no-slip boundaries are stored and stepped, using a fluid-cell index list
+      and a streaming table built from the boundary masks on the first step.
+
+    With direction_major the populations are stored as (Q, w_x, w_y, w_z), so that streaming and the boundary
+    handlers work on contiguous planes.
+
+    The stencil selects the velocity set, one of latticeStencil.STENCILS, given as an argument or by the stencil of
+    the simulation parameters. By default a lattice one cell deep uses D2Q9, which stores 9 populations per cell
+    instead of 19 and steps the same flow as D3Q19 with z-symmetric populations, see D2Q9DirectionProvider, and every
+    other lattice uses D3Q19. D3Q15 stores a fifth fewer populations than D3Q19 and D3Q27 is the most isotropic.
+    Initial states are given as D3Q19 populations and mapped onto the stencil, see LatticeStencil.from_d3q19.
+
+    The backend computes the dense steps, see computeBackend. The numba backend always fuses the collision and
+    streaming, and the sparse kernel is only available with the numpy backend.
+
+    The density and velocity are cached as read-only MacroscopicFields until the next step or boundary update.
+    Code that writes the populations returned by boltzmann_state directly has to call invalidate_observables.
+
+    With a PhaseTimer set by profile_phases every step times its phases, see phaseTimer. Without one the steps are not
+    instrumented at all.
     '''
-    def __init__(self, lattice_dimensions: Tuple[int, int, int], simulation_params: SimulationParameters):
-        self._directions = FluidDirectionProvider.get_all_directions()
+    KERNELS = ("reference", "fused", "sparse")
+
+    def __init__(self, lattice_dimensions: Tuple[int, int, int], simulation_params: SimulationParameters,
+                 kernel: str = "reference", direction_major: bool = False, backend: str = "numpy",
+                 stencil: str = None):
+        if kernel not in BoltzmannFluid.KERNELS:
+            raise ValueError(f"Invalid kernel: {kernel}. Available kernels: {', '.join(BoltzmannFluid.KERNELS)}.")
+
+        stencil = stencil if stencil is not None else simulation_params.stencil
+        stencil = get_stencil(stencil if stencil is not None else default_stencil_name(lattice_dimensions))
+        if stencil.is_planar and lattice_dimensions[2] != 1:
+            raise ValueError(f"The {stencil.name} stencil needs a depth of 1, but the depth is "
+                             f"{lattice_dimensions[2]}.")
+
+        dtype = simulation_params.dtype
+
+        self._stencil = stencil
+        self._directions = stencil.directions.astype(dtype, copy=False)
         self._normalized_directions = FluidDirectionProvider.normalize_directions(self._directions)
-        self._fluid_state = BoltzmannFluidState(lattice_dimensions, self._directions) # Verify this is correct @Rafał
-        self._no_slip_boundary_conditions = NoSlipBoundaryConditions(lattice_dimensions, self._directions)
+        self._fluid_state = BoltzmannFluidState(lattice_dimensions, self._directions,
+                                                direction_major, dtype) # Verify this is correct @Rafał
+        self._no_slip_boundary_conditions = NoSlipBoundaryConditions(lattice_dimensions, self._directions, dtype,
+                                                                     stencil)
         self._constant_velocity_boundary_conditions = ConstantVelocityBoundaryConditions(lattice_dimensions,
-                                                                                         self._directions)
-        self._equilibrium_weights = EquilibriumWeights()
+                                                                                         self._directions,
+                                                                                         dtype,
+                                                                                         stencil)
+        self._equilibrium_weights = EquilibriumWeights(dtype, stencil.name)
         self._simulation_params = simulation_params
+        self._lattice_dimensions = tuple(lattice_dimensions)
+        self.steps_count = 0
+        self._direction_major = direction_major
+        self._kernel = kernel
+        self._sparse_kernel = None
+        self._macroscopic_fields: MacroscopicFields = None
+        self._macroscopic_slices: dict[int, MacroscopicFields] = {}
+        self._phase_timer: PhaseTimer = None
+        self._backend = create_backend(backend, lattice_dimensions, self._directions, self._equilibrium_weights,
+                                       simulation_params, direction_major, fused=kernel == "fused")
+
+        if kernel == "sparse" and self._backend.NAME != "numpy":
+            raise ValueError(f"The sparse kernel is not available with the {self._backend.NAME} backend.")
+
+    def _release_sparse_kernel(self):
+        if self._sparse_kernel is None:
+            return
+
+        self._fluid_state = self._sparse_kernel.to_boltzmann_state()
+        self._sparse_kernel = None
+
+    def update_no_slip_boundary(self, boundary_condition_delta: BoundaryConditionNoSlipDelta) -> int:
+        self._release_sparse_kernel()
+        self.invalidate_observables()
+        return self._no_slip_boundary_conditions.update_boundary(boundary_condition_delta)
+
+    def update_constant_velocity_boundary(self,
+                                          boundary_condition_delta: BoundaryConditionConstantVelocityDelta) -> int:
+        self._release_sparse_kernel()
+        self.invalidate_observables()
+        return self._constant_velocity_boundary_conditions.update_boundary(boundary_condition_delta)
 
-    def update_no_slip_boundary(self, boundary_condition_delta: BoundaryConditionNoSlipDelta):
-        self._no_slip_boundary_conditions.update_boundary(boundary_condition_delta)
+    def _edit_boundary(self, boundary_conditions: BoundaryConditions, edit, *edit_args):
+        '''
+        Applies an edit of the placed boundary cubes during a run. Only the changed regions are rasterised, and the
+        fluid is only removed from the cells of those regions that are still covered, as prepare_boundary_conditions
+        does for the whole lattice. Cells that a wall leaves are empty and fill from their neighbours. The sparse
+        kernel rebuilds its indices on the next step.
+        '''
+        self._release_sparse_kernel()
+        self.invalidate_observables()
 
-    def update_constant_velocity_boundary(self, boundary_condition_delta: BoundaryConditionConstantVelocityDelta):
-        self._constant_velocity_boundary_conditions.update_boundary(boundary_condition_delta)
+        for region in edit(*edit_args):
+            boundary_conditions.remove_fluid_from_region(self._fluid_state, region)
+
+    def remove_no_slip_boundary(self, boundary_id: int):
+        self._edit_boundary(self._no_slip_boundary_conditions, self._no_slip_boundary_conditions.remove_boundary,
+                            boundary_id)
+
+    def move_no_slip_boundary(self, boundary_id: int, boundary_cube: BoundaryCube):
+        self._edit_boundary(self._no_slip_boundary_conditions, self._no_slip_boundary_conditions.move_boundary,
+                            boundary_id, boundary_cube)
+
+    def remove_constant_velocity_boundary(self, boundary_id: int):
+        self._edit_boundary(self._constant_velocity_boundary_conditions,
+                            self._constant_velocity_boundary_conditions.remove_boundary, boundary_id)
+
+    def move_constant_velocity_boundary(self, boundary_id: int, boundary_cube: BoundaryCube):
+        self._edit_boundary(self._constant_velocity_boundary_conditions,
+                            self._constant_velocity_boundary_conditions.move_boundary, boundary_id, boundary_cube)
+
+    def set_no_slip_cells(self, affected_cells: np.ndarray[bool]):
+        '''
+        Replaces the no-slip geometry with a mask of solid cells, e.g. one loaded by voxelGeometry.load_geometry.
+        Cubes placed afterwards are added on top of it.
+        '''
+        if affected_cells.shape != self._lattice_dimensions:
+            raise ValueError(f"The no-slip cells of shape {affected_cells.shape} do not match the lattice "
+                             f"{self._lattice_dimensions}.")
+
+        self._release_sparse_kernel()
+        self.invalidate_observables()
+        self._no_slip_boundary_conditions.set_cells(affected_cells)
 
     def update_initial_boundary(self, boundary_condition_delta: BoundaryConditionInitialDelta):
-        self._fluid_state.update_fluid_initial_state(boundary_condition_delta)
+        self._release_sparse_kernel()
+        self.invalidate_observables()
+        self._fluid_state.update_fluid_initial_state(boundary_condition_delta, self._stencil)
+
+    @property
+    def stencil(self) -> LatticeStencil:
+        return self._stencil
+
+    @property
+    def simulation_params(self) -> SimulationParameters:
+        return self._simulation_params
+
+    @property
+    def kernel(self) -> str:
+        return self._kernel
+
+    @property
+    def direction_major(self) -> bool:
+        return self._direction_major
+
+    @property
+    def backend_name(self) -> str:
+        return self._backend.NAME
+
+    @property
+    def directions(self) -> np.ndarray[np.ndarray[np.float64]]:
+        return self._directions
+
+    @property
+    def equilibrium_weights(self) -> EquilibriumWeights:
+        return self._equilibrium_weights
+
+    @property
+    def no_slip_cells(self) -> np.ndarray[bool]:
+        return self._no_slip_boundary_conditions.affected_cells
+
+    def attach_populations(self, populations: np.ndarray, copy: bool = False) -> None:
+        '''
+        Makes the fluid step in the given array from now on, e.g. a view of the stacked populations of a
+        BoltzmannFluidEnsemble. With copy the current populations are copied into it first.
+        '''
+        if self._sparse_kernel is not None or self._kernel == "sparse":
+            raise ValueError("The populations of the sparse kernel can not be attached to an array.")
+        if populations.shape != self._fluid_state.fluid_state.shape:
+            raise ValueError(f"Invalid populations shape: {populations.shape}. It must be "
+                             f"{self._fluid_state.fluid_state.shape}.")
+
+        if copy:
+            np.copyto(populations, self._fluid_state.fluid_state)
+        self._fluid_state.fluid_state = populations
+        self.invalidate_observables()
+
+    def boltzmann_state(self) -> BoltzmannFluidState:
+        '''
+        Returns the dense fluid state. With the sparse kernel it is materialised from the active cells.
+        '''
+        if self._sparse_kernel is not None:
+            return self._sparse_kernel.to_boltzmann_state()
+
+        return self._fluid_state
+
+    def invalidate_observables(self):
+        self._macroscopic_fields = None
+        self._macroscopic_slices = {}
+
+    def macroscopic_fields(self) -> MacroscopicFields:
+        '''
+        Returns the density and velocity of the whole lattice, computed by the backend when they are stale.
+        '''
+        if self._macroscopic_fields is None:
+            fluid_state = self.boltzmann_state()
+            density = self._backend.density(fluid_state)
+            self._macroscopic_fields = MacroscopicFields(density, self._backend.velocity(fluid_state, density))
+
+        return self._macroscopic_fields
+
+    def macroscopic_slice(self, z: int) -> MacroscopicFields:
+        '''
+        Returns the density and velocity of the plane at z. Unless the fields of the whole lattice are cached, only the
+        populations of that plane are read.
+        '''
+        depth = self._lattice_dimensions[2]
+        if not 0 <= z < depth:
+            raise ValueError(f"Invalid z: {z}. It must be between 0 and {depth - 1}.")
+
+        if self._macroscopic_fields is not None:
+            return self._macroscopic_fields.z_slice(z)
+
+        if z not in self._macroscopic_slices:
+            slice_state = self._fluid_state.z_slice(z) if self._sparse_kernel is None \
+                else self._sparse_kernel.z_slice(z)
+            self._macroscopic_slices[z] = MacroscopicFields.from_boltzmann_state(slice_state,
+                                                                                 self._simulation_params).z_slice(0)
+
+        return self._macroscopic_slices[z]
+
+    def total_mass(self) -> float:
+        if self._sparse_kernel is not None:
+            return self._sparse_kernel.total_mass()
+
+        return self._fluid_state.total_mass()
+
+    def max_population(self) -> float:
+        if self._sparse_kernel is not None:
+            return self._sparse_kernel.max_population()
+
+        return float(self._fluid_state.fluid_state.max())
+
+    def share_state(self, path: str = None) -> SharedLatticeHandle:
+        '''
+        Moves the populations to a shared memory block, or to a memory-mapped file when path is given, and publishes
+        them after every step. Other processes attach to the returned handle with SharedLatticeBuffer.attach.
+        '''
+        if self._kernel == "sparse":
+            raise ValueError("The sparse kernel can not share its state.")
+
+        if self._fluid_state.shared_buffer is None:
+            shared_fluid_state = BoltzmannFluidState.allocate_shared(self._fluid_state.lattice_shape(),
+                                                                     self._directions, self._direction_major,
+                                                                     self._fluid_state.fluid_state.dtype, path)
+            shared_fluid_state.fluid_state[...] = self._fluid_state.fluid_state
+            self._fluid_state = shared_fluid_state
+            self._backend.use_scratch_state(shared_fluid_state.shared_buffer.slot(1))
+            self._fluid_state.publish()
+
+        return self._fluid_state.shared_handle()
+
+    def release_shared_state(self):
+        '''
+        Moves the populations back to private memory and removes the shared memory block.
+        '''
+        shared_buffer = self._fluid_state.shared_buffer
+        if shared_buffer is None:
+            return
+
+        self._fluid_state = BoltzmannFluidState.from_fluid_state(self._fluid_state.fluid_state.copy(),
+                                                                 self._directions, self._direction_major)
+        self._backend.use_scratch_state(np.zeros_like(self._fluid_state.fluid_state))
+        shared_buffer.close()
+        shared_buffer.unlink()
 
     def prepare_boundary_conditions(self):
+        self._release_sparse_kernel()
+        self.invalidate_observables()
         self._no_slip_boundary_conditions.remove_fluid_from_boundary(self._fluid_state)
         self._constant_velocity_boundary_conditions.remove_fluid_from_boundary(self._fluid_state)
 
+    def sub_domain(self, x_indices: np.ndarray[np.int64]) -> 'BoltzmannFluid':
+        '''
+        Returns a new fluid built from the given x planes of this one, with the same options. The planes keep their
+        fluid state and boundary conditions, so boundary cubes that cross the edge of the sub-domain or wrap around
+        the periodic x edge are cut consistently.
+        '''
+        self._release_sparse_kernel()
+        x_axis = 1 if self._direction_major else 0
+        lattice_dimensions = (len(x_indices),) + self._fluid_state.lattice_shape()[1:]
+
+        fluid = BoltzmannFluid(lattice_dimensions, self._simulation_params, self._kernel, self._direction_major,
+                               self._backend.NAME, self._stencil.name)
+        fluid._fluid_state = BoltzmannFluidState.from_fluid_state(
+            np.ascontiguousarray(np.take(self._fluid_state.fluid_state, x_indices, axis=x_axis)), self._directions,
+            self._direction_major)
+        fluid._no_slip_boundary_conditions.set_cells(self._no_slip_boundary_conditions.affected_cells[x_indices])
+
+        constant_velocity_boundary_conditions = self._constant_velocity_boundary_conditions
+        fluid._constant_velocity_boundary_conditions.set_cells(
+            constant_velocity_boundary_conditions.affected_cells[x_indices],
+            constant_velocity_boundary_conditions.velocity[x_indices],
+            constant_velocity_boundary_conditions.normal_vectors[x_indices])
+
+        return fluid
+
+    def _sparse_simulation_step(self):
+        if self._sparse_kernel is None:
+            self._sparse_kernel = SparseLatticeKernel(self._fluid_state, self._no_slip_boundary_conditions,
+                                                      self._constant_velocity_boundary_conditions,
+                                                      self._equilibrium_weights, self._simulation_params)
+            self._fluid_state = None
+
+        if self._phase_timer is not None:
+            self._sparse_kernel.profiled_simulation_step(self._phase_timer)
+        else:
+            self._sparse_kernel.simulation_step()
+
+    def profile_phases(self, phase_timer: PhaseTimer = None):
+        self._phase_timer = phase_timer
+
+    def _profiled_simulation_step(self):
+        self._backend.profiled_collide_and_stream(self._fluid_state, self._phase_timer)
+        self._backend.profiled_apply_boundary_conditions(self._no_slip_boundary_conditions,
+                                                         self._constant_velocity_boundary_conditions,
+                                                         self._fluid_state, self._phase_timer)
+
     def simulation_step(self):
-        density_state = FluidDensityState.from_boltzmann_state(self._fluid_state)
-        velocity_state = FluidVelocityState.from_boltzmann_state(self._fluid_state, density_state,
-                                                                 self._simulation_params)
-        equilibrium_state = EquilibriumFluidState.from_velocities_and_densities(density_state, velocity_state,
-                                                                                self._equilibrium_weights,
-                                                                                self._directions,
-                                                                                self._simulation_params)
-        relaxed_state = RelaxedBoltzmannFluidState(self._fluid_state, equilibrium_state, self._simulation_params)
-        self._fluid_state = relaxed_state.to_next_boltzmann_state()
-
-        print("Suma", self._fluid_state.fluid_state.sum())
-        print("Max", self._fluid_state.fluid_state.max())
-
-        self._no_slip_boundary_conditions.process_fluid_state(self._fluid_state)
-        self._constant_velocity_boundary_conditions.process_fluid_state(self._fluid_state)
-        self._no_slip_boundary_conditions.remove_fluid_from_boundary(self._fluid_state)
-        self._constant_velocity_boundary_conditions.remove_fluid_from_boundary(self._fluid_state)
+        self.invalidate_observables()
+        self.steps_count += 1
+
+        if self._kernel == "sparse":
+            self._sparse_simulation_step()
+            return
+
+        if self._phase_timer is not None:
+            self._profiled_simulation_step()
+        else:
+            self.collide_and_stream()
+            self.apply_boundary_conditions()
+        self._fluid_state.publish()
+
+    def collide_and_stream(self):
+        self.invalidate_observables()
+        self._backend.collide_and_stream(self._fluid_state)
+
+    def apply_boundary_conditions(self):
+        self.invalidate_observables()
+        self._backend.apply_boundary_conditions(self._no_slip_boundary_conditions,
+                                                self._constant_velocity_boundary_conditions, self._fluid_state)
 
@@ -0,0 +1,75 @@
+import numpy as np
+from .boltzmannFluid import BoltzmannFluid
+from .fusedCollideStream import FusedCollisionKernel
+
+
+class BoltzmannFluidEnsemble:
+    '''
+    Steps several fluids of the same lattice shape together. Their populations are stacked into one array of shape
+    (members, w_x, w_y, w_z, Q), so that the collision runs as one batched pass over all the cells and the streaming
+    copies the same blocks for every member at once. The fluids may differ in viscosity and in their boundary
+    conditions, which are applied to every member separately.
+
+    The member fluids keep working on views of the stacked array, so their state, observables and checkpoints stay
+    available between steps. They have to be cell-major fluids with the numpy backend and a dense kernel, and share
+    the stencil, the precision and the speed of sound.
+    '''
+    def __init__(self, fluids: list[BoltzmannFluid]) -> None:
+        if not fluids:
+            raise ValueError("An ensemble needs at least one fluid.")
+
+        first_fluid = fluids[0]
+        shape = first_fluid.boltzmann_state().lattice_shape()
+        simulation_params = first_fluid.simulation_params
+
+        for fluid in fluids:
+            if fluid.kernel == "sparse" or fluid.direction_major or fluid.backend_name != "numpy":
+                raise ValueError("Only cell-major fluids with a dense kernel and the numpy backend can be batched.")
+            if fluid.boltzmann_state().lattice_shape() != shape:
+                raise ValueError(f"The lattice shapes of the ensemble differ: {shape} and "
+                                 f"{fluid.boltzmann_state().lattice_shape()}.")
+            if fluid.simulation_params.dtype != simulation_params.dtype \
+                    or not np.isclose(fluid.simulation_params.speed_of_sound, simulation_params.speed_of_sound):
+                raise ValueError("The fluids of an ensemble must share the precision and the speed of sound.")
+            if fluid.stencil is not first_fluid.stencil:
+                raise ValueError(f"The stencils of the ensemble differ: {first_fluid.stencil.name} and "
+                                 f"{fluid.stencil.name}.")
+
+        directions = first_fluid.directions
+        cells_count = int(np.prod(shape))
+        relaxation_times = np.repeat([fluid.simulation_params.relaxation_time for fluid in fluids], cells_count)
+
+        self.fluids = fluids
+        self._fluid_state_matrix = np.stack([fluid.boltzmann_state().fluid_state for fluid in fluids])
+        self._scratch_state = np.zeros_like(self._fluid_state_matrix)
+        self._streaming_plan = [((slice(None),) + destination_index, (slice(None),) + source_index)
+                                for destination_index, source_index
+                                in first_fluid.stencil.streaming_plan(shape, False)]
+        self._collision_kernel = FusedCollisionKernel(len(fluids) * cells_count, directions,
+                                                      first_fluid.equilibrium_weights, simulation_params,
+                                                      relaxation_times=relaxation_times)
+        self._attach_fluids()
+
+    def _attach_fluids(self) -> None:
+        for fluid, member_state in zip(self.fluids, self._fluid_state_matrix):
+            fluid.attach_populations(member_state)
+
+    def simulation_step(self) -> None:
+        populations_count = self._fluid_state_matrix.shape[-1]
+        self._collision_kernel.collide(self._fluid_state_matrix.reshape(-1, populations_count),
+                                       self._scratch_state.reshape(-1, populations_count))
+
+        for destination_index, source_index in self._streaming_plan:
+            self._scratch_state[destination_index] = self._fluid_state_matrix[source_index]
+        self._fluid_state_matrix, self._scratch_state = self._scratch_state, self._fluid_state_matrix
+        self._attach_fluids()
+
+        for fluid, member_state in zip(self.fluids, self._fluid_state_matrix):
+            fluid.apply_boundary_conditions()
+            fluid.steps_count += 1
+            if fluid.boltzmann_state().fluid_state is not member_state:
+                fluid.attach_populations(member_state, copy=True)
+
+    def run(self, number_of_steps: int) -> None:
+        for _ in range(number_of_steps):
+            self.simulation_step()
@@ -2,23 +2,142 @@ import numpy as np
 from utilities.DTO.boundaryConditionDTO import BoundaryConditionInitialDelta
 from utilities.DTO.simulationParameters import SimulationParameters
 from einsumt import einsumt as einsum
+from .latticeStencil import LatticeStencil
+from .sharedLattice import SharedLatticeBuffer, SharedLatticeHandle
 
 
 class BoltzmannFluidState:
-    def __init__(self, shape, allowed_velocities: np.ndarray[np.ndarray[np.int32]]):
+    '''
+    Holds the populations of every cell of the lattice.
+
+    By default the populations are stored cell-major, with shape (w_x, w_y, w_z, Q), Q being the number of
+    directions of the stencil. In the direction-major layout
+    they are stored with shape (Q, w_x, w_y, w_z), so that every direction is one contiguous plane.
+
+    The populations can also live in a SharedLatticeBuffer, see allocate_shared. Other processes then attach to it
+    with from_shared_buffer and get read-only views, without copying the lattice.
+    '''
+    def __init__(self, shape, allowed_velocities: np.ndarray[np.ndarray[np.int32]], direction_major: bool = False,
+                 dtype: np.dtype = np.float64):
         # Make sure that the allowed velocities have correct lengths (c e)
-        self.fluid_state: np.array = np.zeros(shape + (19,))
+        populations_count = len(allowed_velocities)
+        self.fluid_state: np.array = np.zeros((populations_count,) + shape, dtype=dtype) if direction_major \
+            else np.zeros(shape + (populations_count,), dtype=dtype)
         self.allowed_velocities = allowed_velocities
+        self.direction_major = direction_major
+        self.shared_buffer: SharedLatticeBuffer = None
+
+    @staticmethod
+    def allocate_shared(shape, allowed_velocities: np.ndarray[np.ndarray[np.int32]], direction_major: bool = False,
+                        dtype: np.dtype = np.float64, path: str = None) -> 'BoltzmannFluidState':
+        '''
+        Allocates the populations in a named shared memory block, or in a memory-mapped file when path is given.
+        '''
+        populations_count = len(allowed_velocities)
+        state_shape = (populations_count,) + shape if direction_major else shape + (populations_count,)
+        shared_buffer = SharedLatticeBuffer.create(state_shape, dtype, direction_major, path)
+
+        fluid_state = BoltzmannFluidState.from_fluid_state(shared_buffer.current_state(), allowed_velocities,
+                                                           direction_major)
+        fluid_state.shared_buffer = shared_buffer
+
+        return fluid_state
+
+    @staticmethod
+    def from_shared_buffer(shared_buffer: SharedLatticeBuffer,
+                           allowed_velocities: np.ndarray[np.ndarray[np.int32]]) -> 'BoltzmannFluidState':
+        '''
+        Returns a state that views the latest published populations of a shared buffer, without copying them.
+        '''
+        return BoltzmannFluidState.from_fluid_state(shared_buffer.current_state(), allowed_velocities,
+                                                    shared_buffer.handle.direction_major)
+
+    def shared_handle(self) -> SharedLatticeHandle:
+        if self.shared_buffer is None:
+            raise ValueError("The fluid state is not allocated in shared memory.")
 
-    def update_fluid_initial_state(self, fluid_initial_delta: BoundaryConditionInitialDelta) -> None:
+        return self.shared_buffer.handle
+
+    def publish(self) -> None:
+        '''
+        Makes the current populations visible to the processes attached to the shared buffer. Kernels that write the
+        next state into a new array get it copied to the free slot of the buffer.
+        '''
+        if self.shared_buffer is not None:
+            self.fluid_state = self.shared_buffer.publish(self.fluid_state)
+
+    def populations(self) -> np.ndarray:
+        '''
+        Returns a (Q, w_x, w_y, w_z) view of the populations, independent of the storage layout.
+        '''
+        return self.fluid_state if self.direction_major else np.moveaxis(self.fluid_state, -1, 0)
+
+    def cell_populations(self) -> np.ndarray:
+        '''
+        Returns a (w_x, w_y, w_z, Q) view of the populations, independent of the storage layout.
+        '''
+        return np.moveaxis(self.fluid_state, 0, -1) if self.direction_major else self.fluid_state
+
+    def total_mass(self) -> float:
+        return float(np.sum(self.fluid_state, dtype=np.float64))
+
+    def flat_populations(self) -> np.ndarray:
+        '''
+        Returns a flat view of the populations, so they can be gathered and scattered with population_indices.
+        '''
+        if not self.fluid_state.flags.c_contiguous:
+            self.fluid_state = np.ascontiguousarray(self.fluid_state)
+
+        return self.fluid_state.reshape(-1)
+
+    def population_indices(self, cell_indices: np.ndarray, direction_indices: np.ndarray) -> np.ndarray:
+        '''
+        Maps flat cell indices and direction indices to indices into flat_populations, for the storage layout.
+        '''
+        if self.direction_major:
+            return direction_indices * int(np.prod(self.lattice_shape())) + cell_indices
+
+        return cell_indices * len(self.allowed_velocities) + direction_indices
+
+    def lattice_shape(self) -> tuple[int, int, int]:
+        return self.fluid_state.shape[1:] if self.direction_major else self.fluid_state.shape[:-1]
+
+    def update_fluid_initial_state(self, fluid_initial_delta: BoundaryConditionInitialDelta,
+                                   stencil: LatticeStencil = None) -> None:
+        '''
+        Initial states are given as D3Q19 populations, on another stencil they are mapped onto its directions, see
+        LatticeStencil.from_d3q19.
+        '''
         x1, y1, z1 = fluid_initial_delta.boundary_cube.start_position.to_tuple()
         x2, y2, z2 = fluid_initial_delta.boundary_cube.end_position.to_tuple()
-        self.fluid_state[x1:x2, y1:y2, z1:z2] = fluid_initial_delta.boltzmann_f19.vectors
+        populations = fluid_initial_delta.boltzmann_f19.vectors
+        if stencil is not None:
+            populations = stencil.from_d3q19(populations)
+
+        self.cell_populations()[x1:x2, y1:y2, z1:z2] = populations
+
+    def z_slice(self, z: int) -> 'BoltzmannFluidState':
+        '''
+        Returns a cell-major copy of the populations of the plane at z, with shape (w_x, w_y, 1, Q).
+        '''
+        return BoltzmannFluidState.from_fluid_state(np.array(self.cell_populations()[:, :, z:z + 1]),
+                                                    self.allowed_velocities)
+
+    def to_layout(self, direction_major: bool) -> 'BoltzmannFluidState':
+        if direction_major == self.direction_major:
+            return self
+
+        fluid_state_matrix = self.populations() if direction_major else self.cell_populations()
+
+        return BoltzmannFluidState.from_fluid_state(np.ascontiguousarray(fluid_state_matrix), self.allowed_velocities,
+                                                    direction_major)
 
     @staticmethod
     def from_fluid_state(fluid_state_matrix: np.ndarray[np.ndarray[np.ndarray[np.float64]]],
-                         allowed_velocities: np.ndarray[np.ndarray[np.ndarray[np.int32]]]) -> 'BoltzmannFluidState':
-        fluid_state = BoltzmannFluidState(fluid_state_matrix.shape[:-1], allowed_velocities)
+                         allowed_velocities: np.ndarray[np.ndarray[np.ndarray[np.int32]]],
+                         direction_major: bool = False) -> 'BoltzmannFluidState':
+        shape = fluid_state_matrix.shape[1:] if direction_major else fluid_state_matrix.shape[:-1]
+        fluid_state = BoltzmannFluidState(shape, allowed_velocities, direction_major, fluid_state_matrix.dtype)
         fluid_state.fluid_state = fluid_state_matrix
 
         return fluid_state
@@ -30,6 +149,9 @@ class FluidDensityState:
 
     @staticmethod
     def from_boltzmann_state(boltzmann_state: BoltzmannFluidState) -> 'FluidDensityState':
+        if boltzmann_state.direction_major:
+            return FluidDensityState(np.sum(boltzmann_state.fluid_state, axis=0))
+
         return FluidDensityState(np.sum(boltzmann_state.fluid_state, axis=-1))
 
 
@@ -59,11 +181,44 @@ class FluidVelocityState:
             
             So we for each cell (at position ijk), we multiply the amount of fluid flowing in a direction (v) with the
             direction of the fluid flow (w) in that direction.
+            
+            In the direction-major layout the fluid state is of shape (19, w_x, w_y, w_z), so each velocity component
+            is a weighted sum of contiguous planes and the result is returned as a (w_x, w_y, w_z, 3) view.
         '''
-        velocities = einsum("ijkv,vw->ijkw", fluid_state, allowed_velocities) \
-            * simulation_config.speed_of_sound
+        if boltzmann_state.direction_major:
+            velocities = np.moveaxis(np.tensordot(allowed_velocities.T, fluid_state, axes=1), 0, -1) \
+                * simulation_config.speed_of_sound
+        else:
+            velocities = einsum("ijkv,vw->ijkw", fluid_state, allowed_velocities) \
+                * simulation_config.speed_of_sound
 
         density_matrix_copy = np.copy(density_state.density_state)
         density_matrix_copy[density_matrix_copy == 0] = 1
 
         return FluidVelocityState(velocities / density_matrix_copy[..., np.newaxis])
+
+
+class MacroscopicFields:
+    '''
+    The density and velocity of a fluid state, computed once and read-only, so that they can be handed out to
+    renderers and exporters without copying. The density has the lattice shape and the velocity one more axis of 3.
+    '''
+    def __init__(self, density: np.ndarray, velocity: np.ndarray) -> None:
+        density.flags.writeable = False
+        velocity.flags.writeable = False
+        self.density = density
+        self.velocity = velocity
+
+    @staticmethod
+    def from_boltzmann_state(boltzmann_state: BoltzmannFluidState,
+                             simulation_config: SimulationParameters) -> 'MacroscopicFields':
+        density_state = FluidDensityState.from_boltzmann_state(boltzmann_state)
+        velocity_state = FluidVelocityState.from_boltzmann_state(boltzmann_state, density_state, simulation_config)
+
+        return MacroscopicFields(density_state.density_state, velocity_state.velocity_state)
+
+    def z_slice(self, z: int) -> 'MacroscopicFields':
+        '''
+        Returns views of the plane at z, with shapes (w_x, w_y) and (w_x, w_y, 3).
+        '''
+        return MacroscopicFields(self.density[:, :, z], self.velocity[:, :, z])
@@ -1,102 +1,500 @@
+from dataclasses import replace
 import numpy as np
 from utilities.DTO.boundaryConditionDTO import (
-    BoundaryConditionNoSlipDelta,
+    BoundaryConditionDelta,
     BoundaryConditionConstantVelocityDelta,
     BoundaryCube
 )
 from .boltzmannFluidUtils import BoltzmannFluidState
-from .fluidDirectionProvider import FluidDirectionProvider
-from .equilibriumFluidSolver import FluidDensityState
+from .latticeStencil import LatticeStencil, get_stencil
+
+
+Region = tuple[slice, slice, slice]
+
+
+def _cube_region(boundary_cube: BoundaryCube, shape: tuple[int, int, int]) -> Region | None:
+    '''
+    Returns the slices of the cube clipped to the lattice, or None when nothing of it is inside.
+    '''
+    region = tuple(slice(min(max(start, 0), length), min(max(end, 0), length))
+                   for start, end, length in zip(boundary_cube.start_position.to_tuple(),
+                                                 boundary_cube.end_position.to_tuple(), shape))
+
+    return region if all(axis_slice.start < axis_slice.stop for axis_slice in region) else None
+
+
+def _intersect_regions(region: Region, other_region: Region) -> Region | None:
+    intersection = tuple(slice(max(axis_slice.start, other_slice.start), min(axis_slice.stop, other_slice.stop))
+                         for axis_slice, other_slice in zip(region, other_region))
+
+    return intersection if all(axis_slice.start < axis_slice.stop for axis_slice in intersection) else None
+
+
+def _region_cells(region: Region, shape: tuple[int, int, int], margin: int = 0) -> np.ndarray[np.int64]:
+    '''
+    Returns the flat indices of the cells of the region grown by margin cells along every axis, wrapping around the
+    periodic edges of the lattice.
+    '''
+    axes = [np.unique(np.arange(axis_slice.start - margin, axis_slice.stop + margin) % length)
+            for axis_slice, length in zip(region, shape)]
+
+    return np.ravel_multi_index(np.meshgrid(*axes, indexing="ij"), shape).reshape(-1)
 
 
 class BoundaryConditions:
-    def _update_affected_cells(self, boundary_cube: BoundaryCube) -> None:
-        x1, y1, z1 = boundary_cube.start_position.to_tuple()
-        x2, y2, z2 = boundary_cube.end_position.to_tuple()
+    '''
+    The boundary geometry is a versioned list of placed cubes. Adding, removing or moving a cube rasterises only the
+    region it covers into the affected cells, increments version and records the region, so that the caches derived
+    from the geometry can update the cells of the changed regions instead of the whole lattice.
 
-        self.affected_cells[x1:x2, y1:y2, z1:z2] = True
+    Cells set with set_cells, e.g. from a checkpoint, stay as the background under the placed cubes.
+    '''
+    MAX_CHANGED_REGIONS = 64
 
-    def __init__(self, shape: tuple[int, int, int], allowed_velocities: np.ndarray[np.ndarray[np.int32]]):
+    def __init__(self, shape: tuple[int, int, int], allowed_velocities: np.ndarray[np.ndarray[np.int32]],
+                 dtype: np.dtype = np.float64, stencil: LatticeStencil = None):
         self.affected_cells = np.zeros(shape, dtype=bool)
-        self.allowed_velocities = allowed_velocities
-        self.reverse_direction_indeces = FluidDirectionProvider.get_reverse_directions_indices()
+        self.allowed_velocities = allowed_velocities.astype(dtype, copy=False)
+        self.dtype = dtype
+        stencil = stencil if stencil is not None else get_stencil("D3Q19")
+        self.reverse_direction_indeces = stencil.reverse_indices
+        self.boundary_multiplicities = stencil.boundary_multiplicities.astype(dtype, copy=False)
+        self.version = 0
+        self._shape = tuple(shape)
+        self._boundary_deltas: dict[int, BoundaryConditionDelta] = {}
+        self._next_boundary_id = 0
+        self._background_cells = np.zeros(0, dtype=np.int64)
+        self._changed_regions: list[tuple[int, Region]] = []
+        self._oldest_tracked_version = 0
+
+    def _clear_region(self, region: Region) -> None:
+        self.affected_cells[region] = False
+
+    def _apply_background(self, background_rows: np.ndarray[np.int64], cells: tuple[np.ndarray, ...]) -> None:
+        self.affected_cells[cells] = True
+
+    def _apply_delta(self, boundary_condition_delta: BoundaryConditionDelta, region: Region) -> None:
+        self.affected_cells[region] = True
+
+    def _rasterise(self, region: Region) -> None:
+        '''
+        Recomputes the region from the background and the placed cubes, in the order they were placed.
+        '''
+        self._clear_region(region)
+
+        background_cells = np.unravel_index(self._background_cells, self._shape)
+        in_region = np.ones(len(self._background_cells), dtype=bool)
+        for axis_cells, axis_slice in zip(background_cells, region):
+            in_region &= (axis_slice.start <= axis_cells) & (axis_cells < axis_slice.stop)
+        self._apply_background(np.flatnonzero(in_region), tuple(axis_cells[in_region]
+                                                                 for axis_cells in background_cells))
+
+        for boundary_condition_delta in self._boundary_deltas.values():
+            delta_region = _cube_region(boundary_condition_delta.boundary_cube, self._shape)
+            intersection = _intersect_regions(region, delta_region) if delta_region is not None else None
+            if intersection is not None:
+                self._apply_delta(boundary_condition_delta, intersection)
+
+    def _record_change(self, region: Region) -> None:
+        self.version += 1
+        self._changed_regions.append((self.version, region))
+
+        if len(self._changed_regions) > BoundaryConditions.MAX_CHANGED_REGIONS:
+            self._changed_regions = []
+            self._oldest_tracked_version = self.version
+
+    def changes_since(self, version: int) -> list[Region] | None:
+        '''
+        Returns the regions changed after the given version, or None when they are no longer tracked and a cache of
+        that version has to be rebuilt.
+        '''
+        if version < self._oldest_tracked_version:
+            return None
+
+        return [region for changed_version, region in self._changed_regions if changed_version > version]
+
+    def _forget_changes(self) -> None:
+        self._changed_regions = []
+        self._oldest_tracked_version = self.version
+
+    def add_boundary(self, boundary_condition_delta: BoundaryConditionDelta) -> int:
+        '''
+        Places the cube of the delta over the current geometry and returns its id.
+        '''
+        boundary_id = self._next_boundary_id
+        self._next_boundary_id += 1
+        self._boundary_deltas[boundary_id] = boundary_condition_delta
+
+        region = _cube_region(boundary_condition_delta.boundary_cube, self._shape)
+        if region is not None:
+            self._apply_delta(boundary_condition_delta, region)
+            self._record_change(region)
+
+        return boundary_id
+
+    def update_boundary(self, boundary_condition_delta: BoundaryConditionDelta) -> int:
+        return self.add_boundary(boundary_condition_delta)
+
+    def _boundary_delta(self, boundary_id: int) -> BoundaryConditionDelta:
+        if boundary_id not in self._boundary_deltas:
+            raise ValueError(f"Invalid boundary id: {boundary_id}.")
+
+        return self._boundary_deltas[boundary_id]
+
+    def remove_boundary(self, boundary_id: int) -> list[Region]:
+        '''
+        Removes a placed cube and returns the changed regions.
+        '''
+        region = _cube_region(self._boundary_delta(boundary_id).boundary_cube, self._shape)
+        del self._boundary_deltas[boundary_id]
+        if region is None:
+            return []
+
+        self._rasterise(region)
+        self._record_change(region)
+
+        return [region]
+
+    def move_boundary(self, boundary_id: int, boundary_cube: BoundaryCube) -> list[Region]:
+        '''
+        Moves a placed cube to another cube, keeping its place in the order of the cubes, and returns the changed
+        regions.
+        '''
+        boundary_condition_delta = self._boundary_delta(boundary_id)
+        changed_regions = [region for region in (_cube_region(boundary_condition_delta.boundary_cube, self._shape),
+                                                 _cube_region(boundary_cube, self._shape)) if region is not None]
+        self._boundary_deltas[boundary_id] = replace(boundary_condition_delta, boundary_cube=boundary_cube)
+
+        for region in changed_regions:
+            self._rasterise(region)
+            self._record_change(region)
+
+        return changed_regions
+
+    def set_cells(self, affected_cells: np.ndarray[bool]) -> None:
+        '''
+        Replaces the whole geometry with the given cells, which stay as the background of later cube edits.
+        '''
+        self.affected_cells = affected_cells.copy()
+        self._background_cells = np.flatnonzero(affected_cells)
+        self._boundary_deltas = {}
+        self._record_change(tuple(slice(0, length) for length in self._shape))
 
     def process_fluid_state(self, _: BoltzmannFluidState) -> None:
         pass
 
     def remove_fluid_from_boundary(self, fluid_state: BoltzmannFluidState) -> None:
-        fluid_state_matrix = fluid_state.fluid_state
-        fluid_state_matrix[self.affected_cells, ...] = 0
+        populations = fluid_state.populations()
+        populations[:, self.affected_cells] = 0
+
+    def remove_fluid_from_region(self, fluid_state: BoltzmannFluidState, region: Region) -> None:
+        populations = fluid_state.populations()[(slice(None),) + region]
+        populations[:, self.affected_cells[region]] = 0
+
+
+class NoSlipBoundaryLinks:
+    '''
+    Bounce-back links of a no-slip boundary. Every link starts in a wall cell s in direction i and ends in the fluid
+    cell s - e_i in the reverse direction, so the fluid that streamed into the wall is sent back to where it came from.
+    The links are stored as cells and directions, and as indices into BoltzmannFluidState.flat_populations for one
+    storage layout.
+
+    A link only depends on its wall cell and the neighbours of it, so after a change of the geometry in a region the
+    links of the region grown by one cell are recomputed and all the other links are kept, see update_region.
+    '''
+    def __init__(self, affected_cells: np.ndarray[bool], allowed_velocities: np.ndarray[np.ndarray[np.int32]],
+                 reverse_direction_indeces: np.ndarray[np.int32], fluid_state: BoltzmannFluidState,
+                 version: int = 0) -> None:
+        shape = affected_cells.shape
+        source_cells, source_directions, target_cells, target_directions = [], [], [], []
+
+        for i, dr in enumerate(allowed_velocities):
+            dx, dy, dz = dr.astype(np.int32)
+            linked_cells = affected_cells & np.roll(~affected_cells, (dx, dy, dz), axis=(0, 1, 2))
+            x, y, z = np.nonzero(linked_cells)
+
+            source_cells.append(np.ravel_multi_index((x, y, z), shape))
+            target_cells.append(np.ravel_multi_index((x - dx, y - dy, z - dz), shape, mode="wrap"))
+            source_directions.append(np.full(len(x), i))
+            target_directions.append(np.full(len(x), reverse_direction_indeces[i]))
+
+        self._allowed_velocities = allowed_velocities
+        self._reverse_direction_indeces = reverse_direction_indeces
+        self.version = version
+        self.source_cells = np.concatenate(source_cells)
+        self.source_directions = np.concatenate(source_directions)
+        self.target_cells = np.concatenate(target_cells)
+        self.target_directions = np.concatenate(target_directions)
+        self.wall_surface_cells = np.unique(self.source_cells)
+        self._init_population_indices(fluid_state)
+
+    def _init_population_indices(self, fluid_state: BoltzmannFluidState) -> None:
+        populations_count = len(self._allowed_velocities)
+
+        self.direction_major = fluid_state.direction_major
+        self.source_indices = fluid_state.population_indices(self.source_cells, self.source_directions)
+        self.target_indices = fluid_state.population_indices(self.target_cells, self.target_directions)
+        self.wall_surface_indices = fluid_state.population_indices(
+            np.repeat(self.wall_surface_cells, populations_count),
+            np.tile(np.arange(populations_count), len(self.wall_surface_cells)))
+
+    def update_region(self, affected_cells: np.ndarray[bool], region: Region, fluid_state: BoltzmannFluidState,
+                      version: int) -> None:
+        shape = affected_cells.shape
+        region_cells = _region_cells(region, shape, margin=1)
+        kept_links = ~np.isin(self.source_cells, region_cells)
+        x, y, z = np.unravel_index(region_cells[affected_cells.reshape(-1)[region_cells]], shape)
+        source_cells, source_directions, target_cells, target_directions = [self.source_cells[kept_links]], \
+            [self.source_directions[kept_links]], [self.target_cells[kept_links]], [self.target_directions[kept_links]]
+
+        for i, dr in enumerate(self._allowed_velocities):
+            dx, dy, dz = dr.astype(np.int32)
+            neighbour_cells = np.ravel_multi_index((x - dx, y - dy, z - dz), shape, mode="wrap")
+            linked = ~affected_cells.reshape(-1)[neighbour_cells]
+
+            source_cells.append(np.ravel_multi_index((x[linked], y[linked], z[linked]), shape))
+            target_cells.append(neighbour_cells[linked])
+            source_directions.append(np.full(np.count_nonzero(linked), i))
+            target_directions.append(np.full(np.count_nonzero(linked), self._reverse_direction_indeces[i]))
+
+        self.version = version
+        self.source_cells = np.concatenate(source_cells)
+        self.source_directions = np.concatenate(source_directions)
+        self.target_cells = np.concatenate(target_cells)
+        self.target_directions = np.concatenate(target_directions)
+        self.wall_surface_cells = np.unique(self.source_cells)
+        self._init_population_indices(fluid_state)
 
 
 class NoSlipBoundaryConditions(BoundaryConditions):
-    def __init__(self, shape: tuple[int, int, int], allowed_velocities: np.ndarray[np.ndarray[np.int32]]):
-        super().__init__(shape, allowed_velocities)
+    '''
+    Bounces back the fluid that streamed into a wall. The bounce-back links are built from the affected cells on the
+    first step, and updated in the changed regions on the first step after the geometry changed, so every step only
+    touches the cells on the wall surface.
+    '''
+    def __init__(self, shape: tuple[int, int, int], allowed_velocities: np.ndarray[np.ndarray[np.int32]],
+                 dtype: np.dtype = np.float64, stencil: LatticeStencil = None):
+        super().__init__(shape, allowed_velocities, dtype, stencil)
+        self._links: NoSlipBoundaryLinks = None
+
+    def get_links(self, fluid_state: BoltzmannFluidState) -> NoSlipBoundaryLinks:
+        changed_regions = self.changes_since(self._links.version) if self._links is not None else None
+
+        if changed_regions is None:
+            self._links = NoSlipBoundaryLinks(self.affected_cells, self.allowed_velocities,
+                                              self.reverse_direction_indeces, fluid_state, self.version)
+        elif changed_regions:
+            for region in changed_regions:
+                self._links.update_region(self.affected_cells, region, fluid_state, self.version)
+        elif self._links.direction_major != fluid_state.direction_major:
+            self._links._init_population_indices(fluid_state)
+        self._forget_changes()
 
-    def update_boundary(self, boundary_condition_delta: BoundaryConditionNoSlipDelta) -> None:
-        self._update_affected_cells(boundary_condition_delta.boundary_cube)
+        return self._links
 
     def process_fluid_state(self, fluid_state: BoltzmannFluidState) -> None:
-        fluid_state_matrix = fluid_state.fluid_state
-        affected_fluid_matrix = fluid_state_matrix * self.affected_cells[..., np.newaxis]
-        fluid_state_matrix[self.affected_cells] = 0
+        links = self.get_links(fluid_state)
+        flat_populations = fluid_state.flat_populations()
 
-        for i, dr in enumerate(self.allowed_velocities):
-            dx, dy, dz = -dr.astype(np.int32)
-            reverse_index = self.reverse_direction_indeces[i]
-            fluid_state_matrix[..., reverse_index] += np.roll(affected_fluid_matrix[..., i],
-                                                              (dx, dy, dz), axis=(0, 1, 2))
+        bounced_populations = flat_populations[links.source_indices]
+        flat_populations[links.wall_surface_indices] = 0
+        flat_populations[links.target_indices] += bounced_populations
 
+    def remove_fluid_from_wall_surface(self, fluid_state: BoltzmannFluidState) -> None:
+        '''
+        Only the wall cells next to fluid can receive fluid during a step, so after remove_fluid_from_boundary
+        it is enough to clear those.
+        '''
+        links = self.get_links(fluid_state)
+        fluid_state.flat_populations()[links.wall_surface_indices] = 0
 
-class ConstantVelocityBoundaryConditions(BoundaryConditions):
-    def _update_velocities(self, boundary_condition_delta: BoundaryConditionConstantVelocityDelta) -> None:
-        x1, y1, z1 = boundary_condition_delta.boundary_cube.start_position.to_tuple()
-        x2, y2, z2 = boundary_condition_delta.boundary_cube.end_position.to_tuple()
-        self.velocity[x1:x2, y1:y2, z1:z2] = boundary_condition_delta.velocity.to_numpy()
-        self.normal_vectors[x1:x2, y1:y2, z1:z2] = boundary_condition_delta.normal.to_numpy()
 
-    def __init__(self, shape: tuple[int, int, int], allowed_velocities: np.ndarray[np.ndarray[np.int32]]):
-        super().__init__(shape, allowed_velocities)
-        self.velocity = np.zeros(shape + (3,))
-        self.normal_vectors = np.zeros(shape + (3,))
+class ConstantVelocityBoundaryCoefficients:
+    '''
+    Geometric terms of a constant velocity boundary, restricted to its affected cells. They only depend on the
+    velocities and normal vectors of the boundary, so they are computed once and reused on every step.
 
-    def update_boundary(self, boundary_condition_delta: BoundaryConditionConstantVelocityDelta) -> None:
-        self._update_affected_cells(boundary_condition_delta.boundary_cube)
-        self._update_velocities(boundary_condition_delta)
+    For a boundary cell with normal n and velocity u, the fluid leaving the boundary in the reverse of direction i is
+        f_i - rho / 6 (e_i . u) - rho / 3 (t_i . u) + 1 / 2 sum_k f_k (1 - |n . e_k|) (t_i . e_k),
+    where t_i = e_i - n (n . e_i) is the tangential part of e_i and only the directions with n . e_i < 0 are used.
+    Since t_i . e_k = e_i . e_k - (n . e_i)(n . e_k), the last sum is e_i . S - (n . e_i) T with
+    S = sum_k g_k e_k and T = sum_k g_k (n . e_k), where g_k = f_k (1 - |n . e_k|).
 
-    def process_fluid_state(self, fluid_state: BoltzmannFluidState) -> None:
-        fluid_state_matrix = fluid_state.fluid_state
-        density_state_matrix = FluidDensityState.from_boltzmann_state(fluid_state).density_state
-        affected_fluid_matrix = fluid_state_matrix * self.affected_cells[..., np.newaxis]
+    Every outgoing direction of a boundary cell s is a link to the cell s - e_i, in the reverse direction.
+
+    On D2Q9 every direction stands for the D3Q19 directions summed into it, so all terms but f_i are multiplied by
+    their number, the boundary multiplicity of the direction. On the three dimensional stencils the multiplicities
+    are 1, see LatticeStencil.
+
+    The terms of a cell only depend on that cell, so after a change of the geometry in a region the rows of the cells
+    in the region are recomputed and the other rows are kept, see updated.
+    '''
+    def __init__(self, affected_cells: np.ndarray[bool], velocity: np.ndarray, normal_vectors: np.ndarray,
+                 allowed_velocities: np.ndarray[np.ndarray[np.int32]], reverse_direction_indeces: np.ndarray[np.int32],
+                 fluid_state: BoltzmannFluidState = None, version: int = 0,
+                 boundary_multiplicities: np.ndarray = None) -> None:
+        self.allowed_velocities = allowed_velocities
+        self.boundary_multiplicities = boundary_multiplicities if boundary_multiplicities is not None \
+            else np.ones(len(allowed_velocities), dtype=allowed_velocities.dtype)
+        self.version = version
+        self._shape = affected_cells.shape
+        self._reverse_direction_indeces = reverse_direction_indeces
+        self._init_rows(np.flatnonzero(affected_cells), velocity.reshape(-1, 3), normal_vectors.reshape(-1, 3))
+        self._init_links()
+
+        self.direction_major = None
+        if fluid_state is not None:
+            self._init_population_indices(fluid_state)
 
-        density_state_matrix_third = density_state_matrix / 3
-        density_state_matrix_sixth = density_state_matrix / 6
+    def _init_rows(self, cells: np.ndarray[np.int64], velocity: np.ndarray, normal_vectors: np.ndarray) -> None:
+        boundary_velocity = velocity[cells]
+        boundary_normal_vectors = normal_vectors[cells]
+        allowed_velocities = self.allowed_velocities
 
-        normal_vectors_dot_velocity = np.inner(self.normal_vectors, self.allowed_velocities)
-        sum_partial_coefficients = 1 - np.abs(normal_vectors_dot_velocity)
+        self.cells = cells
+        self.normal_vectors_dot_directions = boundary_normal_vectors @ allowed_velocities.T
+        self.partial_coefficients = 1 - np.abs(self.normal_vectors_dot_directions)
+        self.outgoing_mask = self.normal_vectors_dot_directions < 0
 
-        affected_fluid_mask = normal_vectors_dot_velocity < 0
-        affected_fluid_matrix *= affected_fluid_mask
+        tangential_vectors_dot_velocity = boundary_velocity @ allowed_velocities.T \
+            - self.normal_vectors_dot_directions * np.sum(boundary_normal_vectors * boundary_velocity, axis=-1,
+                                                          keepdims=True)
+        self.velocity_coefficients = ((boundary_velocity @ allowed_velocities.T) / 6
+                                      + tangential_vectors_dot_velocity / 3) * self.boundary_multiplicities
 
-        fluid_state_matrix[self.affected_cells] = 0
+    def _init_links(self) -> None:
+        x, y, z = np.unravel_index(self.cells, self._shape)
 
-        for i, dr in enumerate(self.allowed_velocities):
-            dx, dy, dz = -dr.astype(np.int32)
-            reverse_index = self.reverse_direction_indeces[i]
+        self.link_cells, self.link_directions = np.nonzero(self.outgoing_mask)
+        directions = self.allowed_velocities.astype(np.int32)[self.link_directions]
+        self.link_target_cells = np.ravel_multi_index((x[self.link_cells] - directions[:, 0],
+                                                       y[self.link_cells] - directions[:, 1],
+                                                       z[self.link_cells] - directions[:, 2]), self._shape,
+                                                      mode="wrap")
+        self.link_target_directions = self._reverse_direction_indeces[self.link_directions]
 
-            tangential_vectors = dr - self.normal_vectors * np.inner(self.normal_vectors, dr)[..., np.newaxis]
+    def _init_population_indices(self, fluid_state: BoltzmannFluidState) -> None:
+        populations_count = len(self.allowed_velocities)
 
-            ci_dot_velocity = np.inner(self.velocity, dr)
+        self.direction_major = fluid_state.direction_major
+        self.population_indices = fluid_state.population_indices(self.cells[:, np.newaxis],
+                                                                 np.arange(populations_count)[np.newaxis, :])
+        self.link_target_indices = fluid_state.population_indices(self.link_target_cells,
+                                                                  self.link_target_directions)
 
-            tangential_vectors_dot_velocity = np.sum(tangential_vectors * self.velocity, axis=-1)
+    def updated(self, affected_cells: np.ndarray[bool], velocity: np.ndarray, normal_vectors: np.ndarray,
+                region: Region, version: int) -> 'ConstantVelocityBoundaryCoefficients':
+        '''
+        Returns the coefficients with the rows of the cells in the region recomputed from the given fields.
+        '''
+        region_cells = _region_cells(region, self._shape)
+        kept_rows = ~np.isin(self.cells, region_cells)
 
-            sum_tangential_coefficients = np.inner(tangential_vectors, self.allowed_velocities)
+        added = ConstantVelocityBoundaryCoefficients.__new__(ConstantVelocityBoundaryCoefficients)
+        added.allowed_velocities = self.allowed_velocities
+        added.boundary_multiplicities = self.boundary_multiplicities
+        added._init_rows(region_cells[affected_cells.reshape(-1)[region_cells]], velocity.reshape(-1, 3),
+                         normal_vectors.reshape(-1, 3))
 
-            sum_all_coefficients = sum_partial_coefficients * sum_tangential_coefficients
+        coefficients = ConstantVelocityBoundaryCoefficients.__new__(ConstantVelocityBoundaryCoefficients)
+        coefficients.allowed_velocities = self.allowed_velocities
+        coefficients.boundary_multiplicities = self.boundary_multiplicities
+        coefficients.version = version
+        coefficients._shape = self._shape
+        coefficients._reverse_direction_indeces = self._reverse_direction_indeces
+        for name in ("cells", "normal_vectors_dot_directions", "partial_coefficients", "outgoing_mask",
+                     "velocity_coefficients"):
+            setattr(coefficients, name, np.concatenate((getattr(self, name)[kept_rows], getattr(added, name))))
+        coefficients._init_links()
+        coefficients.direction_major = None
 
-            all_terms_sum = affected_fluid_matrix[..., i]
-            all_terms_sum += -density_state_matrix_sixth * ci_dot_velocity
-            all_terms_sum += -density_state_matrix_third * tangential_vectors_dot_velocity
-            all_terms_sum += 0.5 * np.sum(affected_fluid_matrix * sum_all_coefficients, axis=-1)
+        return coefficients
 
-            fluid_state_matrix[..., reverse_index] += np.roll(all_terms_sum * affected_fluid_mask[..., i], (dx, dy, dz), axis=(0, 1, 2))
+    def link_terms(self, boundary_populations: np.ndarray) -> np.ndarray:
+        '''
+            Takes the populations of the boundary cells, one row per cell, and returns the fluid sent along every link.
+        '''
+        density = np.sum(boundary_populations, axis=-1, keepdims=True)
+        outgoing_populations = boundary_populations * self.outgoing_mask
+        weighted_populations = outgoing_populations * self.partial_coefficients
+
+        weighted_sum = weighted_populations @ self.allowed_velocities
+        normal_weighted_sum = np.sum(weighted_populations * self.normal_vectors_dot_directions, axis=-1,
+                                     keepdims=True)
+
+        all_terms_sum = outgoing_populations - density * self.velocity_coefficients
+        all_terms_sum += 0.5 * self.boundary_multiplicities * (weighted_sum @ self.allowed_velocities.T
+                                                               - self.normal_vectors_dot_directions
+                                                               * normal_weighted_sum)
+
+        return all_terms_sum[self.link_cells, self.link_directions]
+
+
+class ConstantVelocityBoundaryConditions(BoundaryConditions):
+    '''
+    Sets the velocity of the fluid entering through the boundary. The geometric coefficients are computed for the
+    affected cells on the first step, and recomputed for the cells of the changed regions on the first step after the
+    geometry changed. Where cubes overlap, the velocity and normal of the cube placed last are used.
+    '''
+    def __init__(self, shape: tuple[int, int, int], allowed_velocities: np.ndarray[np.ndarray[np.int32]],
+                 dtype: np.dtype = np.float64, stencil: LatticeStencil = None):
+        super().__init__(shape, allowed_velocities, dtype, stencil)
+        self.velocity = np.zeros(shape + (3,), dtype=dtype)
+        self.normal_vectors = np.zeros(shape + (3,), dtype=dtype)
+        self._background_velocity = np.zeros((0, 3), dtype=dtype)
+        self._background_normal_vectors = np.zeros((0, 3), dtype=dtype)
+        self._coefficients: ConstantVelocityBoundaryCoefficients = None
+
+    def _clear_region(self, region: Region) -> None:
+        super()._clear_region(region)
+        self.velocity[region] = 0
+        self.normal_vectors[region] = 0
+
+    def _apply_background(self, background_rows: np.ndarray[np.int64], cells: tuple[np.ndarray, ...]) -> None:
+        super()._apply_background(background_rows, cells)
+        self.velocity[cells] = self._background_velocity[background_rows]
+        self.normal_vectors[cells] = self._background_normal_vectors[background_rows]
+
+    def _apply_delta(self, boundary_condition_delta: BoundaryConditionConstantVelocityDelta, region: Region) -> None:
+        super()._apply_delta(boundary_condition_delta, region)
+        self.velocity[region] = boundary_condition_delta.velocity.to_numpy()
+        self.normal_vectors[region] = boundary_condition_delta.normal.to_numpy()
+
+    def set_cells(self, affected_cells: np.ndarray[bool], velocity: np.ndarray = None,
+                  normal_vectors: np.ndarray = None) -> None:
+        self.velocity = velocity.astype(self.dtype) if velocity is not None else np.zeros_like(self.velocity)
+        self.normal_vectors = normal_vectors.astype(self.dtype) if normal_vectors is not None \
+            else np.zeros_like(self.normal_vectors)
+        super().set_cells(affected_cells)
+        self._background_velocity = self.velocity.reshape(-1, 3)[self._background_cells]
+        self._background_normal_vectors = self.normal_vectors.reshape(-1, 3)[self._background_cells]
+
+    def get_coefficients(self, fluid_state: BoltzmannFluidState = None) -> ConstantVelocityBoundaryCoefficients:
+        changed_regions = self.changes_since(self._coefficients.version) if self._coefficients is not None else None
+
+        if changed_regions is None:
+            self._coefficients = ConstantVelocityBoundaryCoefficients(
+                self.affected_cells, self.velocity, self.normal_vectors, self.allowed_velocities,
+                self.reverse_direction_indeces, version=self.version,
+                boundary_multiplicities=self.boundary_multiplicities)
+        for region in changed_regions or ():
+            self._coefficients = self._coefficients.updated(self.affected_cells, self.velocity, self.normal_vectors,
+                                                            region, self.version)
+        self._forget_changes()
+
+        if fluid_state is not None and self._coefficients.direction_major != fluid_state.direction_major:
+            self._coefficients._init_population_indices(fluid_state)
+
+        return self._coefficients
+
+    def process_fluid_state(self, fluid_state: BoltzmannFluidState) -> None:
+        coefficients = self.get_coefficients(fluid_state)
+        flat_populations = fluid_state.flat_populations()
+
+        link_terms = coefficients.link_terms(flat_populations[coefficients.population_indices])
+        flat_populations[coefficients.population_indices] = 0
+        flat_populations[coefficients.link_target_indices] += link_terms
+
+    def remove_fluid_from_boundary(self, fluid_state: BoltzmannFluidState) -> None:
+        coefficients = self.get_coefficients(fluid_state)
+        fluid_state.flat_populations()[coefficients.population_indices] = 0
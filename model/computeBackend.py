@@ -0,0 +1,194 @@
+import warnings
+import numpy as np
+from .boltzmannFluidUtils import (
+    BoltzmannFluidState,
+    FluidDensityState,
+    FluidVelocityState
+)
+from .boundaryConditions import NoSlipBoundaryConditions, ConstantVelocityBoundaryConditions
+from .equilibriumFluidSolver import EquilibriumFluidState, EquilibriumWeights, RelaxedBoltzmannFluidState
+from .fusedCollideStream import FusedCollideStreamKernel
+from .phaseTimer import PhaseTimer
+from utilities.DTO.simulationParameters import SimulationParameters
+
+
+class ComputeBackend:
+    '''
+    Computes the operators of one dense simulation step. Every backend works on a BoltzmannFluidState in either
+    storage layout and holds the buffers it needs between steps. The profiled step methods compute the same result
+    and time every phase with a PhaseTimer.
+
+    The density is returned with shape (w_x, w_y, w_z), the velocity with shape (w_x, w_y, w_z, 3) and the equilibrium
+    in the storage layout of the fluid state.
+    '''
+    NAME = None
+
+    def __init__(self, shape: tuple[int, int, int], allowed_velocities: np.ndarray[np.ndarray[np.float64]],
+                 equilibrium_weights: EquilibriumWeights, simulation_params: SimulationParameters,
+                 direction_major: bool = False) -> None:
+        self._shape = shape
+        self._allowed_velocities = allowed_velocities
+        self._equilibrium_weights = equilibrium_weights
+        self._simulation_params = simulation_params
+        self._direction_major = direction_major
+
+    def density(self, fluid_state: BoltzmannFluidState) -> np.ndarray:
+        raise NotImplementedError
+
+    def velocity(self, fluid_state: BoltzmannFluidState, density: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def equilibrium(self, density: np.ndarray, velocity: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def relax(self, fluid_state: BoltzmannFluidState, equilibrium: np.ndarray) -> None:
+        raise NotImplementedError
+
+    def stream(self, fluid_state: BoltzmannFluidState) -> None:
+        raise NotImplementedError
+
+    def process_no_slip(self, boundary_conditions: NoSlipBoundaryConditions,
+                        fluid_state: BoltzmannFluidState) -> None:
+        raise NotImplementedError
+
+    def process_constant_velocity(self, boundary_conditions: ConstantVelocityBoundaryConditions,
+                                  fluid_state: BoltzmannFluidState) -> None:
+        raise NotImplementedError
+
+    def use_scratch_state(self, scratch_state: np.ndarray) -> None:
+        '''
+        Backends that stream into a ping-pong buffer use the given array as that buffer from now on.
+        '''
+
+    def collide_and_stream(self, fluid_state: BoltzmannFluidState) -> None:
+        density = self.density(fluid_state)
+        velocity = self.velocity(fluid_state, density)
+        self.relax(fluid_state, self.equilibrium(density, velocity))
+        self.stream(fluid_state)
+
+    def apply_boundary_conditions(self, no_slip_boundary_conditions: NoSlipBoundaryConditions,
+                                  constant_velocity_boundary_conditions: ConstantVelocityBoundaryConditions,
+                                  fluid_state: BoltzmannFluidState) -> None:
+        self.process_no_slip(no_slip_boundary_conditions, fluid_state)
+        self.process_constant_velocity(constant_velocity_boundary_conditions, fluid_state)
+        no_slip_boundary_conditions.remove_fluid_from_wall_surface(fluid_state)
+        constant_velocity_boundary_conditions.remove_fluid_from_boundary(fluid_state)
+
+    def profiled_collide_and_stream(self, fluid_state: BoltzmannFluidState, phase_timer: PhaseTimer) -> None:
+        phase_timer.start()
+        density = self.density(fluid_state)
+        velocity = self.velocity(fluid_state, density)
+        phase_timer.lap("moments")
+        equilibrium = self.equilibrium(density, velocity)
+        phase_timer.lap("equilibrium")
+        self.relax(fluid_state, equilibrium)
+        phase_timer.lap("collide")
+        self.stream(fluid_state)
+        phase_timer.lap("stream")
+
+    def profiled_apply_boundary_conditions(self, no_slip_boundary_conditions: NoSlipBoundaryConditions,
+                                           constant_velocity_boundary_conditions: ConstantVelocityBoundaryConditions,
+                                           fluid_state: BoltzmannFluidState, phase_timer: PhaseTimer) -> None:
+        phase_timer.start()
+        self.process_no_slip(no_slip_boundary_conditions, fluid_state)
+        phase_timer.lap("no_slip")
+        self.process_constant_velocity(constant_velocity_boundary_conditions, fluid_state)
+        phase_timer.lap("constant_velocity")
+        no_slip_boundary_conditions.remove_fluid_from_wall_surface(fluid_state)
+        phase_timer.lap("no_slip")
+        constant_velocity_boundary_conditions.remove_fluid_from_boundary(fluid_state)
+        phase_timer.lap("constant_velocity")
+
+
+class NumpyBackend(ComputeBackend):
+    '''
+    The reference backend, built from the NumPy state objects. With fused the collision and streaming run in place
+    in FusedCollideStreamKernel instead of one pass per operator.
+    '''
+    NAME = "numpy"
+
+    def __init__(self, shape: tuple[int, int, int], allowed_velocities: np.ndarray[np.ndarray[np.float64]],
+                 equilibrium_weights: EquilibriumWeights, simulation_params: SimulationParameters,
+                 direction_major: bool = False, fused: bool = False) -> None:
+        super().__init__(shape, allowed_velocities, equilibrium_weights, simulation_params, direction_major)
+        self._fused_kernel = FusedCollideStreamKernel(shape, allowed_velocities, equilibrium_weights,
+                                                      simulation_params, direction_major) \
+            if fused else None
+
+    def density(self, fluid_state: BoltzmannFluidState) -> np.ndarray:
+        return FluidDensityState.from_boltzmann_state(fluid_state).density_state
+
+    def velocity(self, fluid_state: BoltzmannFluidState, density: np.ndarray) -> np.ndarray:
+        return FluidVelocityState.from_boltzmann_state(fluid_state, FluidDensityState(density),
+                                                       self._simulation_params).velocity_state
+
+    def equilibrium(self, density: np.ndarray, velocity: np.ndarray) -> np.ndarray:
+        return EquilibriumFluidState.from_velocities_and_densities(FluidDensityState(density),
+                                                                   FluidVelocityState(velocity),
+                                                                   self._equilibrium_weights,
+                                                                   self._allowed_velocities,
+                                                                   self._simulation_params,
+                                                                   self._direction_major).equilibrium_state
+
+    def relax(self, fluid_state: BoltzmannFluidState, equilibrium: np.ndarray) -> None:
+        fluid_state.fluid_state = RelaxedBoltzmannFluidState(fluid_state, EquilibriumFluidState(equilibrium),
+                                                             self._simulation_params).fluid_state
+
+    def stream(self, fluid_state: BoltzmannFluidState) -> None:
+        populations = fluid_state.populations()
+        streamed_state = np.zeros_like(fluid_state.fluid_state, order="C")
+        streamed_populations = streamed_state if self._direction_major else np.moveaxis(streamed_state, -1, 0)
+
+        for i, dr in enumerate(self._allowed_velocities):
+            dx, dy, dz = dr.astype(np.int32)
+            streamed_populations[i] = np.roll(populations[i], shift=(dx, dy, dz), axis=(0, 1, 2))
+
+        fluid_state.fluid_state = streamed_state
+
+    def use_scratch_state(self, scratch_state: np.ndarray) -> None:
+        if self._fused_kernel is not None:
+            self._fused_kernel.use_scratch_state(scratch_state)
+
+    def collide_and_stream(self, fluid_state: BoltzmannFluidState) -> None:
+        if self._fused_kernel is not None:
+            self._fused_kernel.collide_and_stream(fluid_state)
+        else:
+            super().collide_and_stream(fluid_state)
+
+    def profiled_collide_and_stream(self, fluid_state: BoltzmannFluidState, phase_timer: PhaseTimer) -> None:
+        if self._fused_kernel is not None:
+            self._fused_kernel.profiled_collide_and_stream(fluid_state, phase_timer)
+        else:
+            super().profiled_collide_and_stream(fluid_state, phase_timer)
+
+    def process_no_slip(self, boundary_conditions: NoSlipBoundaryConditions,
+                        fluid_state: BoltzmannFluidState) -> None:
+        boundary_conditions.process_fluid_state(fluid_state)
+
+    def process_constant_velocity(self, boundary_conditions: ConstantVelocityBoundaryConditions,
+                                  fluid_state: BoltzmannFluidState) -> None:
+        boundary_conditions.process_fluid_state(fluid_state)
+
+
+BACKENDS = ("numpy", "numba")
+
+
+def create_backend(name: str, shape: tuple[int, int, int], allowed_velocities: np.ndarray[np.ndarray[np.float64]],
+                   equilibrium_weights: EquilibriumWeights, simulation_params: SimulationParameters,
+                   direction_major: bool = False, fused: bool = False) -> ComputeBackend:
+    '''
+    Creates the backend with the given name. The numba backend is optional: when numba is not installed the NumPy
+    backend is used instead.
+    '''
+    if name not in BACKENDS:
+        raise ValueError(f"Invalid backend: {name}. Available backends: {', '.join(BACKENDS)}.")
+
+    if name == "numba":
+        try:
+            from .numbaBackend import NumbaBackend
+        except ImportError as error:
+            warnings.warn(f"Numba backend is not available ({error}), falling back to the numpy backend.")
+        else:
+            return NumbaBackend(shape, allowed_velocities, equilibrium_weights, simulation_params, direction_major)
+
+    return NumpyBackend(shape, allowed_velocities, equilibrium_weights, simulation_params, direction_major, fused)
@@ -0,0 +1,90 @@
+from utilities.DTO.vector3 import Vector3Int
+from .fluidDirectionProvider import FluidDirectionProvider
+from . import d2q9Tables
+import numpy as np
+
+
+class D2Q9DirectionProvider:
+    '''
+    The directions of the D2Q9 lattice, used instead of D3Q19 when the lattice is one cell deep. They are numbered
+    like the D3Q19 directions of the xy plane: 0 is the rest direction, 1 to 4 are +x, -x, +y, -y and 5 to 8 are
+    the diagonals (-1, -1), (1, -1), (-1, 1), (1, 1). The directions keep a z component of 0, so the velocity keeps
+    its 3 components and the lattice its z axis of length 1.
+
+    With one z plane the D3Q19 directions that only differ in z reach the same cell, so D2Q9 is D3Q19 with every
+    direction summed with its z neighbours, see get_d3q19_projection: (0, 0, 0) and (0, 0, ±1) become the rest
+    direction, (±1, 0, 0) and (±1, 0, ±1) become ±x, and so on. The projected weights are the usual D2Q9 weights.
+    '''
+    @staticmethod
+    def __get_direction_for_1_to_4(n: int) -> Vector3Int:
+        k = n - 1
+        value = -1 if k % 2 == 1 else 1
+
+        return Vector3Int(value, 0, 0) if k // 2 == 0 else Vector3Int(0, value, 0)
+
+    @staticmethod
+    def __get_direction_for_5_8(n: int) -> Vector3Int:
+        k = n - 5
+
+        first_one = (k % 2) * 2 - 1
+        second_one = (k // 2) * 2 - 1
+
+        return Vector3Int(first_one, second_one, 0)
+
+    @staticmethod
+    def get_direction(n: int) -> Vector3Int:
+        if n < 0 or n > 8:
+            raise ValueError(f"n must be between 0 and 8, but is {n}")
+
+        if n == 0:
+            return Vector3Int(0, 0, 0)
+        if n <= 4:
+            return D2Q9DirectionProvider.__get_direction_for_1_to_4(n)
+        return D2Q9DirectionProvider.__get_direction_for_5_8(n)
+
+    @staticmethod
+    def get_all_directions() -> np.ndarray[np.ndarray[np.float64]]:
+        return d2q9Tables.DIRECTIONS
+
+    @staticmethod
+    def normalize_directions(directions: np.ndarray[np.ndarray[np.int32]]) -> np.ndarray[np.ndarray[np.float64]]:
+        return FluidDirectionProvider.normalize_directions(directions)
+
+    @staticmethod
+    def get_reverse_direction_index(direction_index: int) -> int:
+        if direction_index == 0:
+            return 0
+        if direction_index <= 4:
+            return direction_index - 1 if direction_index % 2 == 0 else direction_index + 1
+
+        return 5 + 3 - (direction_index - 5)
+
+    @staticmethod
+    def get_reverse_directions_indices() -> np.ndarray[np.int64]:
+        return d2q9Tables.REVERSE_INDICES
+
+    @staticmethod
+    def get_d3q19_projection() -> np.ndarray[np.ndarray[np.float64]]:
+        '''
+        Returns the (9, 19) matrix that sums every D3Q19 direction into the D2Q9 direction of its x and y components.
+        '''
+        return d2q9Tables.D3Q19_PROJECTION
+
+    @staticmethod
+    def project_d3q19(populations: np.ndarray) -> np.ndarray:
+        '''
+        Sums D3Q19 populations with 19 values on the last axis into D2Q9 populations with 9 values.
+        '''
+        return populations @ D2Q9DirectionProvider.get_d3q19_projection().T
+
+    @staticmethod
+    def get_weights() -> np.ndarray[np.float64]:
+        return d2q9Tables.WEIGHTS
+
+    @staticmethod
+    def get_boundary_multiplicities() -> np.ndarray[np.float64]:
+        '''
+        The number of D3Q19 directions summed into every direction. The constant velocity boundary sends the
+        velocity and tangential terms of each of them, see ConstantVelocityBoundaryCoefficients.
+        '''
+        return d2q9Tables.BOUNDARY_MULTIPLICITIES
@@ -0,0 +1,26 @@
+import numpy as np
+from . import d3q19Tables
+
+
+# The D2Q9 tables, computed once at import time and shared read-only by every consumer. The directions are the D3Q19
+# directions of the xy plane in their D3Q19 order: 0 is the rest direction, 1 to 4 are +x, -x, +y, -y and 5 to 8 are
+# the diagonals (-1, -1), (1, -1), (-1, 1), (1, 1), see D2Q9DirectionProvider.
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+DIRECTIONS_INT8 = _read_only(d3q19Tables.DIRECTIONS_INT8[d3q19Tables.DIRECTIONS_INT8[:, 2] == 0])
+DIRECTIONS = _read_only(DIRECTIONS_INT8.astype(np.float64))
+REVERSE_INDICES = _read_only(
+    np.argmax(np.all(DIRECTIONS_INT8[:, np.newaxis] == -DIRECTIONS_INT8[np.newaxis, :], axis=-1), axis=1))
+
+# The (9, 19) matrix that sums every D3Q19 direction into the D2Q9 direction of its x and y components.
+D3Q19_PROJECTION = _read_only(
+    np.all(DIRECTIONS_INT8[:, np.newaxis, :2] == d3q19Tables.DIRECTIONS_INT8[np.newaxis, :, :2], axis=-1)
+    .astype(np.float64))
+WEIGHTS = _read_only(D3Q19_PROJECTION @ d3q19Tables.WEIGHTS)
+# The number of D3Q19 directions summed into every direction.
+BOUNDARY_MULTIPLICITIES = _read_only(np.sum(D3Q19_PROJECTION, axis=1))
@@ -0,0 +1,44 @@
+import numpy as np
+
+
+# The D3Q19 tables, computed once at import time and shared read-only by every consumer. The directions are numbered
+# as in FluidDirectionProvider: 0 is the rest direction, 1 to 6 are +x, -x, +y, -y, +z, -z and 7 to 18 are the
+# diagonals, in groups of 4 with a zero z, y and x component, each group ordered (-1, -1), (1, -1), (-1, 1), (1, 1)
+# in its two nonzero components.
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+def _axis_directions() -> np.ndarray:
+    return np.stack([np.eye(3, dtype=np.int8), -np.eye(3, dtype=np.int8)], axis=1).reshape(6, 3)
+
+
+def _diagonal_directions() -> np.ndarray:
+    k = np.arange(12)
+    zero_positions = 2 - k // 4
+    ones_states = k % 4
+
+    nonzero_axes = np.array([[1, 2], [0, 2], [0, 1]])[zero_positions]
+    signs = np.stack([(ones_states % 2) * 2 - 1, (ones_states // 2) * 2 - 1], axis=-1)
+
+    directions = np.zeros((12, 3), dtype=np.int8)
+    np.put_along_axis(directions, nonzero_axes, signs.astype(np.int8), axis=1)
+    return directions
+
+
+DIRECTIONS_INT8 = _read_only(np.concatenate([np.zeros((1, 3), dtype=np.int8), _axis_directions(),
+                                             _diagonal_directions()]))
+DIRECTIONS = _read_only(DIRECTIONS_INT8.astype(np.float64))
+REVERSE_INDICES = _read_only(
+    np.argmax(np.all(DIRECTIONS_INT8[:, np.newaxis] == -DIRECTIONS_INT8[np.newaxis, :], axis=-1), axis=1))
+WEIGHTS = _read_only(np.array([1 / 3] + [1 / 18] * 6 + [1 / 36] * 12))
+
+# Every moving direction with its reverse, as (i, reverse of i) rows with i < reverse of i.
+OPPOSITE_PAIRS = _read_only(np.stack([np.flatnonzero(np.arange(19) < REVERSE_INDICES),
+                                      REVERSE_INDICES[np.arange(19) < REVERSE_INDICES]], axis=-1))
+# The rest direction followed by the opposite pairs: populations[..., OPPOSITE_PAIR_PERMUTATION] puts every direction
+# next to its reverse, so bounce-back is a swap of neighbouring entries.
+OPPOSITE_PAIR_PERMUTATION = _read_only(np.concatenate([[0], OPPOSITE_PAIRS.reshape(-1)]))
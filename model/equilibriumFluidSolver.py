@@ -1,5 +1,6 @@
 import numpy as np
 from einsumt import einsumt as einsum
+from .latticeStencil import get_stencil
 from .boltzmannFluidUtils import (
     FluidVelocityState,
     FluidDensityState,
@@ -10,11 +11,11 @@ from utilities.DTO.simulationParameters import SimulationParameters
 
 class EquilibriumWeights:
     @staticmethod
-    def _get_weights() -> np.ndarray[np.float64]:
-        return np.array([1 / 3] + [1 / 18] * 6 + [1 / 36] * 12)
+    def _get_weights(stencil: str = "D3Q19") -> np.ndarray[np.float64]:
+        return get_stencil(stencil).weights
 
-    def __init__(self) -> None:
-        self.weights = self._get_weights()
+    def __init__(self, dtype: np.dtype = np.float64, stencil: str = "D3Q19") -> None:
+        self.weights = self._get_weights(stencil).astype(dtype, copy=False)
 
 
 class EquilibriumFluidState:
@@ -25,7 +26,8 @@ class EquilibriumFluidState:
     def from_velocities_and_densities(density: FluidDensityState, velocity: FluidVelocityState,
                                       equilibrium_weights: EquilibriumWeights,
                                       allowed_velocities: np.ndarray[np.ndarray[np.float64]],
-                                      simulation_params: SimulationParameters) -> 'EquilibriumFluidState':
+                                      simulation_params: SimulationParameters,
+                                      direction_major: bool = False) -> 'EquilibriumFluidState':
         speed_of_sound = simulation_params.speed_of_sound
 
         speed_of_sound_squared = speed_of_sound ** 2
@@ -43,7 +45,10 @@ class EquilibriumFluidState:
                                                velocity_coefficient,
                                                equilibrium_weights.weights)
 
-        result_field = einsum("ijk,ijkv->ijkv", density.density_state, velocity_coefficient_weighted)
+        if direction_major:
+            result_field = einsum("ijk,ijkv->vijk", density.density_state, velocity_coefficient_weighted)
+        else:
+            result_field = einsum("ijk,ijkv->ijkv", density.density_state, velocity_coefficient_weighted)
 
         return EquilibriumFluidState(result_field)
 
@@ -62,12 +67,17 @@ class RelaxedBoltzmannFluidState(BoltzmannFluidState):
         self.fluid_state = self._relax_fluid_state(fluid_state.fluid_state, equilibrium_state.equilibrium_state,
                                                    simulation_parameters.relaxation_time)
         self.allowed_velocities = fluid_state.allowed_velocities
+        self.direction_major = fluid_state.direction_major
 
     def to_next_boltzmann_state(self) -> BoltzmannFluidState:
-        new_state = np.zeros_like(self.fluid_state)
+        new_state = BoltzmannFluidState.from_fluid_state(np.zeros_like(self.fluid_state, order="C"),
+                                                         self.allowed_velocities,
+                                                         self.direction_major)
+        populations = self.populations()
+        new_populations = new_state.populations()
 
         for i, dr in enumerate(self.allowed_velocities):
             dx, dy, dz = dr.astype(np.int32) # TODO: Verify that this is correct @Rafał
-            new_state[..., i] = np.roll(self.fluid_state[..., i], shift=(dx, dy, dz), axis=(0, 1, 2))
+            new_populations[i] = np.roll(populations[i], shift=(dx, dy, dz), axis=(0, 1, 2))
 
-        return BoltzmannFluidState.from_fluid_state(new_state, self.allowed_velocities)
+        return new_state
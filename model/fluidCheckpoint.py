@@ -0,0 +1,125 @@
+import json
+import os
+import zipfile
+from dataclasses import dataclass, asdict
+import numpy as np
+from .boltzmannFluid import BoltzmannFluid
+from .latticeStencil import stencil_for_populations_count
+from utilities.DTO.simulationParameters import SimulationParameters
+
+
+@dataclass
+class FluidCheckpoint:
+    '''
+    A copy of everything needed to continue a simulation: the populations with shape (w_x, w_y, w_z, Q), the masks,
+    velocities and normals of the boundary conditions, the simulation parameters and the number of steps done.
+
+    On disk a checkpoint is a zip archive with deflate compression. The populations are stored in chunks of x planes,
+    one .npy entry per chunk, so that reading and writing only ever compress one chunk at a time. The archive is
+    written next to the target path and moved over it when complete, so an interrupted write keeps the previous
+    checkpoint.
+    '''
+    FORMAT_VERSION = 1
+    CHUNK_PLANES = 16
+    COMPRESSION_LEVEL = 1
+
+    steps_count: int
+    simulation_params: SimulationParameters
+    populations: np.ndarray
+    no_slip_cells: np.ndarray
+    constant_velocity_cells: np.ndarray
+    constant_velocity: np.ndarray
+    constant_velocity_normals: np.ndarray
+
+    @staticmethod
+    def from_fluid(fluid: BoltzmannFluid, downcast: bool = False) -> 'FluidCheckpoint':
+        '''
+        Copies the state of a BoltzmannFluid or a SlabDomainRunner. With downcast the populations are stored as
+        float32, which halves the size of a float64 checkpoint but loses precision on restart.
+        '''
+        cell_populations = fluid.boltzmann_state().cell_populations()
+        dtype = np.float32 if downcast else cell_populations.dtype
+        no_slip_boundary_conditions = fluid._no_slip_boundary_conditions
+        constant_velocity_boundary_conditions = fluid._constant_velocity_boundary_conditions
+
+        return FluidCheckpoint(fluid.steps_count, fluid._simulation_params,
+                               np.array(cell_populations, dtype=dtype, order="C"),
+                               no_slip_boundary_conditions.affected_cells.copy(),
+                               constant_velocity_boundary_conditions.affected_cells.copy(),
+                               constant_velocity_boundary_conditions.velocity.copy(),
+                               constant_velocity_boundary_conditions.normal_vectors.copy())
+
+    def _boundary_arrays(self) -> dict[str, np.ndarray]:
+        return {
+            "no_slip/affected_cells": self.no_slip_cells,
+            "constant_velocity/affected_cells": self.constant_velocity_cells,
+            "constant_velocity/velocity": self.constant_velocity,
+            "constant_velocity/normal_vectors": self.constant_velocity_normals,
+        }
+
+    def write(self, path: str) -> None:
+        metadata = {
+            "format_version": FluidCheckpoint.FORMAT_VERSION,
+            "steps_count": self.steps_count,
+            "simulation_params": asdict(self.simulation_params),
+            "populations_shape": list(self.populations.shape),
+            "populations_dtype": self.populations.dtype.str,
+            "chunk_planes": FluidCheckpoint.CHUNK_PLANES,
+        }
+        temporary_path = path + ".tmp"
+
+        with zipfile.ZipFile(temporary_path, "w", compression=zipfile.ZIP_DEFLATED,
+                             compresslevel=FluidCheckpoint.COMPRESSION_LEVEL) as archive:
+            archive.writestr("metadata.json", json.dumps(metadata))
+
+            for chunk_index, start in enumerate(range(0, self.populations.shape[0], FluidCheckpoint.CHUNK_PLANES)):
+                with archive.open(f"populations/{chunk_index:05d}.npy", "w", force_zip64=True) as entry:
+                    np.lib.format.write_array(entry, self.populations[start:start + FluidCheckpoint.CHUNK_PLANES])
+
+            for name, array in self._boundary_arrays().items():
+                with archive.open(f"{name}.npy", "w", force_zip64=True) as entry:
+                    np.lib.format.write_array(entry, array)
+
+        os.replace(temporary_path, path)
+
+    @staticmethod
+    def read(path: str) -> 'FluidCheckpoint':
+        with zipfile.ZipFile(path) as archive:
+            metadata = json.loads(archive.read("metadata.json"))
+            if metadata["format_version"] != FluidCheckpoint.FORMAT_VERSION:
+                raise ValueError(f"Unsupported checkpoint format version: {metadata['format_version']}. "
+                                 f"Supported version: {FluidCheckpoint.FORMAT_VERSION}.")
+
+            def read_array(name: str) -> np.ndarray:
+                with archive.open(f"{name}.npy") as entry:
+                    return np.lib.format.read_array(entry)
+
+            populations = np.empty(metadata["populations_shape"], dtype=metadata["populations_dtype"])
+            chunk_planes = metadata["chunk_planes"]
+            for chunk_index, start in enumerate(range(0, populations.shape[0], chunk_planes)):
+                populations[start:start + chunk_planes] = read_array(f"populations/{chunk_index:05d}")
+
+            return FluidCheckpoint(metadata["steps_count"], SimulationParameters(**metadata["simulation_params"]),
+                                   populations, read_array("no_slip/affected_cells"),
+                                   read_array("constant_velocity/affected_cells"),
+                                   read_array("constant_velocity/velocity"),
+                                   read_array("constant_velocity/normal_vectors"))
+
+    def to_fluid(self, kernel: str = "reference", direction_major: bool = False,
+                 backend: str = "numpy") -> BoltzmannFluid:
+        '''
+        Builds a fluid that continues from the checkpoint. The kernel, layout and backend do not have to match the
+        ones of the run that wrote it, the stencil is the one of the checkpointed populations.
+        '''
+        stencil = stencil_for_populations_count(self.populations.shape[-1])
+        fluid = BoltzmannFluid(self.populations.shape[:3], self.simulation_params, kernel, direction_major, backend,
+                               stencil.name)
+
+        fluid._fluid_state.cell_populations()[...] = self.populations
+        fluid._no_slip_boundary_conditions.set_cells(self.no_slip_cells)
+        fluid._constant_velocity_boundary_conditions.set_cells(self.constant_velocity_cells, self.constant_velocity,
+                                                               self.constant_velocity_normals)
+
+        fluid.steps_count = self.steps_count
+
+        return fluid
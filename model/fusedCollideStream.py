@@ -0,0 +1,188 @@
+import numpy as np
+from .boltzmannFluidUtils import BoltzmannFluidState
+from .equilibriumFluidSolver import EquilibriumWeights
+from .latticeStencil import get_streaming_plan
+from .phaseTimer import PhaseTimer
+from utilities.DTO.simulationParameters import SimulationParameters
+
+
+class FusedCollisionKernel:
+    '''
+    Computes the moments, the equilibrium and the BGK relaxation of a flat matrix of cells in place, using one
+    preallocated scratch buffer for the equilibrium.
+
+    The cells are given as a matrix of shape (cells, Q) in the cell-major layout and of shape (Q, cells) in the
+    direction-major layout. The moment buffers are shaped so that they broadcast against it.
+
+    relaxation_times optionally gives every cell its own relaxation time, for batches of fluids that only differ in
+    viscosity.
+    '''
+    def __init__(self, cells_count: int, allowed_velocities: np.ndarray[np.ndarray[np.int32]],
+                 equilibrium_weights: EquilibriumWeights, simulation_params: SimulationParameters,
+                 direction_major: bool = False, relaxation_times: np.ndarray = None) -> None:
+        dtype = simulation_params.dtype
+
+        self._direction_major = direction_major
+        self._allowed_velocities = np.ascontiguousarray(allowed_velocities, dtype=dtype)
+        self._allowed_velocities_transposed = np.ascontiguousarray(self._allowed_velocities.T)
+        self._simulation_params = simulation_params
+
+        moment_shape = (1, cells_count) if direction_major else (cells_count, 1)
+        velocity_shape = (3, cells_count) if direction_major else (cells_count, 3)
+
+        self._weights = equilibrium_weights.weights[:, np.newaxis] if direction_major \
+            else equilibrium_weights.weights[np.newaxis, :]
+        self._density = np.zeros(moment_shape, dtype=dtype)
+        self._density_divisor = np.zeros(moment_shape, dtype=dtype)
+        self._zero_density_mask = np.zeros(moment_shape, dtype=bool)
+        self._velocity = np.zeros(velocity_shape, dtype=dtype)
+        self._velocity_squared = np.zeros(moment_shape, dtype=dtype)
+
+        relaxation_time = simulation_params.relaxation_time if relaxation_times is None \
+            else relaxation_times.reshape(moment_shape).astype(dtype)
+        self._relaxation_rate = 1 / relaxation_time
+        self._retention_rate = 1 - self._relaxation_rate
+
+    def _compute_moments(self, populations: np.ndarray) -> None:
+        speed_of_sound = self._simulation_params.speed_of_sound
+        direction_axis = 0 if self._direction_major else 1
+
+        np.sum(populations, axis=direction_axis, keepdims=True, out=self._density)
+
+        if self._direction_major:
+            np.matmul(self._allowed_velocities_transposed, populations, out=self._velocity)
+        else:
+            np.matmul(populations, self._allowed_velocities, out=self._velocity)
+        self._velocity *= speed_of_sound
+
+        np.copyto(self._density_divisor, self._density)
+        np.equal(self._density, 0, out=self._zero_density_mask)
+        np.copyto(self._density_divisor, 1, where=self._zero_density_mask)
+        self._velocity /= self._density_divisor
+
+    def _compute_equilibrium(self, equilibrium: np.ndarray) -> None:
+        '''
+            The equilibrium is w * rho * (1 + 3 (e.u) / c + 9 (e.u)^2 / (2 c^2) - 3 (u.u) / (2 c^2)).
+            With a = 3 (e.u) / c the two middle terms are a + a^2 / 2 = ((a + 1)^2 - 1) / 2, which can be evaluated
+            in place in a single buffer.
+        '''
+        speed_of_sound = self._simulation_params.speed_of_sound
+        speed_of_sound_squared = speed_of_sound ** 2
+
+        if self._direction_major:
+            np.einsum("wn,wn->n", self._velocity, self._velocity, out=self._velocity_squared[0])
+            np.matmul(self._allowed_velocities, self._velocity, out=equilibrium)
+        else:
+            np.einsum("nw,nw->n", self._velocity, self._velocity, out=self._velocity_squared[:, 0])
+            np.matmul(self._velocity, self._allowed_velocities_transposed, out=equilibrium)
+        self._velocity_squared *= -3 / (2 * speed_of_sound_squared)
+        self._velocity_squared += 1
+
+        equilibrium *= 3 / speed_of_sound
+        equilibrium += 1
+        np.square(equilibrium, out=equilibrium)
+        equilibrium -= 1
+        equilibrium *= 0.5
+        equilibrium += self._velocity_squared
+        equilibrium *= self._weights
+        equilibrium *= self._density
+
+    def _relax(self, populations: np.ndarray, equilibrium: np.ndarray, collided: np.ndarray) -> None:
+        np.multiply(populations, self._retention_rate, out=collided)
+        equilibrium *= self._relaxation_rate
+        collided += equilibrium
+
+    def collide(self, populations: np.ndarray, scratch: np.ndarray, collided: np.ndarray = None) -> None:
+        '''
+        Relaxes the populations in place, or writes the relaxed populations to collided and leaves them unchanged.
+        '''
+        self._compute_moments(populations)
+        self._compute_equilibrium(scratch)
+        self._relax(populations, scratch, populations if collided is None else collided)
+
+    def profiled_collide(self, populations: np.ndarray, scratch: np.ndarray, phase_timer: PhaseTimer,
+                         collided: np.ndarray = None) -> None:
+        self._compute_moments(populations)
+        phase_timer.lap("moments")
+        self._compute_equilibrium(scratch)
+        phase_timer.lap("equilibrium")
+        self._relax(populations, scratch, populations if collided is None else collided)
+        phase_timer.lap("collide")
+
+
+class FusedCollideStreamKernel:
+    '''
+    Computes the moments, the BGK relaxation and the streaming of a fluid state in one pass over preallocated
+    buffers. The fluid state array and one scratch buffer are used as ping-pong buffers, so a step does not allocate
+    any lattice sized arrays.
+
+    A state in a SharedLatticeBuffer is published to other processes, so it is collided into a private buffer and
+    streamed from there into the free slot, and the published slot is never written during a step.
+    '''
+    def __init__(self, shape: tuple[int, int, int], allowed_velocities: np.ndarray[np.ndarray[np.int32]],
+                 equilibrium_weights: EquilibriumWeights, simulation_params: SimulationParameters,
+                 direction_major: bool = False) -> None:
+        populations_count = allowed_velocities.shape[0]
+        state_shape = (populations_count,) + shape if direction_major else shape + (populations_count,)
+
+        self._direction_major = direction_major
+        self._streaming_plan = get_streaming_plan(shape, allowed_velocities, direction_major)
+        self._scratch_state = np.zeros(state_shape, dtype=simulation_params.dtype)
+        self._collided_state = None
+        self._collision_kernel = FusedCollisionKernel(int(np.prod(shape)), allowed_velocities, equilibrium_weights,
+                                                      simulation_params, direction_major)
+
+    def _flatten(self, matrix: np.ndarray) -> np.ndarray:
+        return matrix.reshape(matrix.shape[0], -1) if self._direction_major else matrix.reshape(-1, matrix.shape[-1])
+
+    def _stream(self, source_matrix: np.ndarray, destination_matrix: np.ndarray) -> None:
+        for destination_index, source_index in self._streaming_plan:
+            destination_matrix[destination_index] = source_matrix[source_index]
+
+    def _contiguous_state(self, fluid_state: BoltzmannFluidState) -> np.ndarray:
+        if not fluid_state.fluid_state.flags.c_contiguous:
+            fluid_state.fluid_state = np.ascontiguousarray(fluid_state.fluid_state)
+
+        return fluid_state.fluid_state
+
+    def use_scratch_state(self, scratch_state: np.ndarray) -> None:
+        '''
+        Streams into the given array from the next step on, e.g. the free slot of a shared buffer.
+        '''
+        self._scratch_state = scratch_state
+
+    def _collided_matrix(self, fluid_state: BoltzmannFluidState) -> np.ndarray:
+        '''
+        Returns the array that receives the relaxed populations: the state itself, or the private buffer when the
+        state is published in a shared buffer.
+        '''
+        if fluid_state.shared_buffer is None:
+            self._collided_state = None
+            return fluid_state.fluid_state
+
+        if self._collided_state is None or self._collided_state.shape != fluid_state.fluid_state.shape:
+            self._collided_state = np.zeros_like(fluid_state.fluid_state)
+
+        return self._collided_state
+
+    def collide_and_stream(self, fluid_state: BoltzmannFluidState) -> None:
+        fluid_state_matrix = self._contiguous_state(fluid_state)
+        collided_matrix = self._collided_matrix(fluid_state)
+
+        self._collision_kernel.collide(self._flatten(fluid_state_matrix), self._flatten(self._scratch_state),
+                                       self._flatten(collided_matrix))
+        self._stream(collided_matrix, self._scratch_state)
+
+        fluid_state.fluid_state, self._scratch_state = self._scratch_state, fluid_state_matrix
+
+    def profiled_collide_and_stream(self, fluid_state: BoltzmannFluidState, phase_timer: PhaseTimer) -> None:
+        phase_timer.start()
+        fluid_state_matrix = self._contiguous_state(fluid_state)
+        collided_matrix = self._collided_matrix(fluid_state)
+
+        self._collision_kernel.profiled_collide(self._flatten(fluid_state_matrix), self._flatten(self._scratch_state),
+                                                phase_timer, self._flatten(collided_matrix))
+        self._stream(collided_matrix, self._scratch_state)
+        phase_timer.lap("stream")
+
+        fluid_state.fluid_state, self._scratch_state = self._scratch_state, fluid_state_matrix
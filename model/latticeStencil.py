@@ -0,0 +1,181 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+import numpy as np
+from utilities.DTO.simulationParameters import SimulationParameters
+from . import d3q19Tables
+from .d2q9DirectionProvider import D2Q9DirectionProvider
+
+
+def _get_axis_segments(shift: int, length: int) -> list[tuple[slice, slice]]:
+    shift %= length
+    if shift == 0:
+        return [(slice(None), slice(None))]
+
+    return [(slice(shift, None), slice(None, length - shift)),
+            (slice(None, shift), slice(length - shift, None))]
+
+
+@lru_cache(maxsize=64)
+def _cached_streaming_plan(shape: tuple[int, int, int], directions: tuple[tuple[int, int, int], ...],
+                           direction_major: bool) -> tuple[tuple[tuple, tuple], ...]:
+    streaming_plan = []
+
+    for i, (dx, dy, dz) in enumerate(directions):
+        for x_destination, x_source in _get_axis_segments(dx, shape[0]):
+            for y_destination, y_source in _get_axis_segments(dy, shape[1]):
+                for z_destination, z_source in _get_axis_segments(dz, shape[2]):
+                    destination_index = (x_destination, y_destination, z_destination)
+                    source_index = (x_source, y_source, z_source)
+                    if direction_major:
+                        streaming_plan.append(((i,) + destination_index, (i,) + source_index))
+                    else:
+                        streaming_plan.append((destination_index + (i,), source_index + (i,)))
+
+    return tuple(streaming_plan)
+
+
+def get_streaming_plan(shape: tuple[int, int, int], directions: np.ndarray,
+                       direction_major: bool) -> list[tuple[tuple, tuple]]:
+    '''
+        np.roll of one population by (dx, dy, dz) is equivalent to copying at most 8 blocks, since every axis
+        is split into the part that is shifted and the part that wraps around the periodic edge.
+        The plan holds the (destination, source) index tuples of these blocks for every direction. Plans are cached
+        by shape, directions and layout, so fluids of the same shape share one.
+    '''
+    directions = tuple(map(tuple, np.asarray(directions, dtype=np.int64).tolist()))
+
+    return list(_cached_streaming_plan(tuple(int(length) for length in shape), directions, bool(direction_major)))
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    if array.flags.writeable:
+        array = np.array(array)
+        array.flags.writeable = False
+    return array
+
+
+def _reverse_indices(directions: np.ndarray) -> np.ndarray[np.int32]:
+    return np.argmax(np.all(directions[:, np.newaxis] == -directions[np.newaxis, :], axis=-1), axis=1).astype(np.int32)
+
+
+def _d3q19_map(directions: np.ndarray) -> np.ndarray[np.ndarray[np.float64]]:
+    '''
+    Returns the (Q, 19) matrix that maps D3Q19 populations onto the directions of a stencil.
+
+    The planar stencil is D2Q9, whose projection D2Q9DirectionProvider.get_d3q19_projection sums every D3Q19
+    direction into the direction of its x and y components. Otherwise a D3Q19 direction the stencil has is kept, and
+    one it lacks is split equally among the stencil directions that complete it, e.g. the D3Q15 corners (1, 1, ±1)
+    share the edge (1, 1, 0). Both keep the mass and the momentum of the populations.
+    '''
+    d3q19_directions = d3q19Tables.DIRECTIONS
+
+    if not np.any(directions[:, 2]):
+        if not np.array_equal(directions, D2Q9DirectionProvider.get_all_directions()):
+            raise ValueError("The only planar stencil is D2Q9, with the directions of D2Q9DirectionProvider.")
+
+        return D2Q9DirectionProvider.get_d3q19_projection()
+
+    d3q19_map = np.zeros((len(directions), len(d3q19_directions)))
+    for k, d3q19_direction in enumerate(d3q19_directions):
+        matches = np.all(directions == d3q19_direction, axis=-1)
+        if not np.any(matches):
+            free_axes = d3q19_direction == 0
+            matches = np.all((directions == d3q19_direction) | (free_axes & (directions != 0)), axis=-1)
+        d3q19_map[matches, k] = 1 / np.count_nonzero(matches)
+
+    return d3q19_map
+
+
+@dataclass(frozen=True, eq=False)
+class LatticeStencil:
+    '''
+    The velocity set of a lattice: the integer directions with shape (Q, 3), the index of the reverse of every
+    direction, the equilibrium weights and the mapping of D3Q19 populations, in which initial states are given.
+
+    boundary_multiplicities is the number of D3Q19 directions every direction stands for in the constant velocity
+    boundary, see ConstantVelocityBoundaryCoefficients. The constant velocity closure is derived for D3Q19 and is used
+    unchanged on the other three dimensional stencils.
+
+    The arrays are read-only, so one stencil is shared by every fluid that uses it.
+    '''
+    name: str
+    directions: np.ndarray
+    weights: np.ndarray
+    boundary_multiplicities: np.ndarray
+    reverse_indices: np.ndarray = field(init=False)
+    d3q19_map: np.ndarray = field(init=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "directions", _read_only(np.asarray(self.directions, dtype=np.float64)))
+        object.__setattr__(self, "weights", _read_only(np.asarray(self.weights, dtype=np.float64)))
+        object.__setattr__(self, "boundary_multiplicities",
+                           _read_only(np.asarray(self.boundary_multiplicities, dtype=np.float64)))
+        object.__setattr__(self, "reverse_indices", _read_only(_reverse_indices(self.directions)))
+        object.__setattr__(self, "d3q19_map", _read_only(_d3q19_map(self.directions)))
+
+    @property
+    def populations_count(self) -> int:
+        return len(self.directions)
+
+    @property
+    def is_planar(self) -> bool:
+        return not np.any(self.directions[:, 2])
+
+    def from_d3q19(self, populations: np.ndarray) -> np.ndarray:
+        '''
+        Maps D3Q19 populations with 19 values on the last axis onto the directions of the stencil.
+        '''
+        return populations @ self.d3q19_map.T
+
+    def streaming_plan(self, shape: tuple[int, int, int], direction_major: bool) -> list[tuple[tuple, tuple]]:
+        return get_streaming_plan(shape, self.directions, direction_major)
+
+
+def _corner_directions() -> list[list[int]]:
+    '''
+    The 8 corners (±1, ±1, ±1), numbered like the D3Q19 diagonals, so that the reverse of corner k is corner 7 - k.
+    '''
+    return [[(k % 2) * 2 - 1, ((k // 2) % 2) * 2 - 1, (k // 4) * 2 - 1] for k in range(8)]
+
+
+def _build_stencils() -> dict[str, LatticeStencil]:
+    d3q19_directions = d3q19Tables.DIRECTIONS
+
+    stencils = (
+        LatticeStencil("D2Q9", D2Q9DirectionProvider.get_all_directions(), D2Q9DirectionProvider.get_weights(),
+                       D2Q9DirectionProvider.get_boundary_multiplicities()),
+        LatticeStencil("D3Q15", np.concatenate([d3q19_directions[:7], _corner_directions()]),
+                       [2 / 9] + [1 / 9] * 6 + [1 / 72] * 8, np.ones(15)),
+        LatticeStencil("D3Q19", d3q19_directions, d3q19Tables.WEIGHTS, np.ones(19)),
+        LatticeStencil("D3Q27", np.concatenate([d3q19_directions, _corner_directions()]),
+                       [8 / 27] + [2 / 27] * 6 + [1 / 54] * 12 + [1 / 216] * 8, np.ones(27)),
+    )
+
+    stencils_by_name = {stencil.name: stencil for stencil in stencils}
+
+    return {name: stencils_by_name[name] for name in SimulationParameters.STENCILS}
+
+
+STENCILS = _build_stencils()
+
+
+def get_stencil(name: str) -> LatticeStencil:
+    if name not in STENCILS:
+        raise ValueError(f"Invalid stencil: {name}. Available stencils: {', '.join(STENCILS)}.")
+
+    return STENCILS[name]
+
+
+def default_stencil_name(lattice_dimensions: tuple[int, int, int]) -> str:
+    '''
+    A lattice one cell deep uses D2Q9, every other lattice D3Q19.
+    '''
+    return "D2Q9" if lattice_dimensions[2] == 1 else "D3Q19"
+
+
+def stencil_for_populations_count(populations_count: int) -> LatticeStencil:
+    for stencil in STENCILS.values():
+        if stencil.populations_count == populations_count:
+            return stencil
+
+    raise ValueError(f"No stencil has {populations_count} populations.")
@@ -0,0 +1,60 @@
+from dataclasses import dataclass
+from .boltzmannFluid import BoltzmannFluid
+
+
+@dataclass
+class MassDriftSample:
+    step: int
+    mass: float
+    reference_mass: float
+
+    @property
+    def relative_drift(self) -> float:
+        if self.reference_mass == 0:
+            return abs(self.mass)
+
+        return abs(self.mass - self.reference_mass) / abs(self.reference_mass)
+
+
+class MassDriftMonitor:
+    '''
+    Steps a fluid next to a float64 reference fluid built from the same configuration and compares their total mass.
+    A reduced precision run is considered safe for a scenario while the relative mass drift stays below the tolerance.
+    '''
+    def __init__(self, fluid: BoltzmannFluid, reference_fluid: BoltzmannFluid, tolerance: float = 1e-4) -> None:
+        self._fluid = fluid
+        self._reference_fluid = reference_fluid
+        self._tolerance = tolerance
+        self._steps_count = 0
+        self.samples: list[MassDriftSample] = [self._sample()]
+
+    def _sample(self) -> MassDriftSample:
+        return MassDriftSample(self._steps_count, self._fluid.total_mass(), self._reference_fluid.total_mass())
+
+    def step(self) -> MassDriftSample:
+        self._fluid.simulation_step()
+        self._reference_fluid.simulation_step()
+        self._steps_count += 1
+
+        sample = self._sample()
+        self.samples.append(sample)
+
+        return sample
+
+    def run(self, number_of_steps: int) -> list[MassDriftSample]:
+        for _ in range(number_of_steps):
+            self.step()
+
+        return self.samples
+
+    def max_relative_drift(self) -> float:
+        return max(sample.relative_drift for sample in self.samples)
+
+    def is_within_tolerance(self) -> bool:
+        return self.max_relative_drift() <= self._tolerance
+
+    def report(self) -> str:
+        verdict = "safe" if self.is_within_tolerance() else "unsafe"
+
+        return f"Mass drift after {self._steps_count} steps: max relative drift {self.max_relative_drift():.3e} " \
+               f"(tolerance {self._tolerance:.1e}), reduced precision is {verdict} for this scenario."
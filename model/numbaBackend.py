@@ -0,0 +1,269 @@
+import numpy as np
+from numba import njit, prange
+from .boltzmannFluidUtils import BoltzmannFluidState
+from .boundaryConditions import NoSlipBoundaryConditions, ConstantVelocityBoundaryConditions
+from .computeBackend import ComputeBackend
+from .equilibriumFluidSolver import EquilibriumWeights
+from .phaseTimer import PhaseTimer
+from utilities.DTO.simulationParameters import SimulationParameters
+
+
+# The kernels index the populations as (x, y, z, direction). A direction-major state is passed as a strided view,
+# and the outer loop runs in parallel over the x slabs of the lattice.
+
+@njit(cache=True)
+def _cell_equilibrium(density, velocity_x, velocity_y, velocity_z, directions, weights, speed_of_sound, i):
+    velocity_dot_direction = velocity_x * directions[i, 0] + velocity_y * directions[i, 1] \
+        + velocity_z * directions[i, 2]
+    velocity_squared = velocity_x * velocity_x + velocity_y * velocity_y + velocity_z * velocity_z
+    speed_of_sound_squared = speed_of_sound * speed_of_sound
+
+    return weights[i] * density * (1 + 3 * velocity_dot_direction / speed_of_sound
+                                   + 9 * velocity_dot_direction * velocity_dot_direction
+                                   / (2 * speed_of_sound_squared)
+                                   - 3 * velocity_squared / (2 * speed_of_sound_squared))
+
+
+@njit(parallel=True, cache=True)
+def _density_kernel(populations, density):
+    w_x, w_y, w_z, populations_count = populations.shape
+    for x in prange(w_x):
+        for y in range(w_y):
+            for z in range(w_z):
+                cell_density = 0.0
+                for i in range(populations_count):
+                    cell_density += populations[x, y, z, i]
+                density[x, y, z] = cell_density
+
+
+@njit(parallel=True, cache=True)
+def _velocity_kernel(populations, density, directions, speed_of_sound, velocity):
+    w_x, w_y, w_z, populations_count = populations.shape
+    for x in prange(w_x):
+        for y in range(w_y):
+            for z in range(w_z):
+                cell_density = density[x, y, z]
+                if cell_density == 0:
+                    cell_density = 1.0
+                for w in range(3):
+                    momentum = 0.0
+                    for i in range(populations_count):
+                        momentum += populations[x, y, z, i] * directions[i, w]
+                    velocity[x, y, z, w] = momentum * speed_of_sound / cell_density
+
+
+@njit(parallel=True, cache=True)
+def _equilibrium_kernel(density, velocity, directions, weights, speed_of_sound, equilibrium):
+    w_x, w_y, w_z, populations_count = equilibrium.shape
+    for x in prange(w_x):
+        for y in range(w_y):
+            for z in range(w_z):
+                for i in range(populations_count):
+                    equilibrium[x, y, z, i] = _cell_equilibrium(density[x, y, z], velocity[x, y, z, 0],
+                                                                velocity[x, y, z, 1], velocity[x, y, z, 2],
+                                                                directions, weights, speed_of_sound, i)
+
+
+@njit(parallel=True, cache=True)
+def _relax_kernel(populations, equilibrium, relaxation_time):
+    w_x, w_y, w_z, populations_count = populations.shape
+    for x in prange(w_x):
+        for y in range(w_y):
+            for z in range(w_z):
+                for i in range(populations_count):
+                    populations[x, y, z, i] -= (populations[x, y, z, i] - equilibrium[x, y, z, i]) / relaxation_time
+
+
+@njit(parallel=True, cache=True)
+def _stream_kernel(populations, streamed_populations, integer_directions):
+    w_x, w_y, w_z, populations_count = populations.shape
+    for x in prange(w_x):
+        for y in range(w_y):
+            for z in range(w_z):
+                for i in range(populations_count):
+                    target_x = (x + integer_directions[i, 0] + w_x) % w_x
+                    target_y = (y + integer_directions[i, 1] + w_y) % w_y
+                    target_z = (z + integer_directions[i, 2] + w_z) % w_z
+                    streamed_populations[target_x, target_y, target_z, i] = populations[x, y, z, i]
+
+
+@njit(parallel=True, cache=True)
+def _collide_and_stream_kernel(populations, streamed_populations, directions, integer_directions, weights,
+                               speed_of_sound, relaxation_time):
+    '''
+        Moments, equilibrium, relaxation and streaming of one cell in a single pass. Every population is pushed to
+        its neighbour, so each destination is written exactly once and the x slabs can run in parallel.
+    '''
+    w_x, w_y, w_z, populations_count = populations.shape
+    for x in prange(w_x):
+        for y in range(w_y):
+            for z in range(w_z):
+                cell_density = 0.0
+                momentum_x = 0.0
+                momentum_y = 0.0
+                momentum_z = 0.0
+                for i in range(populations_count):
+                    population = populations[x, y, z, i]
+                    cell_density += population
+                    momentum_x += population * directions[i, 0]
+                    momentum_y += population * directions[i, 1]
+                    momentum_z += population * directions[i, 2]
+
+                density_divisor = cell_density if cell_density != 0 else 1.0
+                velocity_x = momentum_x * speed_of_sound / density_divisor
+                velocity_y = momentum_y * speed_of_sound / density_divisor
+                velocity_z = momentum_z * speed_of_sound / density_divisor
+
+                for i in range(populations_count):
+                    equilibrium = _cell_equilibrium(cell_density, velocity_x, velocity_y, velocity_z,
+                                                    directions, weights, speed_of_sound, i)
+                    population = populations[x, y, z, i]
+
+                    target_x = (x + integer_directions[i, 0] + w_x) % w_x
+                    target_y = (y + integer_directions[i, 1] + w_y) % w_y
+                    target_z = (z + integer_directions[i, 2] + w_z) % w_z
+                    streamed_populations[target_x, target_y, target_z, i] = \
+                        population - (population - equilibrium) / relaxation_time
+
+
+@njit(cache=True)
+def _no_slip_kernel(flat_populations, source_indices, target_indices, wall_surface_indices):
+    bounced_populations = np.empty(len(source_indices), dtype=flat_populations.dtype)
+    for link in range(len(source_indices)):
+        bounced_populations[link] = flat_populations[source_indices[link]]
+    for index in wall_surface_indices:
+        flat_populations[index] = 0
+    for link in range(len(target_indices)):
+        flat_populations[target_indices[link]] += bounced_populations[link]
+
+
+@njit(cache=True)
+def _constant_velocity_kernel(flat_populations, population_indices, normal_vectors_dot_directions,
+                              partial_coefficients, outgoing_mask, velocity_coefficients, boundary_multiplicities,
+                              directions, link_cells, link_directions, link_target_indices):
+    '''
+        The same computation as ConstantVelocityBoundaryCoefficients.link_terms, one boundary cell at a time.
+    '''
+    cells_count, populations_count = population_indices.shape
+    link_terms = np.empty(len(link_cells), dtype=flat_populations.dtype)
+    density = np.zeros(cells_count)
+    weighted_sum = np.zeros((cells_count, 3))
+    normal_weighted_sum = np.zeros(cells_count)
+
+    for cell in range(cells_count):
+        for i in range(populations_count):
+            population = flat_populations[population_indices[cell, i]]
+            density[cell] += population
+            if outgoing_mask[cell, i]:
+                weighted_population = population * partial_coefficients[cell, i]
+                for w in range(3):
+                    weighted_sum[cell, w] += weighted_population * directions[i, w]
+                normal_weighted_sum[cell] += weighted_population * normal_vectors_dot_directions[cell, i]
+
+    for link in range(len(link_cells)):
+        cell = link_cells[link]
+        i = link_directions[link]
+        weighted_sum_dot_direction = weighted_sum[cell, 0] * directions[i, 0] \
+            + weighted_sum[cell, 1] * directions[i, 1] + weighted_sum[cell, 2] * directions[i, 2]
+        link_terms[link] = flat_populations[population_indices[cell, i]] \
+            - density[cell] * velocity_coefficients[cell, i] \
+            + 0.5 * boundary_multiplicities[i] * (weighted_sum_dot_direction
+                                                  - normal_vectors_dot_directions[cell, i] * normal_weighted_sum[cell])
+
+    for cell in range(cells_count):
+        for i in range(populations_count):
+            flat_populations[population_indices[cell, i]] = 0
+    for link in range(len(link_cells)):
+        flat_populations[link_target_indices[link]] += link_terms[link]
+
+
+class NumbaBackend(ComputeBackend):
+    '''
+    JIT-compiled CPU backend. The collision and streaming run as one loop-fused kernel over two ping-pong buffers,
+    multi-threaded over the x slabs, and the boundaries loop over the same cached links as the NumPy handlers.
+    The kernels are compiled on the first call and cached on disk.
+    '''
+    NAME = "numba"
+
+    def __init__(self, shape: tuple[int, int, int], allowed_velocities: np.ndarray[np.ndarray[np.float64]],
+                 equilibrium_weights: EquilibriumWeights, simulation_params: SimulationParameters,
+                 direction_major: bool = False) -> None:
+        super().__init__(shape, allowed_velocities, equilibrium_weights, simulation_params, direction_major)
+        populations_count = allowed_velocities.shape[0]
+        state_shape = (populations_count,) + shape if direction_major else shape + (populations_count,)
+
+        self._directions = np.ascontiguousarray(allowed_velocities, dtype=np.float64)
+        self._integer_directions = np.ascontiguousarray(allowed_velocities, dtype=np.int64)
+        self._weights = equilibrium_weights.weights.astype(np.float64)
+        self._scratch_state = np.zeros(state_shape, dtype=simulation_params.dtype)
+
+    def _cell_view(self, matrix: np.ndarray) -> np.ndarray:
+        return np.moveaxis(matrix, 0, -1) if self._direction_major else matrix
+
+    def _contiguous_state(self, fluid_state: BoltzmannFluidState) -> np.ndarray:
+        if not fluid_state.fluid_state.flags.c_contiguous:
+            fluid_state.fluid_state = np.ascontiguousarray(fluid_state.fluid_state)
+
+        return fluid_state.fluid_state
+
+    def density(self, fluid_state: BoltzmannFluidState) -> np.ndarray:
+        density = np.zeros(self._shape, dtype=fluid_state.fluid_state.dtype)
+        _density_kernel(fluid_state.cell_populations(), density)
+
+        return density
+
+    def velocity(self, fluid_state: BoltzmannFluidState, density: np.ndarray) -> np.ndarray:
+        velocity = np.zeros(self._shape + (3,), dtype=fluid_state.fluid_state.dtype)
+        _velocity_kernel(fluid_state.cell_populations(), density, self._directions,
+                         self._simulation_params.speed_of_sound, velocity)
+
+        return velocity
+
+    def equilibrium(self, density: np.ndarray, velocity: np.ndarray) -> np.ndarray:
+        equilibrium = np.zeros_like(self._scratch_state)
+        _equilibrium_kernel(density, velocity, self._directions, self._weights,
+                            self._simulation_params.speed_of_sound, self._cell_view(equilibrium))
+
+        return equilibrium
+
+    def relax(self, fluid_state: BoltzmannFluidState, equilibrium: np.ndarray) -> None:
+        _relax_kernel(fluid_state.cell_populations(), self._cell_view(equilibrium),
+                      self._simulation_params.relaxation_time)
+
+    def stream(self, fluid_state: BoltzmannFluidState) -> None:
+        fluid_state_matrix = self._contiguous_state(fluid_state)
+        _stream_kernel(self._cell_view(fluid_state_matrix), self._cell_view(self._scratch_state),
+                       self._integer_directions)
+
+        fluid_state.fluid_state, self._scratch_state = self._scratch_state, fluid_state_matrix
+
+    def use_scratch_state(self, scratch_state: np.ndarray) -> None:
+        self._scratch_state = scratch_state
+
+    def collide_and_stream(self, fluid_state: BoltzmannFluidState) -> None:
+        fluid_state_matrix = self._contiguous_state(fluid_state)
+        _collide_and_stream_kernel(self._cell_view(fluid_state_matrix), self._cell_view(self._scratch_state),
+                                   self._directions, self._integer_directions, self._weights,
+                                   self._simulation_params.speed_of_sound, self._simulation_params.relaxation_time)
+
+        fluid_state.fluid_state, self._scratch_state = self._scratch_state, fluid_state_matrix
+
+    def profiled_collide_and_stream(self, fluid_state: BoltzmannFluidState, phase_timer: PhaseTimer) -> None:
+        phase_timer.start()
+        self.collide_and_stream(fluid_state)
+        phase_timer.lap("collide_stream")
+
+    def process_no_slip(self, boundary_conditions: NoSlipBoundaryConditions,
+                        fluid_state: BoltzmannFluidState) -> None:
+        links = boundary_conditions.get_links(fluid_state)
+        _no_slip_kernel(fluid_state.flat_populations(), links.source_indices, links.target_indices,
+                        links.wall_surface_indices)
+
+    def process_constant_velocity(self, boundary_conditions: ConstantVelocityBoundaryConditions,
+                                  fluid_state: BoltzmannFluidState) -> None:
+        coefficients = boundary_conditions.get_coefficients(fluid_state)
+        _constant_velocity_kernel(fluid_state.flat_populations(), coefficients.population_indices,
+                                  coefficients.normal_vectors_dot_directions, coefficients.partial_coefficients,
+                                  coefficients.outgoing_mask, coefficients.velocity_coefficients,
+                                  coefficients.boundary_multiplicities, self._directions, coefficients.link_cells,
+                                  coefficients.link_directions, coefficients.link_target_indices)
@@ -0,0 +1,33 @@
+import time
+
+
+class PhaseTimer:
+    '''
+    Accumulates the wall-clock time of the phases of simulation steps. The profiled step methods call start before
+    the first phase and lap after every phase, which adds the time since the previous call to that phase.
+
+    Kernels that cannot separate their phases report them together, as "collide_stream" for the numba backend.
+    The sparse kernel bounces back in its streaming table, so its no-slip time is part of "stream".
+    '''
+    PHASES = ("moments", "equilibrium", "collide", "stream", "collide_stream", "no_slip", "constant_velocity")
+
+    def __init__(self) -> None:
+        self.totals = dict.fromkeys(PhaseTimer.PHASES, 0.0)
+        self._last_time = 0.0
+
+    def start(self) -> None:
+        self._last_time = time.perf_counter()
+
+    def lap(self, phase: str) -> None:
+        current_time = time.perf_counter()
+        self.totals[phase] += current_time - self._last_time
+        self._last_time = current_time
+
+    def reset(self) -> dict[str, float]:
+        '''
+        Returns the accumulated times and starts accumulating from zero.
+        '''
+        totals = self.totals
+        self.totals = dict.fromkeys(PhaseTimer.PHASES, 0.0)
+
+        return totals
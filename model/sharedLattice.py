@@ -0,0 +1,118 @@
+import os
+from dataclasses import dataclass, replace
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+
+
+@dataclass(frozen=True)
+class SharedLatticeHandle:
+    '''
+    Everything another process needs to attach to a SharedLatticeBuffer. The buffer lives in the named shared memory
+    block, or in the memory-mapped file at path when it is set.
+    '''
+    name: str
+    shape: tuple
+    dtype: str
+    direction_major: bool
+    path: str = None
+
+
+class SharedLatticeBuffer:
+    '''
+    Two lattice sized slots in one shared memory block or memory-mapped file, after a small header that holds the
+    index of the slot with the latest published state and the number of publications.
+
+    The writer steps in one slot and publishes it, and the next step writes to the other slot, so a reader that
+    takes the current slot sees a complete state for at least one step. Readers that need it for longer should copy.
+    '''
+    SLOTS = 2
+    _HEADER_SIZE = 64
+
+    def __init__(self, handle: SharedLatticeHandle, create: bool = False, read_only: bool = False) -> None:
+        slot_size = int(np.prod(handle.shape)) * np.dtype(handle.dtype).itemsize
+        size = self._HEADER_SIZE + self.SLOTS * slot_size
+
+        self.handle = handle
+        self._shared_memory = None
+        if handle.path is not None:
+            mode = "w+" if create else ("r" if read_only else "r+")
+            buffer = np.memmap(handle.path, dtype=np.uint8, mode=mode, shape=(size,))
+        else:
+            self._shared_memory = shared_memory.SharedMemory(name=handle.name, create=create, size=size if create
+                                                             else 0)
+            if create:
+                self.handle = replace(handle, name=self._shared_memory.name)
+            elif os.name == "posix":
+                # Opening the block registers it with the resource tracker of this process, which unlinks it when
+                # the process exits. Only the process that created the block may remove it.
+                resource_tracker.unregister(self._shared_memory._name, "shared_memory")
+            buffer = np.ndarray((size,), dtype=np.uint8, buffer=self._shared_memory.buf)
+
+        self._header = buffer[:self._HEADER_SIZE].view(np.int64)
+        self._slots = [buffer[self._HEADER_SIZE + i * slot_size:self._HEADER_SIZE + (i + 1) * slot_size]
+                       .view(handle.dtype).reshape(handle.shape) for i in range(self.SLOTS)]
+
+        if read_only:
+            for slot in self._slots:
+                slot.flags.writeable = False
+
+    @staticmethod
+    def create(shape: tuple, dtype: np.dtype, direction_major: bool, path: str = None) -> 'SharedLatticeBuffer':
+        '''
+        Allocates a new buffer, in a named shared memory block or, with path, in a memory-mapped file.
+        '''
+        return SharedLatticeBuffer(SharedLatticeHandle(path, tuple(shape), np.dtype(dtype).str, direction_major, path),
+                                   create=True)
+
+    @staticmethod
+    def attach(handle: SharedLatticeHandle) -> 'SharedLatticeBuffer':
+        '''
+        Attaches read-only to a buffer created in another process.
+        '''
+        return SharedLatticeBuffer(handle, read_only=True)
+
+    def slot(self, index: int) -> np.ndarray:
+        return self._slots[index]
+
+    def current_slot_index(self) -> int:
+        return int(self._header[0])
+
+    def publications_count(self) -> int:
+        return int(self._header[1])
+
+    def current_state(self) -> np.ndarray:
+        return self._slots[self.current_slot_index()]
+
+    def publish(self, fluid_state_matrix: np.ndarray) -> np.ndarray:
+        '''
+        Makes the given state the current one and returns the slot that holds it. A state that is not in one of the
+        slots is copied to the slot that is not current.
+        '''
+        for index, slot in enumerate(self._slots):
+            if np.may_share_memory(slot, fluid_state_matrix):
+                break
+        else:
+            index = 1 - self.current_slot_index()
+            np.copyto(self._slots[index], fluid_state_matrix)
+
+        self._header[0] = index
+        self._header[1] += 1
+
+        return self._slots[index]
+
+    def close(self) -> None:
+        self._header = None
+        self._slots = []
+        if self._shared_memory is not None:
+            self._shared_memory.close()
+
+    def unlink(self) -> None:
+        '''
+        Removes the shared memory block. Memory-mapped files are left for the caller.
+        '''
+        if self._shared_memory is not None:
+            if os.name == "posix":
+                # Readers that share the resource tracker of this process, such as spawned workers, have removed
+                # the block from it when they attached, and unlink expects it to be registered.
+                resource_tracker.register(self._shared_memory._name, "shared_memory")
+            self._shared_memory.unlink()
@@ -0,0 +1,141 @@
+import numpy as np
+from .boltzmannFluidUtils import BoltzmannFluidState
+from .boundaryConditions import NoSlipBoundaryConditions, ConstantVelocityBoundaryConditions
+from .equilibriumFluidSolver import EquilibriumWeights
+from .fusedCollideStream import FusedCollisionKernel
+from .phaseTimer import PhaseTimer
+from utilities.DTO.simulationParameters import SimulationParameters
+
+
+class SparseLatticeKernel:
+    '''
+    Steps only the cells that are not covered by a no-slip boundary, using indirect addressing.
+
+    The populations of the active cells are stored direction-major in a compact matrix of shape (Q, cells).
+    The fluid-cell index list and the streaming table are computed once from the boundary masks:
+    for every direction and active cell the table holds the flat index of the population that streams into it,
+    which is the same direction of the upstream cell, or the reverse direction of the cell itself when the upstream
+    cell is a no-slip wall (bounce-back). Streaming is then a single gather.
+    Constant velocity cells stay active, since fluid streams into them before the boundary is applied.
+    '''
+    def __init__(self, fluid_state: BoltzmannFluidState, no_slip_boundary_conditions: NoSlipBoundaryConditions,
+                 constant_velocity_boundary_conditions: ConstantVelocityBoundaryConditions,
+                 equilibrium_weights: EquilibriumWeights, simulation_params: SimulationParameters) -> None:
+        allowed_velocities = fluid_state.allowed_velocities
+        populations_count = allowed_velocities.shape[0]
+
+        self._shape = fluid_state.lattice_shape()
+        self._allowed_velocities = allowed_velocities
+        self._direction_major = fluid_state.direction_major
+        self._dtype = fluid_state.fluid_state.dtype
+
+        self.active_cells = ~no_slip_boundary_conditions.affected_cells
+        self.cells_count = int(np.count_nonzero(self.active_cells))
+
+        cell_indices = np.full(self._shape, -1, dtype=np.int64)
+        cell_indices[self.active_cells] = np.arange(self.cells_count)
+        upstream_indices = self._get_upstream_indices(cell_indices)
+        self._cell_indices = cell_indices
+
+        index_dtype = np.int32 if populations_count * self.cells_count < np.iinfo(np.int32).max else np.int64
+        reverse_indices = no_slip_boundary_conditions.reverse_direction_indeces
+        own_indices = np.arange(self.cells_count)
+        self._streaming_indices = np.where(upstream_indices >= 0,
+                                           np.arange(populations_count)[:, np.newaxis] * self.cells_count
+                                           + upstream_indices,
+                                           reverse_indices[:, np.newaxis] * self.cells_count + own_indices) \
+            .astype(index_dtype).reshape(-1)
+
+        self._init_constant_velocity_cells(constant_velocity_boundary_conditions, cell_indices)
+
+        self._populations = np.ascontiguousarray(fluid_state.populations()[:, self.active_cells], dtype=self._dtype)
+        self._scratch = np.zeros_like(self._populations)
+        self._collision_kernel = FusedCollisionKernel(self.cells_count, allowed_velocities, equilibrium_weights,
+                                                      simulation_params, direction_major=True)
+
+    def _get_upstream_indices(self, cell_indices: np.ndarray) -> np.ndarray:
+        '''
+            Returns a (Q, cells) matrix with the compact index of the cell at position - e_i for every active cell,
+            or -1 when that cell is a no-slip wall. The lattice is periodic, as with np.roll in the dense kernels.
+        '''
+        upstream_indices = np.zeros((self._allowed_velocities.shape[0], self.cells_count), dtype=np.int64)
+
+        for i, dr in enumerate(self._allowed_velocities):
+            dx, dy, dz = dr.astype(np.int32)
+            upstream_indices[i] = np.roll(cell_indices, (dx, dy, dz), axis=(0, 1, 2))[self.active_cells]
+
+        return upstream_indices
+
+    def _init_constant_velocity_cells(self, constant_velocity_boundary_conditions: ConstantVelocityBoundaryConditions,
+                                      cell_indices: np.ndarray) -> None:
+        '''
+            Maps the links of the constant velocity boundary to the compact populations. A boundary cell covered by a
+            no-slip wall holds no fluid, and a link into a no-slip wall is dropped.
+        '''
+        coefficients = constant_velocity_boundary_conditions.get_coefficients()
+        populations_count = self._allowed_velocities.shape[0]
+        flat_cell_indices = cell_indices.reshape(-1)
+
+        boundary_cell_indices = flat_cell_indices[coefficients.cells]
+        self._boundary_coefficients = coefficients
+        self._active_boundary_rows = boundary_cell_indices >= 0
+        self._boundary_population_indices = np.arange(populations_count)[np.newaxis, :] * self.cells_count \
+            + boundary_cell_indices[self._active_boundary_rows, np.newaxis]
+
+        link_target_cell_indices = flat_cell_indices[coefficients.link_target_cells]
+        self._boundary_link_mask = self._active_boundary_rows[coefficients.link_cells] & (link_target_cell_indices >= 0)
+        self._boundary_link_target_indices = coefficients.link_target_directions[self._boundary_link_mask] \
+            * self.cells_count + link_target_cell_indices[self._boundary_link_mask]
+
+    def _process_constant_velocity_cells(self) -> None:
+        if len(self._boundary_coefficients.cells) == 0:
+            return
+
+        flat_populations = self._populations.reshape(-1)
+        boundary_populations = np.zeros(self._boundary_coefficients.outgoing_mask.shape, dtype=self._dtype)
+        boundary_populations[self._active_boundary_rows] = flat_populations[self._boundary_population_indices]
+
+        link_terms = self._boundary_coefficients.link_terms(boundary_populations)
+        flat_populations[self._boundary_population_indices] = 0
+        flat_populations[self._boundary_link_target_indices] += link_terms[self._boundary_link_mask]
+
+    def simulation_step(self) -> None:
+        self._collision_kernel.collide(self._populations, self._scratch)
+        np.take(self._populations.reshape(-1), self._streaming_indices, out=self._scratch.reshape(-1))
+        self._populations, self._scratch = self._scratch, self._populations
+
+        self._process_constant_velocity_cells()
+
+    def profiled_simulation_step(self, phase_timer: PhaseTimer) -> None:
+        phase_timer.start()
+        self._collision_kernel.profiled_collide(self._populations, self._scratch, phase_timer)
+        np.take(self._populations.reshape(-1), self._streaming_indices, out=self._scratch.reshape(-1))
+        self._populations, self._scratch = self._scratch, self._populations
+        phase_timer.lap("stream")
+
+        self._process_constant_velocity_cells()
+        phase_timer.lap("constant_velocity")
+
+    def total_mass(self) -> float:
+        return float(np.sum(self._populations, dtype=np.float64))
+
+    def max_population(self) -> float:
+        return float(np.max(self._populations)) if self.cells_count > 0 else 0.0
+
+    def to_boltzmann_state(self) -> BoltzmannFluidState:
+        fluid_state = BoltzmannFluidState(self._shape, self._allowed_velocities, self._direction_major, self._dtype)
+        fluid_state.populations()[:, self.active_cells] = self._populations
+
+        return fluid_state
+
+    def z_slice(self, z: int) -> BoltzmannFluidState:
+        '''
+        Returns the cell-major populations of the plane at z, gathering only the active cells of that plane.
+        '''
+        plane_cell_indices = self._cell_indices[:, :, z]
+        plane_active_cells = plane_cell_indices >= 0
+        fluid_state = BoltzmannFluidState(self._shape[:2] + (1,), self._allowed_velocities, dtype=self._dtype)
+        fluid_state.fluid_state[:, :, 0][plane_active_cells] = \
+            self._populations[:, plane_cell_indices[plane_active_cells]].T
+
+        return fluid_state
@@ -0,0 +1,187 @@
+import os
+import re
+import numpy as np
+
+
+# Voxel occupancy files hold one flag per cell of the lattice, in C order over (x, y, z), without a header; the
+# lattice shape comes from the configuration. A ".bits" file packs 8 cells per byte, most significant bit first, as
+# np.packbits does. A ".rle" file holds little-endian uint32 run lengths, alternating between empty and solid cells
+# and starting with empty cells, so a lattice that starts solid starts with a run of 0. Both are memory-mapped and
+# decoded in bulk, so a mask of any complexity loads in a few passes over the file.
+VOXEL_FORMATS = (".bits", ".rle")
+MESH_FORMATS = (".stl",)
+
+STL_TRIANGLE_DTYPE = np.dtype([("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")])
+STL_HEADER_BYTES = 84
+
+# The rays of the voxelisation pass the cell centres at this offset, so that they do not hit the edges and vertices of
+# meshes built on the lattice, which would count a crossing twice.
+RAY_OFFSET = np.array([1.2345e-6, 2.3456e-6])
+# Upper bound on the (triangle, column) pairs tested at once, which bounds the temporary memory of the voxelisation.
+VOXELISE_CHUNK_PAIRS = 1 << 22
+
+
+def _cells_count(shape: tuple[int, int, int]) -> int:
+    return int(np.prod(shape))
+
+
+def read_voxel_mask(path: str, shape: tuple[int, int, int]) -> np.ndarray[bool]:
+    '''
+    Reads a ".bits" or ".rle" occupancy file into a boolean mask of the given lattice shape.
+    '''
+    extension = os.path.splitext(path)[1].lower()
+    cells_count = _cells_count(shape)
+
+    if extension == ".bits":
+        packed_cells = np.memmap(path, dtype=np.uint8, mode="r")
+        if len(packed_cells) != (cells_count + 7) // 8:
+            raise ValueError(f"{path} holds {len(packed_cells)} bytes, but a {shape} lattice needs "
+                             f"{(cells_count + 7) // 8}.")
+
+        return np.unpackbits(packed_cells, count=cells_count).view(bool).reshape(shape)
+
+    if extension == ".rle":
+        run_lengths = np.memmap(path, dtype="<u4", mode="r")
+        runs_cells_count = int(np.sum(run_lengths, dtype=np.int64))
+        if runs_cells_count != cells_count:
+            raise ValueError(f"The runs of {path} cover {runs_cells_count} cells, but a {shape} lattice has "
+                             f"{cells_count}.")
+
+        return np.repeat(np.arange(len(run_lengths)) % 2 == 1, run_lengths).reshape(shape)
+
+    raise ValueError(f"Invalid voxel file: {path}. Supported formats: {', '.join(VOXEL_FORMATS)}.")
+
+
+def write_voxel_mask(path: str, mask: np.ndarray[bool]) -> None:
+    '''
+    Writes a boolean mask as a ".bits" or ".rle" occupancy file, see read_voxel_mask.
+    '''
+    extension = os.path.splitext(path)[1].lower()
+    flat_mask = np.ascontiguousarray(mask, dtype=bool).reshape(-1)
+
+    if extension == ".bits":
+        np.packbits(flat_mask).tofile(path)
+    elif extension == ".rle":
+        changes = np.flatnonzero(flat_mask[1:] != flat_mask[:-1]) + 1
+        run_lengths = np.diff(np.concatenate([[0], changes, [len(flat_mask)]]))
+        if len(flat_mask) > 0 and flat_mask[0]:
+            run_lengths = np.concatenate([[0], run_lengths])
+        run_lengths.astype("<u4").tofile(path)
+    else:
+        raise ValueError(f"Invalid voxel file: {path}. Supported formats: {', '.join(VOXEL_FORMATS)}.")
+
+
+def read_stl(path: str) -> np.ndarray[np.float64]:
+    '''
+    Reads the triangles of a binary or ASCII STL file as an array of shape (triangles, 3 vertices, 3).
+    '''
+    with open(path, "rb") as file:
+        header = file.read(STL_HEADER_BYTES)
+
+    file_size = os.path.getsize(path)
+    if len(header) == STL_HEADER_BYTES:
+        triangles_count = int(np.frombuffer(header[80:84], dtype="<u4")[0])
+        if file_size == STL_HEADER_BYTES + triangles_count * STL_TRIANGLE_DTYPE.itemsize:
+            triangles = np.memmap(path, dtype=STL_TRIANGLE_DTYPE, mode="r", offset=STL_HEADER_BYTES,
+                                  shape=(triangles_count,))
+            return triangles["vertices"].astype(np.float64)
+
+    if not header.lstrip().startswith(b"solid"):
+        raise ValueError(f"{path} is neither a binary nor an ASCII STL file.")
+
+    with open(path, "r") as file:
+        coordinates = re.findall(r"vertex\s+(\S+)\s+(\S+)\s+(\S+)", file.read())
+
+    return np.array(coordinates, dtype=np.float64).reshape(-1, 3, 3)
+
+
+def _column_ranges(triangles: np.ndarray, shape: tuple[int, int, int]) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Returns the first and the end column index along x and y of the cell centres within the bounding box of every
+    triangle, clipped to the lattice.
+    '''
+    projected_vertices = triangles[:, :, :2] - 0.5 - RAY_OFFSET
+    lattice_columns = np.array(shape[:2])
+    starts = np.clip(np.ceil(projected_vertices.min(axis=1)), 0, lattice_columns).astype(np.int64)
+    ends = np.clip(np.floor(projected_vertices.max(axis=1)) + 1, 0, lattice_columns).astype(np.int64)
+
+    return starts, np.maximum(ends, starts)
+
+
+def _cross_2d(u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    return u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0]
+
+
+def _crossings(triangles: np.ndarray, starts: np.ndarray, sizes: np.ndarray) -> tuple[np.ndarray, ...]:
+    '''
+    Tests every column within the bounding box of every triangle and returns the x and y index of the columns whose
+    ray crosses a triangle and the z coordinate of every crossing.
+    '''
+    pairs_counts = sizes[:, 0] * sizes[:, 1]
+    triangle_indices = np.repeat(np.arange(len(triangles)), pairs_counts)
+    pair_offsets = np.arange(len(triangle_indices)) - np.repeat(np.cumsum(pairs_counts) - pairs_counts, pairs_counts)
+
+    column_heights = sizes[triangle_indices, 1]
+    x = starts[triangle_indices, 0] + pair_offsets // column_heights
+    y = starts[triangle_indices, 1] + pair_offsets % column_heights
+
+    a, b, c = (triangles[triangle_indices, vertex] for vertex in range(3))
+    point = np.stack([x, y], axis=-1) + 0.5 + RAY_OFFSET
+
+    area = _cross_2d(b[:, :2] - a[:, :2], c[:, :2] - a[:, :2])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weight_a = _cross_2d(b[:, :2] - point, c[:, :2] - point) / area
+        weight_b = _cross_2d(c[:, :2] - point, a[:, :2] - point) / area
+    weight_c = 1 - weight_a - weight_b
+    crossed = (area != 0) & (weight_a >= 0) & (weight_b >= 0) & (weight_c >= 0)
+
+    z = weight_a * a[:, 2] + weight_b * b[:, 2] + weight_c * c[:, 2]
+    return x[crossed], y[crossed], z[crossed]
+
+
+def voxelise_mesh(triangles: np.ndarray, shape: tuple[int, int, int]) -> np.ndarray[bool]:
+    '''
+    Marks the cells whose centre lies inside a closed triangle mesh given in cell units, with cell (i, j, k) spanning
+    [i, i + 1) x [j, j + 1) x [k, k + 1).
+
+    A ray is cast along z through the centre of every (x, y) column and the crossings with the triangles are found for
+    all triangles at once, in chunks of bounded size. Every crossing toggles the cells above it, so the inside cells
+    are the running parity of the toggles along z.
+    '''
+    triangles = np.asarray(triangles, dtype=np.float64).reshape(-1, 3, 3)
+    toggles = np.zeros(shape, dtype=np.uint8)
+    starts, ends = _column_ranges(triangles, shape)
+    sizes = ends - starts
+    cumulative_pairs = np.cumsum(sizes[:, 0] * sizes[:, 1])
+
+    first_triangle = 0
+    while first_triangle < len(triangles):
+        pairs_before = cumulative_pairs[first_triangle - 1] if first_triangle > 0 else 0
+        end_triangle = max(int(np.searchsorted(cumulative_pairs, pairs_before + VOXELISE_CHUNK_PAIRS, side="right")),
+                           first_triangle + 1)
+        chunk = slice(first_triangle, end_triangle)
+        x, y, z = _crossings(triangles[chunk], starts[chunk], sizes[chunk])
+
+        first_cells_above = np.maximum(np.floor(z - 0.5).astype(np.int64) + 1, 0)
+        inside_lattice = first_cells_above < shape[2]
+        np.add.at(toggles, (x[inside_lattice], y[inside_lattice], first_cells_above[inside_lattice]), 1)
+        first_triangle = end_triangle
+
+    np.bitwise_and(toggles, 1, out=toggles)
+    return np.bitwise_xor.accumulate(toggles, axis=2).view(bool)
+
+
+def load_geometry(path: str, shape: tuple[int, int, int], scale: float = 1.0,
+                  offset: tuple[float, float, float] = (0.0, 0.0, 0.0)) -> np.ndarray[bool]:
+    '''
+    Loads the solid cells of a voxel occupancy file or an STL mesh. The mesh vertices are scaled by the number of cells
+    per mesh unit and then shifted by the offset in cells.
+    '''
+    extension = os.path.splitext(path)[1].lower()
+    if extension in MESH_FORMATS:
+        return voxelise_mesh(read_stl(path) * scale + np.asarray(offset, dtype=np.float64), shape)
+    if extension in VOXEL_FORMATS:
+        return read_voxel_mask(path, shape)
+
+    raise ValueError(f"Invalid geometry file: {path}. Supported formats: "
+                     f"{', '.join(VOXEL_FORMATS + MESH_FORMATS)}.")
@@ -0,0 +1,97 @@
+import queue
+import threading
+import numpy as np
+from dataclasses import dataclass
+from model.boltzmannFluid import BoltzmannFluid
+from .frameComposer import FrameComposer, VideoOutput
+
+
+@dataclass
+class FrameSnapshot:
+    '''
+    The density and velocity of one z slice of the lattice. The fluid computes them into new read-only arrays, so the
+    solver can continue while the frame is encoded.
+    '''
+    step: int
+    density_slice: np.ndarray
+    velocity_slice: np.ndarray
+
+    @staticmethod
+    def from_fluid(fluid: BoltzmannFluid, z: int, step: int) -> 'FrameSnapshot':
+        macroscopic_slice = fluid.macroscopic_slice(z)
+
+        return FrameSnapshot(step, macroscopic_slice.density, macroscopic_slice.velocity)
+
+
+class AsyncFrameEncoder:
+    '''
+    Colour maps, composes and encodes frame snapshots on a background thread, so the solver never waits on video I/O.
+
+    Snapshots go through a bounded queue. When the queue is full, submit either blocks until the encoder catches up
+    or, with drop_frames, drops the snapshot and counts it.
+    '''
+    def __init__(self, frame_composer: FrameComposer, video_output: VideoOutput, queue_size: int = 4,
+                 drop_frames: bool = False) -> None:
+        if queue_size < 1:
+            raise ValueError(f"Invalid frame queue size: {queue_size}. It must be at least 1.")
+
+        self._frame_composer = frame_composer
+        self._video_output = video_output
+        self._drop_frames = drop_frames
+        self._snapshots: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._error: BaseException = None
+        self.encoded_frames_count = 0
+        self.dropped_frames_count = 0
+
+        self._thread = threading.Thread(target=self._encode_snapshots, name="AsyncFrameEncoder", daemon=True)
+        self._thread.start()
+
+    def _encode_snapshots(self) -> None:
+        while True:
+            snapshot = self._snapshots.get()
+            if snapshot is None:
+                break
+            if self._error is not None:
+                continue
+
+            try:
+                frame, min_value, max_value = self._frame_composer.colour_frame(snapshot.density_slice,
+                                                                                snapshot.velocity_slice)
+                legend_layout = self._frame_composer.legend_layout(min_value, max_value)
+                self._video_output.write(self._frame_composer.compose(frame, legend_layout))
+                self.encoded_frames_count += 1
+            except Exception as error:
+                self._error = error
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise RuntimeError("Frame encoding failed.") from self._error
+
+    def submit(self, snapshot: FrameSnapshot) -> bool:
+        '''
+        Queues a snapshot for encoding. Returns False when the snapshot was dropped.
+        '''
+        self._raise_error()
+
+        if not self._drop_frames:
+            self._snapshots.put(snapshot)
+            return True
+
+        try:
+            self._snapshots.put_nowait(snapshot)
+        except queue.Full:
+            self.dropped_frames_count += 1
+            return False
+
+        return True
+
+    def close(self) -> None:
+        '''
+        Encodes the queued snapshots, stops the thread and releases the video.
+        '''
+        if self._thread.is_alive():
+            self._snapshots.put(None)
+            self._thread.join()
+            self._video_output.release()
+
+        self._raise_error()
@@ -0,0 +1,229 @@
+import json
+import os
+import platform
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+import numpy as np
+from model import d3q19Tables
+from model.boltzmannFluid import BoltzmannFluid
+from model.boltzmannFluidUtils import FluidDensityState, FluidVelocityState
+from model.equilibriumFluidSolver import EquilibriumFluidState, RelaxedBoltzmannFluidState
+from utilities.argsReader import BenchmarkArgs
+from utilities.DTO.D3Q19 import D3Q19ParticleFunction
+from utilities.DTO.simulationParameters import SimulationParameters
+from utilities.DTO.vector3 import Vector3Int, Vector3Float
+from utilities.DTO.boundaryConditionDTO import (
+    BoundaryCube,
+    BoundaryConditionNoSlipDelta,
+    BoundaryConditionConstantVelocityDelta,
+    BoundaryConditionInitialDelta
+)
+
+
+@dataclass
+class BenchmarkResult:
+    '''
+    The best time of one benchmark out of all repeats, the lattice updates per second it corresponds to and the
+    peak of the memory allocated during one call.
+    '''
+    name: str
+    lattice_shape: tuple[int, int, int]
+    obstacle_fraction: float
+    seconds: float
+    mlups: float
+    peak_memory_bytes: int
+
+    def key(self) -> str:
+        width, height, depth = self.lattice_shape
+        return f"{self.name}/{width}x{height}x{depth}/{self.obstacle_fraction:g}"
+
+
+class BenchmarkSuite:
+    '''
+    Times the operators of a simulation step and whole steps of every kernel over a range of lattice sizes and
+    obstacle fractions. The lattice is a channel with walls at both y edges, a constant velocity inlet at x = 0 and
+    a box obstacle in the middle that covers the given fraction of the cells.
+
+    Results can be saved as a JSON baseline and compared with one from another commit, see compare.
+    '''
+    OPERATORS = ("density", "velocity", "equilibrium", "relaxation", "streaming", "no_slip", "constant_velocity")
+    STEP_KERNELS = ("reference", "fused", "sparse")
+
+    def __init__(self, benchmark_args: BenchmarkArgs) -> None:
+        self._benchmark_args = benchmark_args
+
+    @staticmethod
+    def build_fluid(lattice_shape: tuple[int, int, int], obstacle_fraction: float, precision: str = "float64",
+                    **fluid_options) -> BoltzmannFluid:
+        if not 0 <= obstacle_fraction < 1:
+            raise ValueError(f"Invalid obstacle fraction: {obstacle_fraction}. It must be in [0, 1).")
+
+        width, height, depth = lattice_shape
+        fluid = BoltzmannFluid(lattice_shape, SimulationParameters.example_config(precision), **fluid_options)
+
+        def cube(x: int, y: int, cube_width: int, cube_height: int) -> BoundaryCube:
+            start_position = Vector3Int(x, y, 0)
+            return BoundaryCube(start_position, start_position + Vector3Int(cube_width, cube_height, depth))
+
+        fluid.update_no_slip_boundary(BoundaryConditionNoSlipDelta(cube(0, 0, width, 1)))
+        fluid.update_no_slip_boundary(BoundaryConditionNoSlipDelta(cube(0, height - 1, width, 1)))
+        if obstacle_fraction > 0:
+            obstacle_width = max(1, round(width * obstacle_fraction ** 0.5))
+            obstacle_height = max(1, round(height * obstacle_fraction ** 0.5))
+            fluid.update_no_slip_boundary(BoundaryConditionNoSlipDelta(
+                cube((width - obstacle_width) // 2, (height - obstacle_height) // 2, obstacle_width, obstacle_height)))
+        fluid.update_constant_velocity_boundary(BoundaryConditionConstantVelocityDelta(
+            cube(0, 1, 1, height - 2), Vector3Float(0.1, 0.0, 0.0), Vector3Float(1.0, 0.0, 0.0)))
+
+        fluid.update_initial_boundary(BoundaryConditionInitialDelta(
+            cube(0, 0, width, height), D3Q19ParticleFunction(list(10 * d3q19Tables.WEIGHTS))))
+        fluid.prepare_boundary_conditions()
+
+        return fluid
+
+    @staticmethod
+    def _operators(fluid: BoltzmannFluid) -> dict:
+        fluid_state = fluid.boltzmann_state()
+        simulation_params = fluid._simulation_params
+        density_state = FluidDensityState.from_boltzmann_state(fluid_state)
+        velocity_state = FluidVelocityState.from_boltzmann_state(fluid_state, density_state, simulation_params)
+        equilibrium_state = EquilibriumFluidState.from_velocities_and_densities(
+            density_state, velocity_state, fluid._equilibrium_weights, fluid._directions, simulation_params)
+        relaxed_state = RelaxedBoltzmannFluidState(fluid_state, equilibrium_state, simulation_params)
+        no_slip_boundary_conditions = fluid._no_slip_boundary_conditions
+        constant_velocity_boundary_conditions = fluid._constant_velocity_boundary_conditions
+
+        def no_slip() -> None:
+            no_slip_boundary_conditions.process_fluid_state(fluid_state)
+            no_slip_boundary_conditions.remove_fluid_from_wall_surface(fluid_state)
+
+        def constant_velocity() -> None:
+            constant_velocity_boundary_conditions.process_fluid_state(fluid_state)
+            constant_velocity_boundary_conditions.remove_fluid_from_boundary(fluid_state)
+
+        return {
+            "density": lambda: FluidDensityState.from_boltzmann_state(fluid_state),
+            "velocity": lambda: FluidVelocityState.from_boltzmann_state(fluid_state, density_state,
+                                                                        simulation_params),
+            "equilibrium": lambda: EquilibriumFluidState.from_velocities_and_densities(
+                density_state, velocity_state, fluid._equilibrium_weights, fluid._directions, simulation_params),
+            "relaxation": lambda: RelaxedBoltzmannFluidState(fluid_state, equilibrium_state, simulation_params),
+            "streaming": relaxed_state.to_next_boltzmann_state,
+            "no_slip": no_slip,
+            "constant_velocity": constant_velocity,
+        }
+
+    def _step_kernels(self) -> list[tuple[str, dict]]:
+        step_kernels = [(f"step_{kernel}", {"kernel": kernel}) for kernel in self.STEP_KERNELS]
+        try:
+            import numba  # noqa: F401
+        except ImportError:
+            return step_kernels
+
+        return step_kernels + [("step_numba", {"kernel": "fused", "backend": "numba"})]
+
+    def _measure(self, name: str, function, lattice_shape: tuple[int, int, int],
+                 obstacle_fraction: float) -> BenchmarkResult:
+        function()
+
+        seconds = float("inf")
+        for _ in range(self._benchmark_args.repeats):
+            start_time = time.perf_counter()
+            function()
+            seconds = min(seconds, time.perf_counter() - start_time)
+
+        tracemalloc.start()
+        function()
+        peak_memory_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        return BenchmarkResult(name, lattice_shape, obstacle_fraction, seconds,
+                               int(np.prod(lattice_shape)) / seconds / 1e6, peak_memory_bytes)
+
+    def _report(self, result: BenchmarkResult) -> BenchmarkResult:
+        print(f"{result.key():40s} {result.seconds * 1e3:10.3f} ms {result.mlups:10.2f} MLUPS "
+              f"{result.peak_memory_bytes / 2 ** 20:10.1f} MiB")
+
+        return result
+
+    def run(self) -> list[BenchmarkResult]:
+        precision = self._benchmark_args.precision
+        results = []
+
+        for lattice_shape in self._benchmark_args.lattice_shapes:
+            for obstacle_fraction in self._benchmark_args.obstacle_fractions:
+                fluid = self.build_fluid(lattice_shape, obstacle_fraction, precision)
+                for name, function in self._operators(fluid).items():
+                    results.append(self._report(self._measure(name, function, lattice_shape, obstacle_fraction)))
+
+                for name, fluid_options in self._step_kernels():
+                    fluid = self.build_fluid(lattice_shape, obstacle_fraction, precision, **fluid_options)
+                    results.append(self._report(self._measure(name, fluid.simulation_step, lattice_shape,
+                                                              obstacle_fraction)))
+
+        return results
+
+    @staticmethod
+    def save(results: list[BenchmarkResult], path: str) -> None:
+        baseline = {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "results": [asdict(result) for result in results],
+        }
+        with open(path, "w") as baseline_file:
+            json.dump(baseline, baseline_file, indent=2)
+
+    @staticmethod
+    def load(path: str) -> list[BenchmarkResult]:
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)
+
+        return [BenchmarkResult(result["name"], tuple(result["lattice_shape"]), result["obstacle_fraction"],
+                                result["seconds"], result["mlups"], result["peak_memory_bytes"])
+                for result in baseline["results"]]
+
+    @staticmethod
+    def compare(results: list[BenchmarkResult], baseline: list[BenchmarkResult], tolerance: float) -> list[str]:
+        '''
+        Returns a message for every benchmark that is slower than its baseline by more than the tolerance, or that
+        allocates more than the tolerance above its baseline peak. Benchmarks missing from the baseline are skipped.
+        '''
+        baseline_results = {result.key(): result for result in baseline}
+        regressions = []
+
+        for result in results:
+            baseline_result = baseline_results.get(result.key())
+            if baseline_result is None:
+                continue
+
+            if result.mlups < baseline_result.mlups * (1 - tolerance):
+                regressions.append(f"{result.key()}: {result.mlups:.2f} MLUPS, baseline {baseline_result.mlups:.2f}")
+            if result.peak_memory_bytes > baseline_result.peak_memory_bytes * (1 + tolerance):
+                regressions.append(f"{result.key()}: peak memory {result.peak_memory_bytes} B, "
+                                   f"baseline {baseline_result.peak_memory_bytes} B")
+
+        return regressions
+
+    @staticmethod
+    def main(benchmark_args: BenchmarkArgs) -> int:
+        '''
+        Runs the suite, saves the results and compares them with the baseline if one is given. Returns 1 if any
+        benchmark regressed, so the suite can gate a commit.
+        '''
+        results = BenchmarkSuite(benchmark_args).run()
+        os.makedirs(os.path.dirname(benchmark_args.output_path) or ".", exist_ok=True)
+        BenchmarkSuite.save(results, benchmark_args.output_path)
+
+        if benchmark_args.baseline_path is None:
+            return 0
+
+        regressions = BenchmarkSuite.compare(results, BenchmarkSuite.load(benchmark_args.baseline_path),
+                                             benchmark_args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        print(f"{len(regressions)} regressions against {benchmark_args.baseline_path} "
+              f"with a tolerance of {benchmark_args.tolerance:.0%}")
+
+        return 1 if regressions else 0
@@ -0,0 +1,88 @@
+import os
+import signal
+import threading
+from model.boltzmannFluid import BoltzmannFluid
+from model.fluidCheckpoint import FluidCheckpoint
+
+
+class CheckpointWriter:
+    '''
+    Writes a checkpoint of a running fluid to one path every given number of steps, and once more when the process
+    receives SIGTERM. The state is copied on the solver thread and compressed and written on a background thread, so
+    the solver only waits for the copy, or for the previous checkpoint when it is still being written.
+
+    After SIGTERM termination_requested is set. The simulation loop is expected to stop and call close, which writes
+    the final checkpoint and waits for it.
+    '''
+    def __init__(self, path: str, every_steps: int = 0, downcast: bool = False) -> None:
+        if every_steps < 0:
+            raise ValueError(f"Invalid checkpoint interval: {every_steps}. It must not be negative.")
+
+        self._path = path
+        self._every_steps = every_steps
+        self._downcast = downcast
+        self._thread: threading.Thread = None
+        self._error: BaseException = None
+        self._previous_signal_handler = None
+        self._last_steps_count: int = None
+        self.termination_requested = False
+        self.written_checkpoints_count = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def install_signal_handler(self) -> None:
+        '''
+        Handles SIGTERM from now on. Only possible from the main thread.
+        '''
+        self._previous_signal_handler = signal.signal(signal.SIGTERM, self._request_termination)
+
+    def _request_termination(self, *_) -> None:
+        self.termination_requested = True
+
+    def _write_checkpoint(self, checkpoint: FluidCheckpoint) -> None:
+        try:
+            checkpoint.write(self._path)
+            self.written_checkpoints_count += 1
+        except Exception as error:
+            self._error = error
+
+    def wait(self) -> None:
+        '''
+        Waits for the checkpoint that is being written and raises the error of the last write, if any.
+        '''
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError(f"Writing the checkpoint {self._path} failed.") from error
+
+    def write(self, fluid: BoltzmannFluid) -> None:
+        checkpoint = FluidCheckpoint.from_fluid(fluid, self._downcast)
+        self.wait()
+
+        self._last_steps_count = fluid.steps_count
+        self._thread = threading.Thread(target=self._write_checkpoint, args=(checkpoint,), name="CheckpointWriter")
+        self._thread.start()
+
+    def on_step(self, fluid: BoltzmannFluid) -> None:
+        '''
+        Writes a checkpoint when the step count of the fluid is a multiple of the interval.
+        '''
+        if self._every_steps > 0 and fluid.steps_count % self._every_steps == 0:
+            self.write(fluid)
+
+    def close(self, fluid: BoltzmannFluid) -> None:
+        '''
+        Writes the final checkpoint after SIGTERM, waits for the writes to finish and restores the previous SIGTERM
+        handler.
+        '''
+        if self.termination_requested and self._last_steps_count != fluid.steps_count:
+            self.write(fluid)
+
+        self.wait()
+
+        if self._previous_signal_handler is not None:
+            signal.signal(signal.SIGTERM, self._previous_signal_handler)
+            self._previous_signal_handler = None
@@ -0,0 +1,253 @@
+import json
+import os
+import zlib
+import numpy as np
+from model.boltzmannFluid import BoltzmannFluid
+from model.boltzmannFluidUtils import BoltzmannFluidState, MacroscopicFields
+from model.latticeStencil import LatticeStencil
+from .slabDomainRunner import SlabDomainRunner
+from utilities.argsReader import SimulationArgs
+
+
+class FieldStoreWriter:
+    '''
+    Appends frames of named fields to a chunked array store in a directory:
+    - metadata.json holds the shape and dtype of one frame of every field and free-form attributes,
+    - every field has its own directory of chunks of frames_per_chunk frames, numbered from 0,
+    - steps.raw holds the step of every frame as int64.
+
+    The chunk that is being filled is a raw .raw file that grows by one frame per append. With compress a chunk is
+    deflated into a .zlib file once it is full, and readers prefer the raw file while both exist. Frames are written
+    to the fields before the step, so the steps file always counts the complete frames. Opening an existing store
+    appends to it, without reading the earlier frames.
+    '''
+    FORMAT_VERSION = 1
+
+    def __init__(self, path: str, field_shapes: dict[str, tuple[tuple[int, ...], np.dtype]],
+                 frames_per_chunk: int = 16, compress: bool = True, attributes: dict = None) -> None:
+        if frames_per_chunk < 1:
+            raise ValueError(f"Invalid number of frames per chunk: {frames_per_chunk}. It must be at least 1.")
+
+        self._path = path
+        metadata = {
+            "format_version": FieldStoreWriter.FORMAT_VERSION,
+            "fields": {name: {"shape": list(shape), "dtype": np.dtype(dtype).str}
+                       for name, (shape, dtype) in field_shapes.items()},
+            "frames_per_chunk": frames_per_chunk,
+            "compress": compress,
+            "attributes": attributes or {},
+        }
+        metadata_path = os.path.join(path, "metadata.json")
+
+        if os.path.exists(metadata_path):
+            with open(metadata_path) as metadata_file:
+                stored_metadata = json.load(metadata_file)
+            if stored_metadata["fields"] != metadata["fields"]:
+                raise ValueError(f"The fields of the store {path} do not match the exported fields.")
+            metadata = stored_metadata
+        else:
+            os.makedirs(path, exist_ok=True)
+            for name in field_shapes:
+                os.makedirs(os.path.join(path, name), exist_ok=True)
+            with open(metadata_path, "w") as metadata_file:
+                json.dump(metadata, metadata_file, indent=2)
+
+        self._fields = {name: (tuple(field["shape"]), np.dtype(field["dtype"]))
+                        for name, field in metadata["fields"].items()}
+        self._frames_per_chunk = metadata["frames_per_chunk"]
+        self._compress = metadata["compress"]
+        self._steps_path = os.path.join(path, "steps.raw")
+        self.steps = np.fromfile(self._steps_path, dtype=np.int64) if os.path.exists(self._steps_path) \
+            else np.zeros(0, dtype=np.int64)
+        self._truncate_incomplete_frame()
+
+    def _chunk_path(self, name: str, chunk_index: int, extension: str) -> str:
+        return os.path.join(self._path, name, f"{chunk_index:05d}.{extension}")
+
+    def _truncate_incomplete_frame(self) -> None:
+        '''
+        Cuts the frames of an interrupted append, which were written to the fields but not to the steps.
+        '''
+        chunk_index, frame_index = divmod(len(self.steps), self._frames_per_chunk)
+        for name, (shape, dtype) in self._fields.items():
+            chunk_path = self._chunk_path(name, chunk_index, "raw")
+            frame_size = int(np.prod(shape)) * dtype.itemsize
+            if os.path.exists(chunk_path) and os.path.getsize(chunk_path) > frame_index * frame_size:
+                os.truncate(chunk_path, frame_index * frame_size)
+
+    def last_step(self) -> int:
+        return int(self.steps[-1]) if len(self.steps) > 0 else -1
+
+    def _compress_chunk(self, name: str, chunk_index: int) -> None:
+        raw_path = self._chunk_path(name, chunk_index, "raw")
+        compressed_path = self._chunk_path(name, chunk_index, "zlib")
+
+        with open(raw_path, "rb") as chunk_file:
+            compressed_chunk = zlib.compress(chunk_file.read(), 1)
+        with open(compressed_path + ".tmp", "wb") as chunk_file:
+            chunk_file.write(compressed_chunk)
+        os.replace(compressed_path + ".tmp", compressed_path)
+        os.remove(raw_path)
+
+    def append(self, step: int, frames: dict[str, np.ndarray]) -> None:
+        chunk_index, frame_index = divmod(len(self.steps), self._frames_per_chunk)
+
+        for name, (shape, dtype) in self._fields.items():
+            frame = np.ascontiguousarray(frames[name], dtype=dtype)
+            if frame.shape != shape:
+                raise ValueError(f"Invalid shape of the {name} frame: {frame.shape}. Expected {shape}.")
+
+            with open(self._chunk_path(name, chunk_index, "raw"), "ab") as chunk_file:
+                chunk_file.write(frame.tobytes())
+
+        with open(self._steps_path, "ab") as steps_file:
+            steps_file.write(np.int64(step).tobytes())
+        self.steps = np.append(self.steps, step)
+
+        if self._compress and frame_index == self._frames_per_chunk - 1:
+            for name in self._fields:
+                self._compress_chunk(name, chunk_index)
+
+
+class FieldArray:
+    '''
+    Read access to the frames of one field, with shape (frames, ...). Raw chunks are memory-mapped and compressed
+    chunks are inflated on access, keeping the last one, so reading a frame never loads more than one chunk.
+    '''
+    def __init__(self, path: str, shape: tuple[int, ...], dtype: np.dtype, frames_count: int,
+                 frames_per_chunk: int) -> None:
+        self._path = path
+        self._frame_shape = shape
+        self._dtype = dtype
+        self._frames_per_chunk = frames_per_chunk
+        self._cached_chunk: tuple[int, np.ndarray] = (-1, None)
+        self.shape = (frames_count,) + shape
+        self.dtype = dtype
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def _chunk(self, chunk_index: int) -> np.ndarray:
+        if self._cached_chunk[0] == chunk_index:
+            return self._cached_chunk[1]
+
+        chunk_frames = min(self._frames_per_chunk, self.shape[0] - chunk_index * self._frames_per_chunk)
+        chunk_shape = (chunk_frames,) + self._frame_shape
+        raw_path = os.path.join(self._path, f"{chunk_index:05d}.raw")
+
+        if os.path.exists(raw_path):
+            chunk = np.memmap(raw_path, dtype=self._dtype, mode="r", shape=chunk_shape)
+        else:
+            with open(os.path.join(self._path, f"{chunk_index:05d}.zlib"), "rb") as chunk_file:
+                chunk = np.frombuffer(zlib.decompress(chunk_file.read()), dtype=self._dtype) \
+                    .reshape((-1,) + self._frame_shape)[:chunk_frames]
+
+        self._cached_chunk = (chunk_index, chunk)
+
+        return chunk
+
+    def frame(self, index: int) -> np.ndarray:
+        if not -self.shape[0] <= index < self.shape[0]:
+            raise IndexError(f"Frame index {index} is out of range for {self.shape[0]} frames.")
+
+        chunk_index, frame_index = divmod(index % self.shape[0], self._frames_per_chunk)
+
+        return self._chunk(chunk_index)[frame_index]
+
+    def __getitem__(self, key) -> np.ndarray:
+        frame_key, element_key = (key[0], key[1:]) if isinstance(key, tuple) else (key, ())
+
+        if isinstance(frame_key, slice):
+            return np.stack([self.frame(index)[element_key] for index in range(*frame_key.indices(self.shape[0]))])
+
+        return self.frame(int(frame_key))[element_key]
+
+
+class FieldStoreReader:
+    def __init__(self, path: str) -> None:
+        with open(os.path.join(path, "metadata.json")) as metadata_file:
+            metadata = json.load(metadata_file)
+        if metadata["format_version"] != FieldStoreWriter.FORMAT_VERSION:
+            raise ValueError(f"Unsupported field store format version: {metadata['format_version']}. "
+                             f"Supported version: {FieldStoreWriter.FORMAT_VERSION}.")
+
+        steps_path = os.path.join(path, "steps.raw")
+        self._path = path
+        self._metadata = metadata
+        self.steps = np.fromfile(steps_path, dtype=np.int64) if os.path.exists(steps_path) \
+            else np.zeros(0, dtype=np.int64)
+        self.attributes = metadata["attributes"]
+
+    def field_names(self) -> list[str]:
+        return list(self._metadata["fields"])
+
+    def field(self, name: str) -> FieldArray:
+        field = self._metadata["fields"][name]
+
+        return FieldArray(os.path.join(self._path, name), tuple(field["shape"]), np.dtype(field["dtype"]),
+                          len(self.steps), self._metadata["frames_per_chunk"])
+
+
+class FieldExporter:
+    '''
+    Exports the density and velocity of a fluid, and optionally its populations, to a FieldStoreWriter every given
+    number of steps. Every decimation-th cell along each axis of the z range [z_start, z_end) is exported, and the
+    moments are only computed for those cells.
+
+    Frames are stored in the precision of the fluid, and populations with one value per direction of its stencil,
+    which is recorded in the store attributes. Exporting to an existing store appends to it and skips the
+    steps it already holds, so a restarted run continues the history.
+    '''
+    def __init__(self, path: str, lattice_shape: tuple[int, int, int], stencil: LatticeStencil, every_steps: int,
+                 dtype: np.dtype, decimation: int = 1, z_range: tuple[int, int] = None,
+                 include_populations: bool = False, frames_per_chunk: int = 16, compress: bool = True) -> None:
+        z_start, z_end = z_range if z_range is not None else (0, lattice_shape[2])
+        if every_steps < 1:
+            raise ValueError(f"Invalid export interval: {every_steps}. It must be at least 1.")
+        if decimation < 1:
+            raise ValueError(f"Invalid decimation: {decimation}. It must be at least 1.")
+        if not 0 <= z_start < z_end <= lattice_shape[2]:
+            raise ValueError(f"Invalid z range: [{z_start}, {z_end}). It must be within [0, {lattice_shape[2]}).")
+
+        self._every_steps = every_steps
+        self._selection = (slice(None, None, decimation), slice(None, None, decimation),
+                           slice(z_start, z_end, decimation))
+        self._include_populations = include_populations
+
+        frame_shape = tuple(len(range(*axis_slice.indices(axis_length)))
+                            for axis_slice, axis_length in zip(self._selection, lattice_shape))
+        field_shapes = {"density": (frame_shape, dtype), "velocity": (frame_shape + (3,), dtype)}
+        if include_populations:
+            field_shapes["populations"] = (frame_shape + (stencil.populations_count,), dtype)
+
+        self._store = FieldStoreWriter(path, field_shapes, frames_per_chunk, compress,
+                                       {"lattice_shape": list(lattice_shape), "stencil": stencil.name,
+                                        "decimation": decimation, "z_range": [z_start, z_end]})
+
+    @staticmethod
+    def from_args(simulation_args: SimulationArgs, fluid: BoltzmannFluid | SlabDomainRunner) -> 'FieldExporter':
+        return FieldExporter(simulation_args.export_path, fluid.boltzmann_state().lattice_shape(), fluid.stencil,
+                             simulation_args.export_every, fluid.simulation_params.dtype,
+                             simulation_args.export_decimation, simulation_args.export_z_range,
+                             simulation_args.export_populations)
+
+    def export(self, fluid: BoltzmannFluid | SlabDomainRunner) -> None:
+        if fluid.steps_count <= self._store.last_step():
+            return
+
+        fluid_state = fluid.boltzmann_state()
+        selected_state = BoltzmannFluidState.from_fluid_state(
+            np.ascontiguousarray(fluid_state.cell_populations()[self._selection]), fluid_state.allowed_velocities)
+        selected_fields = MacroscopicFields.from_boltzmann_state(selected_state, fluid.simulation_params)
+
+        frames = {"density": selected_fields.density, "velocity": selected_fields.velocity}
+        if self._include_populations:
+            frames["populations"] = selected_state.fluid_state
+        self._store.append(fluid.steps_count, frames)
+
+    def on_step(self, fluid: BoltzmannFluid | SlabDomainRunner) -> None:
+        if fluid.steps_count % self._every_steps == 0:
+            self.export(fluid)
+
+    def exported_frames_count(self) -> int:
+        return len(self._store.steps)
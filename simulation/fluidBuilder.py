@@ -0,0 +1,132 @@
+from dataclasses import replace
+import numpy as np
+from model.boltzmannFluid import BoltzmannFluid
+from model.fluidCheckpoint import FluidCheckpoint
+from model.massDriftMonitor import MassDriftMonitor
+from model.voxelGeometry import load_geometry
+from utilities.argsReader import SimulationArgs
+from utilities.modelConfigReader import ModelConfigReader
+from utilities.DTO.simulationParameters import SimulationParameters
+from utilities.DTO.boundaryConditionDTO import (
+    BoundaryConditionNoSlipDelta,
+    BoundaryConditionConstantVelocityDelta,
+    BoundaryConditionInitialDelta
+)
+from .memoryPlanner import GIB, MemoryPlan, MemoryPlanner
+from .slabDomainRunner import SlabDomainRunner
+
+
+class FluidBuilder:
+    '''
+    Builds a BoltzmannFluid with all the boundary conditions of a configuration file applied. The no-slip cells of
+    the geometry file are loaded once and shared by every fluid the builder builds.
+    '''
+    def __init__(self, model_config_reader: ModelConfigReader) -> None:
+        self._model_config_reader = model_config_reader
+        self._no_slip_geometry_cells: np.ndarray[bool] = None
+
+    def no_slip_geometry_cells(self) -> np.ndarray[bool] | None:
+        no_slip_geometry = self._model_config_reader.no_slip_geometry()
+        if no_slip_geometry is None:
+            return None
+
+        if self._no_slip_geometry_cells is None:
+            lattice_shape = self._model_config_reader.lattice_dimensions().to_tuple()
+            self._no_slip_geometry_cells = load_geometry(no_slip_geometry.path, lattice_shape, no_slip_geometry.scale,
+                                                         no_slip_geometry.offset.to_tuple())
+
+        return self._no_slip_geometry_cells
+
+    def build(self, simulation_parameters: SimulationParameters = None, **fluid_options) -> BoltzmannFluid:
+        lattice_shape = self._model_config_reader.lattice_dimensions()
+        if simulation_parameters is None:
+            simulation_parameters = self._model_config_reader.simulation_parameters()
+
+        fluid = BoltzmannFluid(lattice_shape.to_tuple(), simulation_parameters, **fluid_options)
+        no_slip_geometry_cells = self.no_slip_geometry_cells()
+        if no_slip_geometry_cells is not None:
+            fluid.set_no_slip_cells(no_slip_geometry_cells)
+
+        for boundary_condition_delta in self._model_config_reader.boundary_conditions():
+            match boundary_condition_delta:
+                case BoundaryConditionNoSlipDelta() as no_slip_boundary_condition_delta:
+                    fluid.update_no_slip_boundary(no_slip_boundary_condition_delta)
+                case BoundaryConditionConstantVelocityDelta() as constant_velocity_boundary_condition_delta:
+                    fluid.update_constant_velocity_boundary(constant_velocity_boundary_condition_delta)
+                case BoundaryConditionInitialDelta() as initial_boundary_condition_delta:
+                    fluid.update_initial_boundary(initial_boundary_condition_delta)
+                case _:
+                    raise ValueError(f"Invalid boundary condition type: {type(boundary_condition_delta)}")
+        fluid.prepare_boundary_conditions()
+
+        return fluid
+
+    def build_with_precision(self, precision: str, **fluid_options) -> BoltzmannFluid:
+        simulation_parameters = replace(self._model_config_reader.simulation_parameters(), precision=precision)
+
+        return self.build(simulation_parameters, **fluid_options)
+
+    @staticmethod
+    def fluid_options(simulation_args: SimulationArgs) -> dict:
+        return {
+            "kernel": simulation_args.kernel,
+            "direction_major": simulation_args.direction_major,
+            "backend": simulation_args.backend,
+        }
+
+    def check_mass_drift(self, simulation_args: SimulationArgs) -> None:
+        precision = self._model_config_reader.simulation_parameters().precision
+        fluid_options = self.fluid_options(simulation_args)
+        mass_drift_monitor = MassDriftMonitor(self.build_with_precision(precision, **fluid_options),
+                                              self.build_with_precision("float64", **fluid_options),
+                                              simulation_args.drift_tolerance)
+        mass_drift_monitor.run(simulation_args.drift_check_steps)
+        print(mass_drift_monitor.report())
+
+    def restore(self, checkpoint_path: str, **fluid_options) -> BoltzmannFluid:
+        checkpoint = FluidCheckpoint.read(checkpoint_path)
+        lattice_shape = self._model_config_reader.lattice_dimensions().to_tuple()
+        if checkpoint.populations.shape[:3] != lattice_shape:
+            raise ValueError(f"The checkpoint lattice {checkpoint.populations.shape[:3]} does not match the "
+                             f"configured lattice {lattice_shape}.")
+
+        return checkpoint.to_fluid(**fluid_options)
+
+    def plan_memory(self, simulation_args: SimulationArgs) -> MemoryPlan:
+        '''
+        Returns the plan of the requested run, or with memory_downgrade the first downgrade that fits the memory
+        budget. A restarted run keeps the precision of its checkpoint.
+        '''
+        requested_options = dict(self.fluid_options(simulation_args), workers=simulation_args.workers)
+        plan = MemoryPlanner(self._model_config_reader).choose(simulation_args.memory_budget * GIB,
+                                                               simulation_args.memory_downgrade,
+                                                               downgrade_precision=simulation_args.restart_path is None,
+                                                               **requested_options)
+        if dict(plan.fluid_options(), workers=plan.workers) != requested_options \
+                or plan.precision != self._model_config_reader.simulation_parameters().precision:
+            print(f"Downgraded to {plan.describe()} to fit the memory budget")
+
+        return plan
+
+    def build_from_args(self, simulation_args: SimulationArgs) -> BoltzmannFluid | SlabDomainRunner:
+        '''
+        Builds the fluid for a simulation run, or restores it from a checkpoint: checks the predicted peak memory
+        against the memory budget and runs the mass drift check first when they are requested, and splits the fluid
+        into slabs stepped by worker processes when more than one worker is requested.
+        '''
+        fluid_options = self.fluid_options(simulation_args)
+        precision = self._model_config_reader.simulation_parameters().precision
+        workers = simulation_args.workers
+        if simulation_args.memory_budget is not None:
+            plan = self.plan_memory(simulation_args)
+            fluid_options, precision, workers = plan.fluid_options(), plan.precision, plan.workers
+
+        if simulation_args.drift_check_steps > 0:
+            self.check_mass_drift(simulation_args)
+
+        fluid = self.restore(simulation_args.restart_path, **fluid_options) \
+            if simulation_args.restart_path is not None else self.build_with_precision(precision, **fluid_options)
+        if workers > 1:
+            return SlabDomainRunner(fluid, workers)
+
+        return fluid
@@ -0,0 +1,92 @@
+import csv
+import json
+import os
+import time
+import numpy as np
+from model.boltzmannFluid import BoltzmannFluid
+from model.phaseTimer import PhaseTimer
+from utilities.argsReader import SimulationArgs
+
+
+class FluidTelemetry:
+    '''
+    Samples diagnostics of a fluid every given number of steps and appends them to a metrics file, as JSON lines or,
+    when the path ends with .csv, as CSV rows. Every sample holds:
+    - step, total_mass, max_population and max_mach_number,
+    - step_time, the mean wall-clock time of the steps since the previous sample,
+    - <phase>_time for every phase of PhaseTimer, the mean time of that phase per step since the previous sample.
+
+    Phases are only timed for a BoltzmannFluid, which profiles its steps while the telemetry is attached. The Mach
+    number treats the speed of sound of the simulation parameters as the lattice velocity unit, as the equilibrium
+    does, so the speed of sound of the lattice is speed_of_sound / sqrt(3).
+    '''
+    FIELDS = ("step", "total_mass", "max_population", "max_mach_number", "step_time") \
+        + tuple(f"{phase}_time" for phase in PhaseTimer.PHASES)
+
+    def __init__(self, path: str, every_steps: int = 100) -> None:
+        if every_steps < 1:
+            raise ValueError(f"Invalid metrics interval: {every_steps}. It must be at least 1.")
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        write_header = not os.path.exists(path) or os.path.getsize(path) == 0
+
+        self._every_steps = every_steps
+        self._metrics_file = open(path, "a", newline="")
+        self._csv_writer = None
+        if path.endswith(".csv"):
+            self._csv_writer = csv.DictWriter(self._metrics_file, FluidTelemetry.FIELDS)
+            if write_header:
+                self._csv_writer.writeheader()
+
+        self.phase_timer = PhaseTimer()
+        self.samples_count = 0
+        self._sample_step = 0
+        self._sample_time = 0.0
+
+    @staticmethod
+    def from_args(simulation_args: SimulationArgs) -> 'FluidTelemetry':
+        return FluidTelemetry(simulation_args.metrics_path, simulation_args.metrics_every)
+
+    def attach(self, fluid) -> None:
+        if isinstance(fluid, BoltzmannFluid):
+            fluid.profile_phases(self.phase_timer)
+
+        self.phase_timer.reset()
+        self._sample_step = fluid.steps_count
+        self._sample_time = time.perf_counter()
+
+    def sample(self, fluid) -> dict:
+        current_time = time.perf_counter()
+        steps_count = max(fluid.steps_count - self._sample_step, 1)
+        speeds = np.linalg.norm(fluid.macroscopic_fields().velocity, axis=-1)
+
+        metrics = {
+            "step": fluid.steps_count,
+            "total_mass": fluid.total_mass(),
+            "max_population": fluid.max_population(),
+            "max_mach_number": float(np.max(speeds)) * 3 ** 0.5 / fluid._simulation_params.speed_of_sound,
+            "step_time": (current_time - self._sample_time) / steps_count,
+        }
+        for phase, phase_time in self.phase_timer.reset().items():
+            metrics[f"{phase}_time"] = phase_time / steps_count
+
+        if self._csv_writer is not None:
+            self._csv_writer.writerow(metrics)
+        else:
+            self._metrics_file.write(json.dumps(metrics) + "\n")
+        self._metrics_file.flush()
+        self.samples_count += 1
+
+        self._sample_step = fluid.steps_count
+        self._sample_time = time.perf_counter()
+
+        return metrics
+
+    def on_step(self, fluid) -> None:
+        if fluid.steps_count % self._every_steps == 0:
+            self.sample(fluid)
+
+    def close(self, fluid) -> None:
+        if isinstance(fluid, BoltzmannFluid):
+            fluid.profile_phases(None)
+        self._metrics_file.close()
@@ -0,0 +1,275 @@
+import numpy as np
+import cv2
+from dataclasses import dataclass, field
+
+
+def _hue_lookup_table(steps: int) -> np.ndarray:
+    '''
+    Returns the RGB colours (scaled to 0-255) of steps evenly spaced hues at full saturation and value.
+    '''
+    hue_sector = np.arange(steps) / steps * 6
+    sector_index = hue_sector.astype(np.int64) % 6
+    rising = hue_sector - np.floor(hue_sector)
+    falling = 1 - rising
+    ones, zeros = np.ones(steps), np.zeros(steps)
+
+    red = np.choose(sector_index, [ones, falling, zeros, zeros, rising, ones])
+    green = np.choose(sector_index, [rising, ones, ones, falling, zeros, zeros])
+    blue = np.choose(sector_index, [zeros, zeros, rising, ones, ones, falling])
+
+    return (np.stack([red, green, blue], axis=-1) * 255).astype(np.float32)
+
+
+HUE_STEPS = 1024
+_HUE_LOOKUP_TABLE = _hue_lookup_table(HUE_STEPS)
+
+
+@dataclass
+class LegendLayout:
+    '''
+    Position and contents of a legend on a canvas of the frame size. Value labels are anchored at their right edge
+    and vertical centre, direction labels at their horizontal centre and top edge.
+    '''
+    texture: np.ndarray
+    position: tuple[int, int]
+    value_labels: list[tuple[str, tuple[int, int]]] = field(default_factory=list)
+    direction_labels: list[tuple[str, tuple[int, int]]] = field(default_factory=list)
+    label_color: tuple[int, int, int] = (255, 255, 255)
+
+
+class FrameComposer:
+    '''
+    Turns a z slice of the density or the velocity into an RGB image and composes video frames with a legend,
+    using only NumPy and OpenCV, so that it also works on machines without a display.
+
+    Hues are coloured through a lookup table. The legend texture and the direction labels do not depend on the frame,
+    so they are rendered once per output size; only the value labels are drawn for every frame.
+    '''
+    LEGEND_PADDING = 20
+    FONT, FONT_SCALE = cv2.FONT_HERSHEY_SIMPLEX, 0.5
+
+    def __init__(self, use_density: bool, canvas_size: tuple[int, int]) -> None:
+        self._use_density = use_density
+        self._canvas_size = canvas_size
+        self._legend_texture: np.ndarray = None
+        self._direction_labels: list[tuple[str, tuple[int, int]]] = None
+        self._static_overlays: dict[tuple[int, int], tuple[np.ndarray, np.ndarray]] = {}
+
+    @staticmethod
+    def hsv_to_rgb(hue: np.ndarray, value: np.ndarray) -> np.ndarray:
+        '''
+        Converts hues and values in [0, 1] at full saturation to RGB bytes.
+        '''
+        hue_indices = np.rint(hue * HUE_STEPS).astype(np.int64) % HUE_STEPS
+
+        return (_HUE_LOOKUP_TABLE[hue_indices] * value[..., np.newaxis]).astype(np.uint8)
+
+    def colour_frame(self, density_slice: np.ndarray, velocity_slice: np.ndarray) -> tuple[np.ndarray, float, float]:
+        '''
+        Returns the RGB image of the slice with the minimum and maximum of the drawn value.
+        '''
+        if self._use_density:
+            return self._density_frame(density_slice)
+
+        return self._velocity_frame(velocity_slice)
+
+    @staticmethod
+    def _density_frame(density_slice: np.ndarray) -> tuple[np.ndarray, float, float]:
+        max_density = np.max(density_slice)
+        min_density = np.min(density_slice)
+
+        mapped_density = (density_slice - min_density) / (max_density - min_density) * 255 \
+            if max_density != min_density else np.zeros_like(density_slice)
+
+        return np.repeat(mapped_density[..., np.newaxis], 3, axis=-1).astype(np.uint8), min_density, max_density
+
+    @staticmethod
+    def _velocity_frame(velocity_slice: np.ndarray) -> tuple[np.ndarray, float, float]:
+        speeds_matrix = np.linalg.norm(velocity_slice, axis=-1)
+        max_speed = np.max(speeds_matrix)
+        min_speed = np.min(speeds_matrix)
+
+        hue = (np.arctan2(velocity_slice[..., 1], velocity_slice[..., 0]) + np.pi) / (2 * np.pi)
+        value = (speeds_matrix - min_speed) / (max_speed - min_speed) \
+            if max_speed != min_speed else np.zeros_like(speeds_matrix)
+
+        return FrameComposer.hsv_to_rgb(hue, value), min_speed, max_speed
+
+    @staticmethod
+    def _add_border(texture_matrix_rgb: np.ndarray) -> np.ndarray:
+        border_color = [0, 0, 0]
+        texture_matrix_rgb[0, :, :] = border_color
+        texture_matrix_rgb[-1, :, :] = border_color
+        texture_matrix_rgb[:, 0, :] = border_color
+        texture_matrix_rgb[:, -1, :] = border_color
+
+        return texture_matrix_rgb
+
+    def legend_layout(self, min_value: float, max_value: float) -> LegendLayout:
+        '''
+        Returns the legend for the given range. The texture and the direction labels are shared between frames.
+        '''
+        if self._legend_texture is None:
+            self._legend_texture, self._direction_labels = self._density_legend() if self._use_density \
+                else self._velocity_legend()
+
+        legend_position = (self._canvas_size[0] - self._legend_texture.shape[0] - self.LEGEND_PADDING,
+                           self.LEGEND_PADDING)
+        value_labels = self._value_labels(min_value, max_value, legend_position, self._legend_texture.shape[1])
+        label_color = (0, 255, 0) if self._use_density else (255, 255, 255)
+
+        return LegendLayout(self._legend_texture, legend_position, value_labels, self._direction_labels, label_color)
+
+    def _value_labels(self, min_value: float, max_value: float, legend_position: tuple[int, int],
+                      legend_height: int) -> list[tuple[str, tuple[int, int]]]:
+        texts_count = 10
+        text_distance_pixels = legend_height // texts_count
+        text_distance_values = (max_value - min_value) / texts_count
+
+        text_values = np.arange(min_value, max_value + text_distance_values, text_distance_values) \
+            if text_distance_values != 0 else np.array([min_value])
+        text_y_positions = np.arange(self.LEGEND_PADDING, legend_height + self.LEGEND_PADDING + text_distance_pixels,
+                                     text_distance_pixels)
+        anchor_x = legend_position[0] - self.LEGEND_PADDING
+
+        return [(f"{text_value:.2f}", (anchor_x, int(text_y_position)))
+                for text_value, text_y_position in zip(text_values, text_y_positions)]
+
+    def _density_legend(self) -> tuple[np.ndarray, list[tuple[str, tuple[int, int]]]]:
+        legend_width, legend_height = 50, 200
+
+        texture_vector = np.arange(0.0, 255.0, 255.0 / legend_height)
+        texture_matrix = np.repeat(texture_vector[:, np.newaxis], legend_width, axis=-1).T
+        texture_matrix_rgb = self._add_border(np.repeat(texture_matrix[..., np.newaxis], 3, axis=-1).astype(np.uint8))
+
+        return texture_matrix_rgb, []
+
+    def _velocity_legend(self) -> tuple[np.ndarray, list[tuple[str, tuple[int, int]]]]:
+        legend_width, legend_height = 300, 200
+        texts_counts_direction = 7
+        legend_position = (self._canvas_size[0] - legend_width - self.LEGEND_PADDING, self.LEGEND_PADDING)
+
+        texture_vector_value = np.arange(0.0, 1.0, 1.0 / legend_height)
+        texture_vector_direction = np.arange(0.0, 1.0, 1.0 / legend_width)
+
+        texture_hue = np.repeat(texture_vector_direction[:, np.newaxis], legend_height, axis=-1)
+        texture_value = np.repeat(texture_vector_value[:, np.newaxis], legend_width, axis=-1).T
+
+        texture_matrix_rgb = self._add_border(self.hsv_to_rgb(texture_hue, texture_value))
+
+        text_directions_distance_values = 2 * np.pi / texts_counts_direction
+        text_directions_distance_pixels = legend_width // texts_counts_direction
+        text_directions = np.arange(0.0, 2 * np.pi + text_directions_distance_values, text_directions_distance_values)
+        text_directions_x_positions = np.arange(legend_position[0],
+                                                legend_position[0] + legend_width + text_directions_distance_pixels,
+                                                text_directions_distance_pixels)
+        direction_labels_y = legend_position[1] + legend_height + self.LEGEND_PADDING
+
+        return texture_matrix_rgb, [(f"{text_direction:.2f}", (int(text_x_position), direction_labels_y))
+                                    for text_direction, text_x_position in zip(text_directions,
+                                                                               text_directions_x_positions)]
+
+    def _draw_labels(self, canvas_swapped: np.ndarray, labels: list[tuple[str, tuple[int, int]]],
+                     label_color: tuple[int, int, int], centered: bool, scale: tuple[float, float]) -> None:
+        '''
+        Draws labels on a (w_y, w_x, 3) image. Centered labels are anchored at their horizontal centre and top edge,
+        the others at their right edge and vertical centre. Positions and font size are multiplied by scale.
+        '''
+        scale_x, scale_y = scale
+        font_scale = self.FONT_SCALE * min(scale_x, scale_y)
+        thickness = max(1, round(min(scale_x, scale_y)))
+
+        for text, (anchor_x, anchor_y) in labels:
+            (text_width, text_height), _ = cv2.getTextSize(text, self.FONT, font_scale, thickness)
+            anchor_x, anchor_y = int(anchor_x * scale_x), int(anchor_y * scale_y)
+            origin = (anchor_x - text_width // 2, anchor_y + text_height) if centered \
+                else (anchor_x - text_width, anchor_y + text_height // 2)
+            cv2.putText(canvas_swapped, text, origin, self.FONT, font_scale, label_color, thickness, cv2.LINE_AA)
+
+    def _static_overlay(self, legend_layout: LegendLayout) -> np.ndarray:
+        canvas_x, canvas_y = self._canvas_size
+        canvas_swapped = np.zeros((canvas_y, canvas_x, 3), dtype=np.uint8)
+        self._draw_labels(canvas_swapped, legend_layout.direction_labels, legend_layout.label_color, True, (1.0, 1.0))
+
+        start_x, start_y = legend_layout.position
+        end_x, end_y = start_x + legend_layout.texture.shape[0], start_y + legend_layout.texture.shape[1]
+        canvas_swapped[start_y:end_y, start_x:end_x, :] = \
+            np.swapaxes(legend_layout.texture[:canvas_x - start_x, :canvas_y - start_y], 0, 1)
+
+        return canvas_swapped
+
+    def _scaled_static_overlay(self, legend_layout: LegendLayout,
+                               target_shape: tuple[int, int]) -> tuple[np.ndarray, np.ndarray]:
+        '''
+        Returns the flat indices and the colours of the texture and direction label pixels on a (w_y, w_x, 3) image of
+        the target shape, rendered on the first call for every target shape.
+        '''
+        if target_shape not in self._static_overlays:
+            static_overlay = self._static_overlay(legend_layout)
+            if target_shape != tuple(self._canvas_size):
+                static_overlay = cv2.resize(static_overlay, target_shape, interpolation=cv2.INTER_CUBIC)
+
+            static_overlay = static_overlay.reshape(-1)
+            overlay_indices = np.flatnonzero(static_overlay)
+            self._static_overlays[target_shape] = (overlay_indices, static_overlay[overlay_indices])
+
+        return self._static_overlays[target_shape]
+
+    def _draw_static_overlay(self, image_swapped: np.ndarray, legend_layout: LegendLayout) -> None:
+        target_shape = (image_swapped.shape[1], image_swapped.shape[0])
+        overlay_indices, overlay_colors = self._scaled_static_overlay(legend_layout, target_shape)
+        image_swapped.reshape(-1)[overlay_indices] = overlay_colors
+
+    def legend_overlay(self, legend_layout: LegendLayout) -> np.ndarray:
+        '''
+        Draws the legend on an empty (w_x, w_y, 3) canvas, with the labels rendered by OpenCV.
+        '''
+        canvas_x, canvas_y = self._canvas_size
+        canvas_swapped = np.zeros((canvas_y, canvas_x, 3), dtype=np.uint8)
+        self._draw_static_overlay(canvas_swapped, legend_layout)
+        self._draw_labels(canvas_swapped, legend_layout.value_labels, legend_layout.label_color, False, (1.0, 1.0))
+
+        return np.swapaxes(canvas_swapped, 0, 1)
+
+    @staticmethod
+    def output_dimensions(previous_draw_size: tuple[int, int]) -> tuple[int, int]:
+        target_min_dimension = 800
+
+        target_shape = previous_draw_size
+        min_dimension = min(target_shape)
+
+        if min_dimension < target_min_dimension:
+            scale_quotient = target_min_dimension / min_dimension
+            target_shape = tuple(int(dimension * scale_quotient) for dimension in target_shape)
+
+        return target_shape
+
+    def compose(self, frame: np.ndarray, legend_layout: LegendLayout) -> np.ndarray:
+        '''
+        Scales the frame to the output size, draws the legend over it and returns it as a BGR image for the writer.
+        The frame is transposed before scaling, so that only the small frame is copied, the cached texture and
+        direction label pixels are copied over it and the value labels are drawn on it.
+        '''
+        target_shape = self.output_dimensions((frame.shape[0], frame.shape[1]))
+
+        frame_swapped = np.ascontiguousarray(np.swapaxes(frame, 0, 1))
+        frame_resized = cv2.resize(frame_swapped, target_shape, interpolation=cv2.INTER_CUBIC)
+        self._draw_static_overlay(frame_resized, legend_layout)
+
+        frame_bgr = cv2.cvtColor(frame_resized, cv2.COLOR_RGB2BGR)
+        scale = (target_shape[0] / self._canvas_size[0], target_shape[1] / self._canvas_size[1])
+        self._draw_labels(frame_bgr, legend_layout.value_labels, legend_layout.label_color[::-1], False, scale)
+
+        return frame_bgr
+
+
+class VideoOutput:
+    def __init__(self, output_path: str, frame_size: tuple[int, int]) -> None:
+        self._output_writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), 24, frame_size, True)
+
+    def write(self, frame_bgr: np.ndarray) -> None:
+        self._output_writer.write(frame_bgr)
+
+    def release(self) -> None:
+        self._output_writer.release()
+        print("Video saved")
@@ -0,0 +1,110 @@
+import os
+import time
+import numpy as np
+from utilities.argsReader import SimulationArgs
+from utilities.modelConfigReader import ModelConfigReader
+from .fluidBuilder import FluidBuilder
+from .runHooks import RunHooks
+
+
+class HeadlessSimulator:
+    '''
+    Runs the simulation without a display. Pygame is never imported, and OpenCV is only imported when a video is
+    requested. At the end it reports the startup time, counted from start_time (by default the creation of the
+    simulator) until the first step, and the number of steps per second.
+
+    With a checkpoint path the fluid is checkpointed every given number of steps, and on SIGTERM the run stops after
+    the current step and writes a final checkpoint. A run restarted from a checkpoint continues its step count.
+    With an export path the fields are exported to a field store every given number of steps, and with a metrics
+    path the phase times and diagnostics are sampled to a metrics file, see FluidTelemetry.
+    '''
+    def __init__(self, simulation_args: SimulationArgs, start_time: float = None) -> None:
+        self._start_time = start_time if start_time is not None else time.perf_counter()
+        self._simulation_args = simulation_args
+        self._model_config_reader = ModelConfigReader(simulation_args.config_path)
+        self._simulation_steps_count = 0
+        self._frame_encoder = None
+        self._run_hooks: RunHooks = None
+
+    def run(self) -> None:
+        self._init_fluid()
+        self._init_video()
+        self._run_hooks = RunHooks.from_args(self._simulation_args, self._fluid)
+        startup_time = time.perf_counter() - self._start_time
+
+        self._render()
+        first_step = self._simulation_steps_count
+        loop_start_time = time.perf_counter()
+        while self._simulation_steps_count < self._simulation_args.number_of_steps and \
+                not self._run_hooks.termination_requested:
+            number_of_steps = min(self._simulation_args.steps_per_frame,
+                                  self._simulation_args.number_of_steps - self._simulation_steps_count)
+            for _ in range(number_of_steps):
+                self._fluid.simulation_step()
+                self._simulation_steps_count += 1
+                self._run_hooks.on_step(self._fluid)
+                if self._run_hooks.termination_requested:
+                    break
+            print(f"Simulation step: {self._simulation_steps_count}/{self._simulation_args.number_of_steps}")
+
+            self._render()
+        loop_time = time.perf_counter() - loop_start_time
+
+        self._close()
+        self._report(startup_time, self._simulation_steps_count - first_step, loop_time)
+
+    def _init_fluid(self) -> None:
+        lattice_shape = self._model_config_reader.lattice_dimensions()
+        if not 0 <= self._simulation_args.z < lattice_shape.get_z():
+            raise ValueError(f"Invalid z coordinate: {self._simulation_args.z}. Change value to one within the "
+                             f"boundaries ({lattice_shape.get_z()}).")
+
+        self._fluid = FluidBuilder(self._model_config_reader).build_from_args(self._simulation_args)
+        self._simulation_steps_count = self._fluid.steps_count
+
+    def _init_video(self) -> None:
+        if not self._simulation_args.save_video:
+            return
+
+        from .asyncFrameEncoder import AsyncFrameEncoder
+        from .frameComposer import FrameComposer, VideoOutput
+
+        lattice_shape = self._model_config_reader.lattice_dimensions()
+        draw_size_resized = FrameComposer.output_dimensions((lattice_shape.get_x(), lattice_shape.get_y()))
+        os.makedirs(os.path.dirname(self._simulation_args.output_path) or ".", exist_ok=True)
+
+        self._frame_encoder = AsyncFrameEncoder(FrameComposer(self._simulation_args.use_density, draw_size_resized),
+                                                VideoOutput(self._simulation_args.output_path, draw_size_resized),
+                                                self._simulation_args.frame_queue_size,
+                                                self._simulation_args.drop_frames)
+
+    def _render(self) -> None:
+        if self._frame_encoder is None:
+            return
+
+        from .asyncFrameEncoder import FrameSnapshot
+
+        self._frame_encoder.submit(FrameSnapshot.from_fluid(self._fluid, self._simulation_args.z,
+                                                            self._simulation_steps_count))
+
+    def _close(self) -> None:
+        if self._frame_encoder is not None:
+            self._frame_encoder.close()
+        self._run_hooks.close(self._fluid)
+        if self._run_hooks.checkpoint_writer is not None:
+            print(f"Wrote {self._run_hooks.checkpoint_writer.written_checkpoints_count} checkpoints")
+
+    def _report(self, startup_time: float, steps_count: int, loop_time: float) -> None:
+        lattice_cells_count = int(np.prod(self._model_config_reader.lattice_dimensions().to_tuple()))
+        steps_per_second = steps_count / loop_time if loop_time > 0 else float("inf")
+
+        print(f"Startup time: {startup_time:.3f} s")
+        print(f"Simulated {steps_count} steps in {loop_time:.3f} s: {steps_per_second:.2f} steps/s, "
+              f"{steps_per_second * lattice_cells_count / 1e6:.2f} MLUPS")
+        if self._run_hooks.field_exporter is not None:
+            print(f"Exported {self._run_hooks.field_exporter.exported_frames_count()} frames")
+        if self._run_hooks.telemetry is not None:
+            print(f"Sampled {self._run_hooks.telemetry.samples_count} metrics")
+        if self._frame_encoder is not None:
+            print(f"Encoded {self._frame_encoder.encoded_frames_count} frames, "
+                  f"dropped {self._frame_encoder.dropped_frames_count}")
@@ -0,0 +1,224 @@
+from dataclasses import dataclass, field
+import numpy as np
+from model.latticeStencil import default_stencil_name, get_stencil
+from model.voxelGeometry import load_geometry
+from utilities.argsReader import PlanArgs
+from utilities.modelConfigReader import ModelConfigReader
+from utilities.DTO.boundaryConditionDTO import BoundaryConditionNoSlipDelta, BoundaryConditionConstantVelocityDelta
+
+
+GIB = 2 ** 30
+
+
+@dataclass
+class MemoryPlan:
+    '''
+    The predicted peak memory of a simulation run, split into the arrays that are alive at the peak.
+    '''
+    precision: str
+    kernel: str
+    backend: str
+    direction_major: bool
+    workers: int
+    components: dict[str, int] = field(default_factory=dict)
+
+    def peak_bytes(self) -> int:
+        return sum(self.components.values())
+
+    def fits(self, budget_bytes: float) -> bool:
+        return self.peak_bytes() <= budget_bytes
+
+    def fluid_options(self) -> dict:
+        return {"kernel": self.kernel, "direction_major": self.direction_major, "backend": self.backend}
+
+    def describe(self) -> str:
+        layout = "direction-major" if self.direction_major else "cell-major"
+        return f"{self.precision} {self.kernel} {self.backend} {layout} on {self.workers} " \
+               f"worker{'s' if self.workers > 1 else ''}: {self.peak_bytes() / GIB:.2f} GiB"
+
+
+class MemoryPlanner:
+    '''
+    Predicts the peak memory of a configuration for every kernel, backend, precision and layout, without allocating
+    the lattice. The boundary masks are rasterised once to count the fluid cells and the boundary links. The
+    populations are counted for the stencil of the configuration, or the one BoltzmannFluid uses by default.
+
+    A step of the reference kernel allocates every operator as a new array. REFERENCE_TEMPORARIES is the peak number
+    of population-sized temporaries it holds at once, measured with tracemalloc; the other kernels work in preallocated
+    buffers. The sparse kernel peaks on its first step, while it builds the streaming table next to the dense state.
+
+    Slab decomposition shares the lattice between the worker processes, but every worker steps its slab with its own
+    buffers, so it spreads the memory over processes rather than reducing the total. It is never offered as a
+    downgrade.
+    '''
+    REFERENCE_TEMPORARIES = 5.5
+    SPARSE_SETUP_INDEX_ARRAYS = 3
+
+    def __init__(self, model_config_reader: ModelConfigReader) -> None:
+        shape = model_config_reader.lattice_dimensions().to_tuple()
+        no_slip_geometry = model_config_reader.no_slip_geometry()
+        no_slip_cells = np.zeros(shape, dtype=bool) if no_slip_geometry is None \
+            else load_geometry(no_slip_geometry.path, shape, no_slip_geometry.scale, no_slip_geometry.offset.to_tuple())
+        constant_velocity_cells = np.zeros(shape, dtype=bool)
+
+        for boundary_condition_delta in model_config_reader.boundary_conditions():
+            x1, y1, z1 = boundary_condition_delta.boundary_cube.start_position.to_tuple()
+            x2, y2, z2 = boundary_condition_delta.boundary_cube.end_position.to_tuple()
+            match boundary_condition_delta:
+                case BoundaryConditionNoSlipDelta():
+                    no_slip_cells[x1:x2, y1:y2, z1:z2] = True
+                case BoundaryConditionConstantVelocityDelta():
+                    constant_velocity_cells[x1:x2, y1:y2, z1:z2] = True
+
+        simulation_params = model_config_reader.simulation_parameters()
+        stencil = get_stencil(simulation_params.stencil if simulation_params.stencil is not None
+                              else default_stencil_name(shape))
+        directions = stencil.directions
+
+        self.shape = shape
+        self.precision = simulation_params.precision
+        self._populations_count = len(directions)
+        self._cells_count = int(np.prod(shape))
+        self._active_cells_count = int(np.count_nonzero(~no_slip_cells))
+        self._constant_velocity_cells_count = int(np.count_nonzero(constant_velocity_cells))
+        self._no_slip_links_count, self._wall_surface_cells_count = self._count_no_slip_links(no_slip_cells,
+                                                                                              directions)
+
+    @staticmethod
+    def _count_no_slip_links(no_slip_cells: np.ndarray, directions: np.ndarray) -> tuple[int, int]:
+        links_count = 0
+        wall_surface_cells = np.zeros_like(no_slip_cells)
+
+        for dx, dy, dz in directions.astype(np.int32):
+            linked_cells = no_slip_cells & np.roll(~no_slip_cells, (dx, dy, dz), axis=(0, 1, 2))
+            links_count += int(np.count_nonzero(linked_cells))
+            wall_surface_cells |= linked_cells
+
+        return links_count, int(np.count_nonzero(wall_surface_cells))
+
+    def _fluid_components(self, precision: str, kernel: str, backend: str, planes_fraction: float) -> dict[str, int]:
+        '''
+        The arrays of one fluid holding the given fraction of the x planes of the lattice.
+        '''
+        itemsize = np.dtype(precision).itemsize
+        populations_count = self._populations_count
+        cells_count = self._cells_count * planes_fraction
+        active_cells_count = self._active_cells_count * planes_fraction
+        population_array = populations_count * cells_count * itemsize
+
+        components = {
+            "populations": population_array,
+            "boundary_fields": cells_count * (2 + 6 * itemsize),
+            "constant_velocity_links": self._constant_velocity_cells_count * planes_fraction * populations_count
+            * (2 * 8 + 4 * itemsize + 1),
+        }
+
+        if kernel == "sparse":
+            compact_populations = populations_count * active_cells_count
+            index_itemsize = 4 if compact_populations < np.iinfo(np.int32).max else 8
+            components["compact_populations"] = 2 * compact_populations * itemsize
+            components["streaming_table"] = compact_populations * index_itemsize + cells_count * 8
+            components["sparse_setup"] = self.SPARSE_SETUP_INDEX_ARRAYS * compact_populations * 8
+            return {name: int(size) for name, size in components.items()}
+
+        components["no_slip_links"] = (6 * self._no_slip_links_count
+                                       + (populations_count + 1) * self._wall_surface_cells_count) \
+            * planes_fraction * 8
+        if backend == "numba" or kernel == "fused":
+            components["scratch_populations"] = population_array
+            components["moments"] = cells_count * (6 * itemsize + 1) if backend == "numpy" else 0
+        else:
+            components["step_temporaries"] = self.REFERENCE_TEMPORARIES * population_array
+
+        return {name: int(size) for name, size in components.items()}
+
+    def plan(self, precision: str = None, kernel: str = "reference", direction_major: bool = False,
+             backend: str = "numpy", workers: int = 1) -> MemoryPlan:
+        '''
+        The layout does not change the size of any array, it is only recorded in the plan.
+        '''
+        precision = precision if precision is not None else self.precision
+        if kernel == "sparse" and (backend != "numpy" or workers > 1):
+            raise ValueError("The sparse kernel is only available with the numpy backend and a single worker.")
+        if not 1 <= workers <= self.shape[0]:
+            raise ValueError(f"Invalid number of workers: {workers}. It must be between 1 and {self.shape[0]}.")
+
+        if workers == 1:
+            components = self._fluid_components(precision, kernel, backend, 1.0)
+        else:
+            parent_components = self._fluid_components(precision, kernel, backend, 1.0)
+            planes_fraction = (self.shape[0] + 2 * workers) / self.shape[0]
+            components = {
+                "shared_lattice": parent_components["populations"],
+                "boundary_fields": parent_components["boundary_fields"],
+                "workers": sum(self._fluid_components(precision, kernel, backend, planes_fraction).values()),
+            }
+
+        return MemoryPlan(precision, kernel, backend, direction_major, workers, components)
+
+    def candidates(self, precision: str = None, kernel: str = "reference", direction_major: bool = False,
+                   backend: str = "numpy", workers: int = 1, downgrade_precision: bool = True) -> list[MemoryPlan]:
+        '''
+        The requested plan followed by its downgrades, in order of preference: other kernels in the same precision,
+        then float32. Slab plans with more workers always need more memory in total, so they are not downgrades.
+        '''
+        precision = precision if precision is not None else self.precision
+        precisions = [precision] + (["float32"] if downgrade_precision and precision != "float32" else [])
+        options = [(precision, kernel, backend, workers)]
+
+        for candidate_precision in precisions:
+            options += [(candidate_precision, kernel, backend, workers),
+                        (candidate_precision, "fused", backend, 1)]
+            if backend == "numpy":
+                options.append((candidate_precision, "sparse", "numpy", 1))
+
+        plans = []
+        for option in dict.fromkeys(options):
+            candidate_precision, candidate_kernel, candidate_backend, candidate_workers = option
+            plans.append(self.plan(candidate_precision, candidate_kernel, direction_major, candidate_backend,
+                                   candidate_workers))
+
+        return plans
+
+    def choose(self, budget_bytes: float, downgrade: bool = False, **plan_options) -> MemoryPlan:
+        '''
+        Returns the requested plan if it fits the budget, or with downgrade the first candidate that does. Raises a
+        ValueError when no allowed plan fits.
+        '''
+        plans = self.candidates(**plan_options)
+        allowed_plans = plans if downgrade else plans[:1]
+
+        for plan in allowed_plans:
+            if plan.fits(budget_bytes):
+                return plan
+
+        smallest_plan = min(allowed_plans, key=MemoryPlan.peak_bytes)
+        raise ValueError(f"The predicted peak memory exceeds the budget of {budget_bytes / GIB:.2f} GiB. "
+                         f"Smallest {'downgrade' if downgrade else 'plan'}: {smallest_plan.describe()}.")
+
+    @staticmethod
+    def main(plan_args: PlanArgs) -> int:
+        planner = MemoryPlanner(ModelConfigReader(plan_args.config_path))
+        plans = planner.candidates(plan_args.precision, plan_args.kernel, plan_args.direction_major,
+                                   plan_args.backend, plan_args.workers)
+        budget_bytes = plan_args.memory_budget * GIB if plan_args.memory_budget is not None else float("inf")
+
+        width, height, depth = planner.shape
+        print(f"Lattice {width}x{height}x{depth}, budget "
+              f"{'none' if plan_args.memory_budget is None else f'{plan_args.memory_budget:.2f} GiB'}")
+        for plan in plans:
+            print(f"{'fits    ' if plan.fits(budget_bytes) else 'exceeds '}{plan.describe()}")
+            for name, size in plan.components.items():
+                print(f"    {name:24s} {size / GIB:8.3f} GiB")
+
+        try:
+            chosen_plan = planner.choose(budget_bytes, True, precision=plan_args.precision, kernel=plan_args.kernel,
+                                         direction_major=plan_args.direction_major, backend=plan_args.backend,
+                                         workers=plan_args.workers)
+        except ValueError as error:
+            print(error)
+            return 1
+
+        print(f"Chosen: {chosen_plan.describe()}")
+
+        return 0
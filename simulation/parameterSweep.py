@@ -0,0 +1,178 @@
+import copy
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import numpy as np
+from model.boltzmannFluid import BoltzmannFluid
+from model.boltzmannFluidEnsemble import BoltzmannFluidEnsemble
+from utilities.argsReader import SweepArgs
+from utilities.modelConfigReader import ModelConfigReader
+from .fluidBuilder import FluidBuilder
+
+
+@dataclass
+class SweepCase:
+    '''
+    One variant of the base configuration, with the values of the swept parameters by their path in the
+    configuration, e.g. "fluid_box.viscosity" or "boundaries.7.data.velocity.x".
+    '''
+    index: int
+    parameters: dict
+    config: dict
+
+    def compatibility_key(self) -> tuple:
+        '''
+        Cases with the same key can be stepped in one ensemble.
+        '''
+        fluid_box = self.config["fluid_box"]
+
+        return (fluid_box["width"], fluid_box["height"], fluid_box["depth"], fluid_box.get("precision", "float64"),
+                fluid_box.get("stencil"), float(fluid_box["time_delta"]), float(fluid_box["cell_length"]))
+
+
+def _set_config_value(config: dict, path: str, value) -> None:
+    *parent_keys, last_key = [int(key) if key.isdigit() else key for key in path.split(".")]
+    try:
+        parent = config
+        for key in parent_keys:
+            parent = parent[key]
+        parent[last_key]
+    except (KeyError, IndexError, TypeError):
+        raise ValueError(f"Invalid sweep parameter: {path} is not in the base configuration.")
+
+    parent[last_key] = value
+
+
+def _summarise_case(case: SweepCase, fluid: BoltzmannFluid, initial_mass: float) -> dict:
+    macroscopic_fields = fluid.macroscopic_fields()
+    fluid_cells = ~fluid.no_slip_cells
+    speeds = np.linalg.norm(macroscopic_fields.velocity[fluid_cells], axis=-1)
+    total_mass = fluid.total_mass()
+
+    return {
+        "case": case.index,
+        "parameters": case.parameters,
+        "steps": fluid.steps_count,
+        "total_mass": total_mass,
+        "relative_mass_drift": (total_mass - initial_mass) / initial_mass if initial_mass != 0 else 0.0,
+        "mean_density": float(np.mean(macroscopic_fields.density[fluid_cells])),
+        "mean_speed": float(np.mean(speeds)),
+        "max_speed": float(np.max(speeds)),
+    }
+
+
+def _run_sweep_batch(cases: list[SweepCase], number_of_steps: int) -> tuple[list[dict], float]:
+    '''
+    Builds the fluids of one batch, steps them as one ensemble and returns their summaries with the stepping time.
+    '''
+    fluids = [FluidBuilder(ModelConfigReader(None, case.config)).build() for case in cases]
+    initial_masses = [fluid.total_mass() for fluid in fluids]
+    ensemble = BoltzmannFluidEnsemble(fluids)
+
+    start_time = time.perf_counter()
+    ensemble.run(number_of_steps)
+    stepping_time = time.perf_counter() - start_time
+
+    return [_summarise_case(case, fluid, initial_mass)
+            for case, fluid, initial_mass in zip(cases, fluids, initial_masses)], stepping_time
+
+
+class ParameterSweep:
+    '''
+    Runs every combination of a parameter grid over a base configuration. The sweep file holds the path of the base
+    configuration, the number of steps and the grid:
+
+        {"base_config": "input/config_scenario_3.json", "number_of_steps": 500,
+         "grid": {"fluid_box.viscosity": [0.0002, 0.0004], "boundaries.7.data.velocity.x": [0.1, 0.15]}}
+
+    Cases that share the lattice shape, precision, stencil, time step and cell length are batched into ensembles of
+    up to ensemble_size fluids, and the batches are spread over a pool of worker processes. Every case gets a JSON
+    summary in the output directory, next to a throughput report of the whole sweep.
+    '''
+    def __init__(self, sweep_args: SweepArgs) -> None:
+        if sweep_args.ensemble_size < 1:
+            raise ValueError(f"Invalid ensemble size: {sweep_args.ensemble_size}. It must be at least 1.")
+        if sweep_args.workers < 1:
+            raise ValueError(f"Invalid number of workers: {sweep_args.workers}. It must be at least 1.")
+
+        with open(sweep_args.sweep_path) as sweep_file:
+            sweep = json.load(sweep_file)
+        with open(sweep["base_config"]) as base_config_file:
+            self._base_config = json.load(base_config_file)
+
+        self._sweep_args = sweep_args
+        self._grid = sweep["grid"]
+        self._number_of_steps = sweep_args.number_of_steps if sweep_args.number_of_steps is not None \
+            else sweep["number_of_steps"]
+
+    def cases(self) -> list[SweepCase]:
+        cases = []
+        for index, values in enumerate(itertools.product(*self._grid.values())):
+            parameters = dict(zip(self._grid, values))
+            config = copy.deepcopy(self._base_config)
+            for path, value in parameters.items():
+                _set_config_value(config, path, value)
+            cases.append(SweepCase(index, parameters, config))
+
+        return cases
+
+    def batches(self) -> list[list[SweepCase]]:
+        compatible_cases = {}
+        for case in self.cases():
+            compatible_cases.setdefault(case.compatibility_key(), []).append(case)
+
+        ensemble_size = self._sweep_args.ensemble_size
+
+        return [cases[start:start + ensemble_size] for cases in compatible_cases.values()
+                for start in range(0, len(cases), ensemble_size)]
+
+    def run(self) -> dict:
+        batches = self.batches()
+        start_time = time.perf_counter()
+
+        if self._sweep_args.workers == 1:
+            results = [_run_sweep_batch(batch, self._number_of_steps) for batch in batches]
+        else:
+            with ProcessPoolExecutor(self._sweep_args.workers,
+                                     mp_context=multiprocessing.get_context("spawn")) as executor:
+                results = list(executor.map(_run_sweep_batch, batches, [self._number_of_steps] * len(batches)))
+
+        wall_time = time.perf_counter() - start_time
+        summaries = [summary for batch_summaries, _ in results for summary in batch_summaries]
+        report = self._throughput_report(batches, [stepping_time for _, stepping_time in results], wall_time)
+        self._write_outputs(summaries, report)
+
+        return report
+
+    def _throughput_report(self, batches: list[list[SweepCase]], stepping_times: list[float],
+                           wall_time: float) -> dict:
+        lattice_updates = sum(len(batch) * int(np.prod(batch[0].compatibility_key()[:3])) * self._number_of_steps
+                              for batch in batches)
+
+        return {
+            "cases": sum(len(batch) for batch in batches),
+            "batches": len(batches),
+            "workers": self._sweep_args.workers,
+            "number_of_steps": self._number_of_steps,
+            "wall_time": wall_time,
+            "stepping_time": sum(stepping_times),
+            "cases_per_second": sum(len(batch) for batch in batches) / wall_time if wall_time > 0 else float("inf"),
+            "mlups": lattice_updates / wall_time / 1e6 if wall_time > 0 else float("inf"),
+        }
+
+    def _write_outputs(self, summaries: list[dict], report: dict) -> None:
+        output_path = self._sweep_args.output_path
+        os.makedirs(output_path, exist_ok=True)
+
+        for summary in summaries:
+            with open(os.path.join(output_path, f"case_{summary['case']:05d}.json"), "w") as summary_file:
+                json.dump(summary, summary_file, indent=2)
+        with open(os.path.join(output_path, "throughput.json"), "w") as report_file:
+            json.dump(report, report_file, indent=2)
+
+        print(f"Ran {report['cases']} cases in {report['batches']} batches on {report['workers']} workers "
+              f"in {report['wall_time']:.3f} s: {report['cases_per_second']:.2f} cases/s, {report['mlups']:.2f} MLUPS")
@@ -0,0 +1,63 @@
+from model.boltzmannFluid import BoltzmannFluid
+from utilities.argsReader import SimulationArgs
+from .checkpointWriter import CheckpointWriter
+from .fieldStore import FieldExporter
+from .fluidTelemetry import FluidTelemetry
+from .slabDomainRunner import SlabDomainRunner
+
+
+class RunHooks:
+    '''
+    The work both simulators do around the steps of a fluid: checkpoints, field export and metrics telemetry when
+    their paths are given, and the teardown of the fluid at the end of the run.
+    '''
+    def __init__(self, checkpoint_writer: CheckpointWriter = None, field_exporter: FieldExporter = None,
+                 telemetry: FluidTelemetry = None) -> None:
+        self.checkpoint_writer = checkpoint_writer
+        self.field_exporter = field_exporter
+        self.telemetry = telemetry
+
+    @staticmethod
+    def from_args(simulation_args: SimulationArgs, fluid: BoltzmannFluid | SlabDomainRunner) -> 'RunHooks':
+        '''
+        Builds the hooks the arguments ask for. The checkpoint writer handles SIGTERM from now on, the initial fields
+        are exported and the telemetry instruments the fluid.
+        '''
+        run_hooks = RunHooks()
+
+        if simulation_args.checkpoint_path is not None:
+            run_hooks.checkpoint_writer = CheckpointWriter(simulation_args.checkpoint_path,
+                                                           simulation_args.checkpoint_every,
+                                                           simulation_args.checkpoint_float32)
+            run_hooks.checkpoint_writer.install_signal_handler()
+        if simulation_args.export_path is not None:
+            run_hooks.field_exporter = FieldExporter.from_args(simulation_args, fluid)
+            run_hooks.field_exporter.on_step(fluid)
+        if simulation_args.metrics_path is not None:
+            run_hooks.telemetry = FluidTelemetry.from_args(simulation_args)
+            run_hooks.telemetry.attach(fluid)
+
+        return run_hooks
+
+    @property
+    def termination_requested(self) -> bool:
+        return self.checkpoint_writer is not None and self.checkpoint_writer.termination_requested
+
+    def on_step(self, fluid: BoltzmannFluid | SlabDomainRunner) -> None:
+        if self.field_exporter is not None:
+            self.field_exporter.on_step(fluid)
+        if self.checkpoint_writer is not None:
+            self.checkpoint_writer.on_step(fluid)
+        if self.telemetry is not None:
+            self.telemetry.on_step(fluid)
+
+    def close(self, fluid: BoltzmannFluid | SlabDomainRunner) -> None:
+        '''
+        Writes the final checkpoint and metrics, then stops the workers of a slab runner.
+        '''
+        if self.checkpoint_writer is not None:
+            self.checkpoint_writer.close(fluid)
+        if self.telemetry is not None:
+            self.telemetry.close(fluid)
+        if isinstance(fluid, SlabDomainRunner):
+            fluid.close()
@@ -3,20 +3,16 @@ import os
 
 from simulation.windowDTO import WindowProperties
 from .fluidRenderer import FluidRenderer
-from utilities.argsReader import ArgsReader
+from utilities.argsReader import ArgsReader, SimulationArgs
 from utilities.modelConfigReader import ModelConfigReader
-from model.boltzmannFluid import BoltzmannFluid
-from utilities.DTO.boundaryConditionDTO import (
-    BoundaryConditionNoSlipDelta,
-    BoundaryConditionConstantVelocityDelta,
-    BoundaryConditionInitialDelta
-)
+from .fluidBuilder import FluidBuilder
+from .runHooks import RunHooks
 
 
 class Simulator:   
-    def __init__(self):
+    def __init__(self, simulation_args: SimulationArgs = None):
         self._simulation_steps_count = 0
-        self._simulation_args = ArgsReader.read_args()
+        self._simulation_args = simulation_args if simulation_args is not None else ArgsReader.read_args()
         self._model_config_reader = ModelConfigReader(self._simulation_args.config_path)
         print(self._simulation_args)
 
@@ -28,22 +24,12 @@ class Simulator:
 
     def _init_fluid(self) -> None:
         lattice_shape = self._model_config_reader.lattice_dimensions()
-        simulation_parameters = self._model_config_reader.simulation_parameters()
-        self._fluid = BoltzmannFluid(lattice_shape.to_tuple(), simulation_parameters)
-        for boundary_condition_delta in self._model_config_reader.boundary_conditions():
-            match boundary_condition_delta:
-                case BoundaryConditionNoSlipDelta() as no_slip_boundary_condition_delta:
-                    self._fluid.update_no_slip_boundary(no_slip_boundary_condition_delta)
-                case BoundaryConditionConstantVelocityDelta() as constant_velocity_boundary_condition_delta:
-                    self._fluid.update_constant_velocity_boundary(constant_velocity_boundary_condition_delta)
-                case BoundaryConditionInitialDelta() as initial_boundary_condition_delta:
-                    self._fluid.update_initial_boundary(initial_boundary_condition_delta)
-                case _:
-                    raise ValueError(f"Invalid boundary condition type: {type(boundary_condition_delta)}")
-        self._fluid.prepare_boundary_conditions()
-
         if not 0 <= self._simulation_args.z < lattice_shape.get_z():
-            raise ValueError(f"Invalid z coordinate: {self._simulation_args.z}. Change value to one within the boundaries ({lattice_shape.get_z()}).")
+            raise ValueError(f"Invalid z coordinate: {self._simulation_args.z}. Change value to one within the "
+                             f"boundaries ({lattice_shape.get_z()}).")
+
+        self._fluid = FluidBuilder(self._model_config_reader).build_from_args(self._simulation_args)
+        self._run_hooks = RunHooks.from_args(self._simulation_args, self._fluid)
 
     def _pygame_init(self) -> None:
         pygame.init()
@@ -54,7 +40,7 @@ class Simulator:
             if self._simulation_args.draw_on_screen else None
         self._clock = pygame.time.Clock()
         self._running = True
-        self._simulation_steps_count = 0
+        self._simulation_steps_count = self._fluid.steps_count
         self._fluid_renderer = FluidRenderer(self.window, self.constants, self._simulation_args,
                                              self._model_config_reader.lattice_dimensions().to_tuple())
 
@@ -66,17 +52,19 @@ class Simulator:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self._running = False
+        if self._run_hooks.termination_requested:
+            self._running = False
 
     def _simulation_step(self) -> None:
         self._fluid.simulation_step()
         self._simulation_steps_count += 1
-        print(f"Simulation step: {self._simulation_steps_count}/{self._simulation_args.number_of_steps}")
+        self._run_hooks.on_step(self._fluid)
 
     def _pygame_render(self) -> None:
         if self._simulation_args.draw_on_screen:
             self.window.fill(self.constants.BLACK)
 
-        self._fluid_renderer.render_fluid(self._fluid, self._simulation_args.z)
+        self._fluid_renderer.render_fluid(self._fluid, self._simulation_args.z, self._simulation_steps_count)
 
         if not self._simulation_args.draw_on_screen:
             return
@@ -97,6 +85,7 @@ class Simulator:
 
                 if not self._running:
                     break
+            print(f"Simulation step: {self._simulation_steps_count}/{self._simulation_args.number_of_steps}")
 
             self._pygame_render()
 
@@ -104,5 +93,6 @@ class Simulator:
 
     def _pygame_quit(self) -> None:
         self._running = False
+        self._run_hooks.close(self._fluid)
         pygame.quit()
 
@@ -0,0 +1,193 @@
+import multiprocessing
+import traceback
+from multiprocessing import shared_memory
+import numpy as np
+from model.boltzmannFluid import BoltzmannFluid
+from model.boltzmannFluidUtils import BoltzmannFluidState, MacroscopicFields
+from model.latticeStencil import LatticeStencil
+from utilities.DTO.simulationParameters import SimulationParameters
+
+
+class _SlabWorker:
+    '''
+    Steps one slab of the lattice in a worker process. The local fluid holds the owned x planes with one ghost plane
+    on each side, all exchanged through the shared lattice buffer:
+    - after streaming, so that the boundary conditions see the streamed populations of the neighbouring cells,
+    - after the boundary conditions, so that the next streaming step reads the final populations of the neighbours.
+    Every exchange writes the owned edge planes, waits for all workers, reads the ghost planes and waits again.
+    '''
+    def __init__(self, fluid: BoltzmannFluid, start: int, end: int, shared_memory_name: str,
+                 shape: tuple[int, int, int, int], dtype: np.dtype, barrier: multiprocessing.Barrier) -> None:
+        self._fluid = fluid
+        self._start = start
+        self._end = end
+        self._barrier = barrier
+        self._shared_memory = shared_memory.SharedMemory(name=shared_memory_name)
+        self._lattice = np.ndarray(shape, dtype=dtype, buffer=self._shared_memory.buf)
+
+    def _exchange_ghost_planes(self) -> None:
+        width = self._lattice.shape[0]
+        cell_populations = self._fluid.boltzmann_state().cell_populations()
+
+        self._lattice[self._start] = cell_populations[1]
+        self._lattice[self._end - 1] = cell_populations[-2]
+        self._barrier.wait()
+        cell_populations[0] = self._lattice[(self._start - 1) % width]
+        cell_populations[-1] = self._lattice[self._end % width]
+        self._barrier.wait()
+
+    def simulation_step(self) -> None:
+        self._fluid.collide_and_stream()
+        self._exchange_ghost_planes()
+        self._fluid.apply_boundary_conditions()
+        self._exchange_ghost_planes()
+
+    def gather(self) -> None:
+        self._lattice[self._start:self._end] = self._fluid.boltzmann_state().cell_populations()[1:-1]
+
+    def close(self) -> None:
+        del self._lattice
+        self._shared_memory.close()
+
+
+def _run_slab_worker(connection, fluid: BoltzmannFluid, start: int, end: int, shared_memory_name: str,
+                     shape: tuple[int, int, int, int], dtype: np.dtype, barrier: multiprocessing.Barrier) -> None:
+    worker = _SlabWorker(fluid, start, end, shared_memory_name, shape, dtype, barrier)
+
+    try:
+        while True:
+            command, argument = connection.recv()
+            if command == "step":
+                for _ in range(argument):
+                    worker.simulation_step()
+            elif command == "gather":
+                worker.gather()
+            elif command == "stop":
+                break
+            connection.send(("done", None))
+    except Exception:
+        worker._barrier.abort()
+        connection.send(("error", traceback.format_exc()))
+    finally:
+        worker.close()
+        connection.close()
+
+
+class SlabDomainRunner:
+    '''
+    Runs a BoltzmannFluid split along x into one slab per worker process. The populations of the whole lattice live
+    in one shared memory block, which the workers use to exchange their ghost planes and to gather the state.
+    The periodic x edge is the exchange between the first and the last slab.
+
+    The runner provides simulation_step, boltzmann_state, macroscopic_slice and total_mass like BoltzmannFluid,
+    keeps the boundary conditions of the whole lattice for rendering, and has to be closed to stop the workers and
+    release the shared memory.
+    '''
+    def __init__(self, fluid: BoltzmannFluid, workers_count: int) -> None:
+        fluid_state = fluid.boltzmann_state()
+        width = fluid_state.lattice_shape()[0]
+
+        if fluid._kernel == "sparse":
+            raise ValueError("The sparse kernel can not be split into slabs.")
+        if not 1 <= workers_count <= width:
+            raise ValueError(f"Invalid number of workers: {workers_count}. It must be between 1 and {width}.")
+
+        cell_populations = fluid_state.cell_populations()
+        self._simulation_params = fluid.simulation_params
+        self._stencil = fluid.stencil
+        self._no_slip_boundary_conditions = fluid._no_slip_boundary_conditions
+        self._constant_velocity_boundary_conditions = fluid._constant_velocity_boundary_conditions
+        self._allowed_velocities = fluid_state.allowed_velocities
+        self._direction_major = fluid_state.direction_major
+        self.steps_count = fluid.steps_count
+        self._shared_memory = shared_memory.SharedMemory(create=True, size=cell_populations.nbytes)
+        self._lattice = np.ndarray(cell_populations.shape, dtype=cell_populations.dtype,
+                                   buffer=self._shared_memory.buf)
+        self._lattice[:] = cell_populations
+
+        # Forking a process that already runs JIT or BLAS threads can deadlock, so the workers are spawned
+        context = multiprocessing.get_context("spawn")
+        self._barrier = context.Barrier(workers_count)
+        self._connections = []
+        self._processes = []
+
+        for slab in np.array_split(np.arange(width), workers_count):
+            start, end = int(slab[0]), int(slab[-1]) + 1
+            sub_fluid = fluid.sub_domain(np.arange(start - 1, end + 1) % width)
+
+            connection, worker_connection = context.Pipe()
+            process = context.Process(target=_run_slab_worker,
+                                      args=(worker_connection, sub_fluid, start, end, self._shared_memory.name,
+                                            self._lattice.shape, self._lattice.dtype, self._barrier),
+                                      daemon=True)
+            process.start()
+            self._connections.append(connection)
+            self._processes.append(process)
+
+    def _send_to_workers(self, command: str, argument=None) -> None:
+        for connection in self._connections:
+            connection.send((command, argument))
+
+        for connection, process in zip(self._connections, self._processes):
+            while not connection.poll(0.1):
+                if not process.is_alive():
+                    raise RuntimeError(f"Slab worker exited with code {process.exitcode}.")
+
+            status, message = connection.recv()
+            if status == "error":
+                raise RuntimeError(f"Slab worker failed:\n{message}")
+
+    @property
+    def stencil(self) -> LatticeStencil:
+        return self._stencil
+
+    @property
+    def simulation_params(self) -> SimulationParameters:
+        return self._simulation_params
+
+    def run(self, number_of_steps: int) -> None:
+        self._send_to_workers("step", number_of_steps)
+        self.steps_count += number_of_steps
+
+    def simulation_step(self) -> None:
+        self.run(1)
+
+    def boltzmann_state(self) -> BoltzmannFluidState:
+        self._send_to_workers("gather")
+        fluid_state = BoltzmannFluidState.from_fluid_state(self._lattice.copy(), self._allowed_velocities)
+
+        return fluid_state.to_layout(self._direction_major)
+
+    def macroscopic_slice(self, z: int) -> MacroscopicFields:
+        return MacroscopicFields.from_boltzmann_state(self.boltzmann_state().z_slice(z),
+                                                      self._simulation_params).z_slice(0)
+
+    def total_mass(self) -> float:
+        return self.boltzmann_state().total_mass()
+
+    def macroscopic_fields(self) -> MacroscopicFields:
+        return MacroscopicFields.from_boltzmann_state(self.boltzmann_state(), self._simulation_params)
+
+    def max_population(self) -> float:
+        return float(self.boltzmann_state().fluid_state.max())
+
+    def close(self) -> None:
+        if not self._processes:
+            return
+
+        for connection, process in zip(self._connections, self._processes):
+            if process.is_alive():
+                connection.send(("stop", None))
+        for process in self._processes:
+            process.join()
+
+        self._processes = []
+        del self._lattice
+        self._shared_memory.close()
+        self._shared_memory.unlink()
+
+    def __enter__(self) -> 'SlabDomainRunner':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
@@ -0,0 +1,87 @@
+import numpy as np
+from model.boltzmannFluid import BoltzmannFluid
+from model.fluidDirectionProvider import FluidDirectionProvider
+from utilities.DTO.D3Q19 import D3Q19ParticleFunction
+from utilities.DTO.vector3 import Vector3Int, Vector3Float
+from utilities.DTO.simulationParameters import SimulationParameters
+from utilities.DTO.boundaryConditionDTO import (
+    BoundaryCube,
+    BoundaryConditionNoSlipDelta,
+    BoundaryConditionConstantVelocityDelta,
+    BoundaryConditionInitialDelta
+)
+
+
+LATTICE_DIMENSIONS = (24, 16, 3)
+PLANAR_LATTICE_DIMENSIONS = (24, 16, 1)
+
+
+simulation_parameters = SimulationParameters.example_config
+
+
+def _cube(x: int, y: int, z: int, width: int, height: int, depth: int) -> BoundaryCube:
+    start_position = Vector3Int(x, y, z)
+    return BoundaryCube(start_position, start_position + Vector3Int(width, height, depth))
+
+
+def boundary_conditions() -> list:
+    '''
+    A small channel with walls, an inlet in front of the back wall, obstacles next to the periodic x edge and a
+    non-uniform initial state.
+    '''
+    initial_background = [10.0] + [0.0] * 18
+    initial_jet = [8.0, 0.0, 2.0, 0.0, 1.0, 0.0, 0.5] + [0.25] * 12
+
+    return [
+        BoundaryConditionNoSlipDelta(_cube(0, 0, 0, 24, 1, 3)),
+        BoundaryConditionNoSlipDelta(_cube(0, 15, 0, 24, 1, 3)),
+        BoundaryConditionNoSlipDelta(_cube(10, 5, 0, 4, 4, 2)),
+        BoundaryConditionNoSlipDelta(_cube(22, 9, 0, 2, 3, 3)),
+        BoundaryConditionNoSlipDelta(_cube(0, 1, 0, 1, 14, 3)),
+        BoundaryConditionConstantVelocityDelta(_cube(1, 0, 0, 1, 16, 3),
+                                               Vector3Float(0.15, 0.025, 0.0),
+                                               Vector3Float(1.0, 0.0, 0.0)),
+        BoundaryConditionInitialDelta(_cube(0, 0, 0, 24, 16, 3), D3Q19ParticleFunction(initial_background)),
+        BoundaryConditionInitialDelta(_cube(4, 4, 0, 5, 6, 2), D3Q19ParticleFunction(initial_jet)),
+    ]
+
+
+def _z_symmetric(boundary_condition_delta: BoundaryConditionInitialDelta) -> BoundaryConditionInitialDelta:
+    directions = FluidDirectionProvider.get_all_directions()
+    mirrored_directions = directions * [1, 1, -1]
+    mirrored_indices = [int(np.flatnonzero(np.all(directions == direction, axis=-1))[0])
+                        for direction in mirrored_directions]
+    populations = boundary_condition_delta.boltzmann_f19.vectors
+
+    return BoundaryConditionInitialDelta(boundary_condition_delta.boundary_cube,
+                                         D3Q19ParticleFunction(list((populations + populations[mirrored_indices]) / 2)))
+
+
+def planar_boundary_conditions() -> list:
+    '''
+    The boundary conditions of the channel on a lattice one cell deep, with initial states that are symmetric in z, so
+    that D3Q19 keeps no z momentum and steps the same flow as D2Q9.
+    '''
+    return [_z_symmetric(delta) if isinstance(delta, BoundaryConditionInitialDelta) else delta
+            for delta in boundary_conditions()]
+
+
+def build_fluid(precision: str = "float64", simulation_params: SimulationParameters = None,
+                lattice_dimensions: tuple[int, int, int] = LATTICE_DIMENSIONS, **fluid_options) -> BoltzmannFluid:
+    if simulation_params is None:
+        simulation_params = simulation_parameters(precision)
+
+    fluid = BoltzmannFluid(lattice_dimensions, simulation_params, **fluid_options)
+    deltas = boundary_conditions() if lattice_dimensions[2] > 1 else planar_boundary_conditions()
+
+    for boundary_condition_delta in deltas:
+        match boundary_condition_delta:
+            case BoundaryConditionNoSlipDelta():
+                fluid.update_no_slip_boundary(boundary_condition_delta)
+            case BoundaryConditionConstantVelocityDelta():
+                fluid.update_constant_velocity_boundary(boundary_condition_delta)
+            case BoundaryConditionInitialDelta():
+                fluid.update_initial_boundary(boundary_condition_delta)
+    fluid.prepare_boundary_conditions()
+
+    return fluid
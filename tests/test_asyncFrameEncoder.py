@@ -0,0 +1,77 @@
+import threading
+import unittest
+import numpy as np
+from simulation.asyncFrameEncoder import AsyncFrameEncoder, FrameSnapshot
+from simulation.frameComposer import FrameComposer
+
+
+class RecordingVideoOutput:
+    def __init__(self, write_event: threading.Event = None) -> None:
+        self.frames = []
+        self.released = False
+        self._write_event = write_event
+
+    def write(self, frame_bgr: np.ndarray) -> None:
+        if self._write_event is not None:
+            self._write_event.wait()
+        self.frames.append(frame_bgr)
+
+    def release(self) -> None:
+        self.released = True
+
+
+class FailingVideoOutput(RecordingVideoOutput):
+    def write(self, frame_bgr: np.ndarray) -> None:
+        raise IOError("disk full")
+
+
+def create_snapshot(step: int) -> FrameSnapshot:
+    return FrameSnapshot(step, np.full((8, 4), 1.0 + step), np.random.default_rng(step).normal(size=(8, 4, 3)))
+
+
+def create_composer() -> FrameComposer:
+    return FrameComposer(use_density=False, canvas_size=FrameComposer.output_dimensions((8, 4)))
+
+
+class TestAsyncFrameEncoder(unittest.TestCase):
+    def test_blocking_mode_encodes_every_frame(self):
+        video_output = RecordingVideoOutput()
+        frame_encoder = AsyncFrameEncoder(create_composer(), video_output, queue_size=1)
+
+        for step in range(5):
+            self.assertTrue(frame_encoder.submit(create_snapshot(step)))
+        frame_encoder.close()
+
+        self.assertEqual(len(video_output.frames), 5)
+        self.assertEqual(frame_encoder.encoded_frames_count, 5)
+        self.assertEqual(frame_encoder.dropped_frames_count, 0)
+        self.assertTrue(video_output.released)
+
+    def test_drop_mode_drops_frames_when_queue_is_full(self):
+        write_event = threading.Event()
+        video_output = RecordingVideoOutput(write_event)
+        frame_encoder = AsyncFrameEncoder(create_composer(), video_output, queue_size=1, drop_frames=True)
+
+        submitted = [frame_encoder.submit(create_snapshot(step)) for step in range(5)]
+        write_event.set()
+        frame_encoder.close()
+
+        self.assertIn(False, submitted)
+        self.assertEqual(frame_encoder.encoded_frames_count + frame_encoder.dropped_frames_count, 5)
+        self.assertEqual(frame_encoder.dropped_frames_count, submitted.count(False))
+        self.assertEqual(len(video_output.frames), frame_encoder.encoded_frames_count)
+
+    def test_encoding_error_is_raised_in_caller(self):
+        frame_encoder = AsyncFrameEncoder(create_composer(), FailingVideoOutput())
+        frame_encoder.submit(create_snapshot(0))
+
+        with self.assertRaises(RuntimeError):
+            frame_encoder.close()
+
+    def test_invalid_queue_size(self):
+        with self.assertRaises(ValueError):
+            AsyncFrameEncoder(create_composer(), RecordingVideoOutput(), queue_size=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
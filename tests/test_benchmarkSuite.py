@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from simulation.benchmarkSuite import BenchmarkResult, BenchmarkSuite
+from utilities.argsReader import BenchmarkArgs
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def test_runs_every_operator_and_kernel(self):
+        benchmark_args = BenchmarkArgs([(12, 8, 2)], [0.0, 0.25], "float64", 1, "", None, 0.2)
+        results = BenchmarkSuite(benchmark_args).run()
+
+        names = {result.name for result in results}
+        self.assertTrue(set(BenchmarkSuite.OPERATORS) <= names)
+        self.assertIn("step_fused", names)
+        self.assertEqual(len({result.key() for result in results}), len(results))
+        self.assertTrue(all(result.mlups > 0 and result.peak_memory_bytes >= 0 for result in results))
+
+    def test_obstacle_covers_fraction(self):
+        fluid = BenchmarkSuite.build_fluid((20, 20, 1), 0.25)
+        no_slip_cells = fluid._no_slip_boundary_conditions.affected_cells
+
+        self.assertEqual(np.count_nonzero(no_slip_cells[:, 1:-1]), 100)
+        with self.assertRaises(ValueError):
+            BenchmarkSuite.build_fluid((20, 20, 1), 1.0)
+
+    def test_compare_reports_regressions(self):
+        baseline = [BenchmarkResult("density", (8, 8, 1), 0.0, 1.0, 10.0, 1000),
+                    BenchmarkResult("velocity", (8, 8, 1), 0.0, 1.0, 10.0, 1000)]
+        results = [BenchmarkResult("density", (8, 8, 1), 0.0, 2.0, 5.0, 1000),
+                   BenchmarkResult("velocity", (8, 8, 1), 0.0, 1.0, 9.0, 1100),
+                   BenchmarkResult("streaming", (8, 8, 1), 0.0, 1.0, 1.0, 1000)]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "baseline.json")
+            BenchmarkSuite.save(baseline, path)
+            regressions = BenchmarkSuite.compare(results, BenchmarkSuite.load(path), 0.2)
+
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("density/8x8x1/0"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+import unittest
+import numpy as np
+from dataclasses import replace
+from latticeFixtures import (
+    build_fluid,
+    boundary_conditions,
+    simulation_parameters,
+    LATTICE_DIMENSIONS,
+    PLANAR_LATTICE_DIMENSIONS
+)
+from model.boltzmannFluid import BoltzmannFluid
+from model.d2q9DirectionProvider import D2Q9DirectionProvider
+from utilities.DTO.boundaryConditionDTO import BoundaryConditionNoSlipDelta, BoundaryConditionInitialDelta, BoundaryCube
+from utilities.DTO.vector3 import Vector3Int
+
+
+class TestBoltzmannFluid(unittest.TestCase):
+    def test_direction_major_layout_matches_cell_major(self):
+        cell_major_fluid = build_fluid()
+        direction_major_fluid = build_fluid(direction_major=True)
+
+        for _ in range(10):
+            cell_major_fluid.simulation_step()
+            direction_major_fluid.simulation_step()
+
+        self.assertEqual(direction_major_fluid._fluid_state.fluid_state.shape[0], 19)
+        np.testing.assert_allclose(direction_major_fluid._fluid_state.cell_populations(),
+                                   cell_major_fluid._fluid_state.fluid_state, rtol=1e-10, atol=1e-12)
+
+    def test_fused_kernel_direction_major_layout(self):
+        reference_fluid = build_fluid()
+        fused_fluid = build_fluid(kernel="fused", direction_major=True)
+
+        for _ in range(10):
+            reference_fluid.simulation_step()
+            fused_fluid.simulation_step()
+
+        np.testing.assert_allclose(fused_fluid._fluid_state.cell_populations(),
+                                   reference_fluid._fluid_state.fluid_state, rtol=1e-10, atol=1e-12)
+
+    def test_macroscopic_fields_are_cached_until_next_step(self):
+        fluid = build_fluid()
+        fluid.simulation_step()
+
+        macroscopic_fields = fluid.macroscopic_fields()
+
+        self.assertIs(fluid.macroscopic_fields(), macroscopic_fields)
+        self.assertFalse(macroscopic_fields.density.flags.writeable)
+        self.assertFalse(macroscopic_fields.velocity.flags.writeable)
+        np.testing.assert_allclose(macroscopic_fields.density, fluid._fluid_state.fluid_state.sum(axis=-1))
+
+        fluid.simulation_step()
+
+        self.assertIsNot(fluid.macroscopic_fields(), macroscopic_fields)
+
+    def test_attach_populations(self):
+        fluid = build_fluid()
+        reference_fluid = build_fluid()
+        populations = np.zeros((2,) + fluid.boltzmann_state().fluid_state.shape)
+
+        macroscopic_fields = fluid.macroscopic_fields()
+        fluid.attach_populations(populations[1], copy=True)
+        self.assertIsNot(fluid.macroscopic_fields(), macroscopic_fields)
+        np.testing.assert_array_equal(populations[1], reference_fluid.boltzmann_state().fluid_state)
+
+        fluid.attach_populations(populations[0])
+        self.assertTrue(np.shares_memory(fluid.boltzmann_state().fluid_state, populations[0]))
+        with self.assertRaises(ValueError):
+            fluid.attach_populations(populations[:, 0])
+
+    def test_macroscopic_slice_matches_whole_lattice(self):
+        for kernel in ("reference", "sparse"):
+            fluid = build_fluid(kernel=kernel, direction_major=kernel == "reference")
+            for _ in range(3):
+                fluid.simulation_step()
+
+            macroscopic_slice = fluid.macroscopic_slice(1)
+            self.assertIs(fluid.macroscopic_slice(1), macroscopic_slice)
+
+            macroscopic_fields = fluid.macroscopic_fields()
+
+            self.assertEqual(macroscopic_slice.density.shape, (24, 16))
+            np.testing.assert_allclose(macroscopic_slice.density, macroscopic_fields.density[:, :, 1])
+            np.testing.assert_allclose(macroscopic_slice.velocity, macroscopic_fields.velocity[:, :, 1], atol=1e-12)
+
+    def test_macroscopic_slice_invalid_z(self):
+        with self.assertRaises(ValueError):
+            build_fluid().macroscopic_slice(3)
+
+
+    def test_moving_gate_matches_full_rebuild(self):
+        for kernel in ("reference", "fused", "sparse"):
+            with self.subTest(kernel=kernel):
+                fluid = build_fluid(kernel=kernel)
+                rebuilt_fluid = build_fluid(kernel=kernel)
+                gate = BoundaryConditionNoSlipDelta(BoundaryCube(Vector3Int(16, 1, 0), Vector3Int(17, 8, 3)))
+                gate_id = fluid.update_no_slip_boundary(gate)
+                rebuilt_fluid.update_no_slip_boundary(gate)
+                fluid.prepare_boundary_conditions()
+                rebuilt_fluid.prepare_boundary_conditions()
+
+                for y in range(1, 6):
+                    for _ in range(2):
+                        fluid.simulation_step()
+                        rebuilt_fluid.simulation_step()
+
+                    cube = BoundaryCube(Vector3Int(16, y, 0), Vector3Int(17, y + 7, 3))
+                    fluid.move_no_slip_boundary(gate_id, cube)
+                    rebuilt_fluid.move_no_slip_boundary(gate_id, cube)
+                    rebuilt_fluid._no_slip_boundary_conditions._links = None
+
+                fluid.simulation_step()
+                rebuilt_fluid.simulation_step()
+                np.testing.assert_allclose(fluid.boltzmann_state().fluid_state,
+                                           rebuilt_fluid.boltzmann_state().fluid_state, rtol=1e-12, atol=1e-14)
+                self.assertEqual(fluid.boltzmann_state().cell_populations()[16, 5:12].sum(), 0)
+
+    def test_planar_lattice_uses_d2q9(self):
+        fluid = build_fluid(lattice_dimensions=PLANAR_LATTICE_DIMENSIONS)
+
+        self.assertEqual(fluid._stencil.name, "D2Q9")
+        self.assertEqual(fluid.boltzmann_state().fluid_state.shape, PLANAR_LATTICE_DIMENSIONS + (9,))
+        with self.assertRaises(ValueError):
+            build_fluid(stencil="D2Q9")
+
+    def test_d2q9_matches_projected_d3q19(self):
+        for kernel in ("reference", "fused", "sparse"):
+            with self.subTest(kernel=kernel):
+                spatial_fluid = build_fluid(lattice_dimensions=PLANAR_LATTICE_DIMENSIONS, kernel=kernel,
+                                            stencil="D3Q19")
+                planar_fluid = build_fluid(lattice_dimensions=PLANAR_LATTICE_DIMENSIONS, kernel=kernel)
+
+                for _ in range(20):
+                    spatial_fluid.simulation_step()
+                    planar_fluid.simulation_step()
+
+                np.testing.assert_allclose(
+                    planar_fluid.boltzmann_state().fluid_state,
+                    D2Q9DirectionProvider.project_d3q19(spatial_fluid.boltzmann_state().fluid_state),
+                    rtol=1e-10, atol=1e-12)
+                np.testing.assert_allclose(planar_fluid.macroscopic_fields().velocity,
+                                           spatial_fluid.macroscopic_fields().velocity, rtol=1e-10, atol=1e-12)
+
+    def test_stencil_from_simulation_parameters(self):
+        fluid = build_fluid(simulation_params=replace(simulation_parameters(), stencil="D3Q15"))
+
+        self.assertEqual(fluid._stencil.name, "D3Q15")
+        self.assertEqual(fluid.boltzmann_state().fluid_state.shape, LATTICE_DIMENSIONS + (15,))
+        self.assertEqual(build_fluid(simulation_params=replace(simulation_parameters(), stencil="D3Q15"),
+                                     stencil="D3Q27")._stencil.name, "D3Q27")
+
+    def test_stencils_keep_mass_with_walls(self):
+        for stencil in ("D3Q15", "D3Q19", "D3Q27"):
+            for kernel in ("reference", "fused", "sparse"):
+                with self.subTest(stencil=stencil, kernel=kernel):
+                    fluid = BoltzmannFluid(LATTICE_DIMENSIONS, simulation_parameters(), kernel, stencil=stencil)
+                    for boundary_condition_delta in boundary_conditions():
+                        match boundary_condition_delta:
+                            case BoundaryConditionNoSlipDelta():
+                                fluid.update_no_slip_boundary(boundary_condition_delta)
+                            case BoundaryConditionInitialDelta():
+                                fluid.update_initial_boundary(boundary_condition_delta)
+                    fluid.prepare_boundary_conditions()
+                    initial_mass = fluid.macroscopic_fields().density.sum()
+
+                    for _ in range(20):
+                        fluid.simulation_step()
+
+                    self.assertTrue(np.all(np.isfinite(fluid.boltzmann_state().fluid_state)))
+                    self.assertAlmostEqual(fluid.macroscopic_fields().density.sum() / initial_mass, 1, places=12)
+
+    def test_stencils_match_between_kernels(self):
+        for stencil in ("D3Q15", "D3Q27"):
+            with self.subTest(stencil=stencil):
+                reference_fluid = build_fluid(stencil=stencil)
+                fused_fluid = build_fluid(stencil=stencil, kernel="fused", direction_major=True)
+
+                for _ in range(10):
+                    reference_fluid.simulation_step()
+                    fused_fluid.simulation_step()
+
+                np.testing.assert_allclose(fused_fluid.boltzmann_state().cell_populations(),
+                                           reference_fluid.boltzmann_state().fluid_state, rtol=1e-10, atol=1e-12)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+from dataclasses import replace
+import numpy as np
+from latticeFixtures import build_fluid, simulation_parameters
+from model.boltzmannFluidEnsemble import BoltzmannFluidEnsemble
+
+
+class TestBoltzmannFluidEnsemble(unittest.TestCase):
+    def test_matches_separately_stepped_fluids(self):
+        parameters = simulation_parameters()
+        viscous_parameters = replace(parameters, relaxation_time=parameters.relaxation_time * 1.5)
+
+        fluids = [build_fluid(kernel="fused"), build_fluid(simulation_params=viscous_parameters, kernel="fused")]
+        ensemble_fluids = [build_fluid(), build_fluid(simulation_params=viscous_parameters)]
+        ensemble = BoltzmannFluidEnsemble(ensemble_fluids)
+
+        for _ in range(10):
+            for fluid in fluids:
+                fluid.simulation_step()
+        ensemble.run(10)
+
+        for fluid, ensemble_fluid in zip(fluids, ensemble_fluids):
+            self.assertEqual(ensemble_fluid.steps_count, 10)
+            np.testing.assert_allclose(ensemble_fluid.boltzmann_state().fluid_state,
+                                       fluid.boltzmann_state().fluid_state, rtol=1e-12, atol=1e-12)
+        self.assertFalse(np.allclose(ensemble_fluids[0].boltzmann_state().fluid_state,
+                                     ensemble_fluids[1].boltzmann_state().fluid_state))
+
+    def test_rejects_incompatible_fluids(self):
+        with self.assertRaises(ValueError):
+            BoltzmannFluidEnsemble([build_fluid(), build_fluid(kernel="sparse")])
+        with self.assertRaises(ValueError):
+            BoltzmannFluidEnsemble([build_fluid(), build_fluid(precision="float32")])
+
+
+if __name__ == "__main__":
+    unittest.main()
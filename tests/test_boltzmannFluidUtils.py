@@ -1,6 +1,7 @@
 import unittest
 import numpy as np
 from model.boltzmannFluidUtils import BoltzmannFluidState, FluidDensityState, FluidVelocityState
+from model.fluidDirectionProvider import FluidDirectionProvider
 from utilities.DTO.boundaryConditionDTO import BoundaryConditionInitialDelta
 from utilities.DTO.simulationParameters import SimulationParameters
 
@@ -22,6 +23,38 @@ class TestFluidVelocityState(unittest.TestCase):
         self.assertEqual(fluid_velocity_state.velocity_state.shape, (10, 10, 10, 3))
 
 
+class TestBoltzmannFluidState(unittest.TestCase):
+    def setUp(self):
+        self.allowed_velocities = FluidDirectionProvider.get_all_directions()
+        self.fluid_state_matrix = np.random.default_rng(0).random((4, 3, 2, 19))
+        self.simulation_config = SimulationParameters(0.0002, 0.0125, 0.01, 0.5, 0.6)
+
+    def test_to_layout_round_trip(self):
+        cell_major_state = BoltzmannFluidState.from_fluid_state(self.fluid_state_matrix, self.allowed_velocities)
+        direction_major_state = cell_major_state.to_layout(direction_major=True)
+
+        self.assertEqual(direction_major_state.fluid_state.shape, (19, 4, 3, 2))
+        self.assertTrue(direction_major_state.fluid_state.flags.c_contiguous)
+        self.assertEqual(direction_major_state.lattice_shape(), (4, 3, 2))
+        np.testing.assert_array_equal(direction_major_state.cell_populations(), self.fluid_state_matrix)
+        np.testing.assert_array_equal(direction_major_state.to_layout(direction_major=False).fluid_state,
+                                      self.fluid_state_matrix)
+
+    def test_moments_do_not_depend_on_layout(self):
+        cell_major_state = BoltzmannFluidState.from_fluid_state(self.fluid_state_matrix, self.allowed_velocities)
+        direction_major_state = cell_major_state.to_layout(direction_major=True)
+
+        cell_major_density = FluidDensityState.from_boltzmann_state(cell_major_state)
+        direction_major_density = FluidDensityState.from_boltzmann_state(direction_major_state)
+        np.testing.assert_allclose(direction_major_density.density_state, cell_major_density.density_state)
+
+        cell_major_velocity = FluidVelocityState.from_boltzmann_state(cell_major_state, cell_major_density,
+                                                                      self.simulation_config)
+        direction_major_velocity = FluidVelocityState.from_boltzmann_state(direction_major_state,
+                                                                           direction_major_density,
+                                                                           self.simulation_config)
+        np.testing.assert_allclose(direction_major_velocity.velocity_state, cell_major_velocity.velocity_state)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,344 @@
+import contextlib
+import io
+import os
+import unittest
+from dataclasses import replace
+from unittest import mock
+import numpy as np
+from model.boltzmannFluidUtils import BoltzmannFluidState
+from model.boundaryConditions import NoSlipBoundaryConditions, ConstantVelocityBoundaryConditions
+from model.fluidDirectionProvider import FluidDirectionProvider
+from simulation.fluidBuilder import FluidBuilder
+from utilities.DTO.boundaryConditionDTO import (
+    BoundaryConditionNoSlipDelta,
+    BoundaryConditionConstantVelocityDelta,
+    BoundaryCube
+)
+from utilities.DTO.vector3 import Vector3Int, Vector3Float
+from utilities.modelConfigReader import ModelConfigReader
+
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "input", "config.json")
+
+
+def _roll_no_slip(fluid_state_matrix: np.ndarray, affected_cells: np.ndarray,
+                  allowed_velocities: np.ndarray) -> np.ndarray:
+    '''
+    Full lattice bounce-back with one np.roll per direction, on a (w_x, w_y, w_z, 19) matrix.
+    '''
+    reverse_direction_indeces = FluidDirectionProvider.get_reverse_directions_indices()
+    fluid_state_matrix = fluid_state_matrix.copy()
+    affected_fluid_matrix = fluid_state_matrix * affected_cells[..., np.newaxis]
+    fluid_state_matrix[affected_cells] = 0
+
+    for i, dr in enumerate(allowed_velocities):
+        dx, dy, dz = -dr.astype(np.int32)
+        fluid_state_matrix[..., reverse_direction_indeces[i]] += np.roll(affected_fluid_matrix[..., i],
+                                                                         (dx, dy, dz), axis=(0, 1, 2))
+
+    return fluid_state_matrix
+
+
+def _loop_constant_velocity(fluid_state_matrix: np.ndarray, affected_cells: np.ndarray, velocity: np.ndarray,
+                            normal_vectors: np.ndarray, allowed_velocities: np.ndarray) -> np.ndarray:
+    '''
+    Constant velocity boundary with one np.roll per direction, on a (w_x, w_y, w_z, 19) matrix.
+    '''
+    reverse_direction_indeces = FluidDirectionProvider.get_reverse_directions_indices()
+    fluid_state_matrix = fluid_state_matrix.copy()
+    density = np.sum(fluid_state_matrix, axis=-1)
+
+    normal_vectors_dot_directions = normal_vectors @ allowed_velocities.T
+    sum_partial_coefficients = 1 - np.abs(normal_vectors_dot_directions)
+    affected_fluid_mask = (normal_vectors_dot_directions < 0) & affected_cells[..., np.newaxis]
+    affected_fluid_matrix = fluid_state_matrix * affected_fluid_mask
+    fluid_state_matrix[affected_cells] = 0
+
+    for i, dr in enumerate(allowed_velocities):
+        tangential_vectors = dr - normal_vectors * (normal_vectors @ dr)[..., np.newaxis]
+        sum_all_coefficients = sum_partial_coefficients * (tangential_vectors @ allowed_velocities.T)
+
+        all_terms_sum = affected_fluid_matrix[..., i] \
+            - density / 6 * (velocity @ dr) \
+            - density / 3 * np.sum(tangential_vectors * velocity, axis=-1) \
+            + 0.5 * np.sum(affected_fluid_matrix * sum_all_coefficients, axis=-1)
+        all_terms_sum *= affected_fluid_mask[..., i]
+
+        dx, dy, dz = -dr.astype(np.int32)
+        fluid_state_matrix[..., reverse_direction_indeces[i]] += np.roll(all_terms_sum, (dx, dy, dz), axis=(0, 1, 2))
+
+    fluid_state_matrix[affected_cells] = 0
+
+    return fluid_state_matrix
+
+
+def _baseline_process_fluid_state(boundary_conditions: ConstantVelocityBoundaryConditions,
+                                  fluid_state: BoltzmannFluidState) -> None:
+    '''
+    The constant velocity boundary before it was vectorised, on a cell-major D3Q19 state. all_terms_sum is a view of
+    affected_fluid_matrix, so the terms of every direction are added to the populations the later directions read.
+    '''
+    fluid_state_matrix = fluid_state.fluid_state
+    allowed_velocities = boundary_conditions.allowed_velocities
+    density = np.sum(fluid_state_matrix, axis=-1)
+    affected_fluid_matrix = fluid_state_matrix * boundary_conditions.affected_cells[..., np.newaxis]
+
+    normal_vectors_dot_directions = np.inner(boundary_conditions.normal_vectors, allowed_velocities)
+    sum_partial_coefficients = 1 - np.abs(normal_vectors_dot_directions)
+    affected_fluid_mask = normal_vectors_dot_directions < 0
+    affected_fluid_matrix *= affected_fluid_mask
+    fluid_state_matrix[boundary_conditions.affected_cells] = 0
+
+    for i, dr in enumerate(allowed_velocities):
+        dx, dy, dz = -dr.astype(np.int32)
+        tangential_vectors = dr - boundary_conditions.normal_vectors * \
+            np.inner(boundary_conditions.normal_vectors, dr)[..., np.newaxis]
+        sum_all_coefficients = sum_partial_coefficients * np.inner(tangential_vectors, allowed_velocities)
+
+        all_terms_sum = affected_fluid_matrix[..., i]
+        all_terms_sum += -density / 6 * np.inner(boundary_conditions.velocity, dr)
+        all_terms_sum += -density / 3 * np.sum(tangential_vectors * boundary_conditions.velocity, axis=-1)
+        all_terms_sum += 0.5 * np.sum(affected_fluid_matrix * sum_all_coefficients, axis=-1)
+
+        fluid_state_matrix[..., boundary_conditions.reverse_direction_indeces[i]] += \
+            np.roll(all_terms_sum * affected_fluid_mask[..., i], (dx, dy, dz), axis=(0, 1, 2))
+
+
+class TestNoSlipBoundaryConditions(unittest.TestCase):
+    def setUp(self):
+        self.shape = (8, 6, 4)
+        self.allowed_velocities = FluidDirectionProvider.get_all_directions()
+
+        self.boundary_conditions = NoSlipBoundaryConditions(self.shape, self.allowed_velocities)
+        for start, end in [((2, 1, 0), (5, 4, 3)), ((6, 0, 0), (8, 6, 1))]:
+            cube = BoundaryCube(Vector3Int(*start), Vector3Int(*end))
+            self.boundary_conditions.update_boundary(BoundaryConditionNoSlipDelta(cube))
+
+        # Fluid streams only into the wall cells next to fluid, the inside of a wall stays empty
+        affected_cells = self.boundary_conditions.affected_cells
+        inside_wall_cells = affected_cells.copy()
+        for dr in self.allowed_velocities.astype(np.int32):
+            inside_wall_cells &= np.roll(affected_cells, tuple(dr), axis=(0, 1, 2))
+
+        self.fluid_state_matrix = np.random.default_rng(0).random(self.shape + (19,))
+        self.fluid_state_matrix[inside_wall_cells] = 0
+
+    def _process(self, direction_major: bool) -> np.ndarray:
+        fluid_state = BoltzmannFluidState.from_fluid_state(self.fluid_state_matrix.copy(), self.allowed_velocities)
+        fluid_state = fluid_state.to_layout(direction_major)
+
+        self.boundary_conditions.process_fluid_state(fluid_state)
+        self.boundary_conditions.remove_fluid_from_wall_surface(fluid_state)
+
+        return fluid_state.cell_populations()
+
+    def test_links_match_full_lattice_bounce_back(self):
+        expected = _roll_no_slip(self.fluid_state_matrix, self.boundary_conditions.affected_cells,
+                                 self.allowed_velocities)
+        expected[self.boundary_conditions.affected_cells] = 0
+
+        for direction_major in (False, True):
+            np.testing.assert_array_equal(self._process(direction_major), expected)
+
+    def test_links_only_cover_wall_surface(self):
+        self._process(direction_major=False)
+        links = self.boundary_conditions._links
+
+        self.assertEqual(len(links.source_indices), len(links.target_indices))
+        self.assertEqual(len(np.unique(links.target_indices)), len(links.target_indices))
+        self.assertLess(len(links.wall_surface_indices) // 19,
+                        np.count_nonzero(self.boundary_conditions.affected_cells))
+
+
+class TestConstantVelocityBoundaryConditions(unittest.TestCase):
+    def setUp(self):
+        self.shape = (8, 6, 4)
+        self.allowed_velocities = FluidDirectionProvider.get_all_directions()
+
+        self.boundary_conditions = ConstantVelocityBoundaryConditions(self.shape, self.allowed_velocities)
+        for start, end, velocity, normal in [((0, 0, 0), (1, 6, 4), (0.1, 0.02, 0.0), (1.0, 0.0, 0.0)),
+                                             ((3, 5, 1), (7, 6, 3), (0.05, -0.03, 0.01), (0.0, -1.0, 0.0))]:
+            cube = BoundaryCube(Vector3Int(*start), Vector3Int(*end))
+            self.boundary_conditions.update_boundary(
+                BoundaryConditionConstantVelocityDelta(cube, Vector3Float(*velocity), Vector3Float(*normal)))
+
+        self.fluid_state_matrix = np.random.default_rng(1).random(self.shape + (19,))
+
+    def _process(self, direction_major: bool) -> np.ndarray:
+        fluid_state = BoltzmannFluidState.from_fluid_state(self.fluid_state_matrix.copy(), self.allowed_velocities)
+        fluid_state = fluid_state.to_layout(direction_major)
+
+        self.boundary_conditions.process_fluid_state(fluid_state)
+        self.boundary_conditions.remove_fluid_from_boundary(fluid_state)
+
+        return fluid_state.cell_populations()
+
+    def test_matches_loop_over_directions(self):
+        expected = _loop_constant_velocity(self.fluid_state_matrix, self.boundary_conditions.affected_cells,
+                                           self.boundary_conditions.velocity, self.boundary_conditions.normal_vectors,
+                                           self.allowed_velocities)
+
+        for direction_major in (False, True):
+            np.testing.assert_allclose(self._process(direction_major), expected, rtol=1e-12, atol=1e-12)
+
+    def test_differs_from_baseline_only_next_to_the_boundary(self):
+        '''
+        input/config.json in D3Q19, stepped with the baseline boundary and with the current one. The baseline reads
+        populations it has already modified, so the two differ, but only in the cells the boundary reached by
+        streaming: at most one cell per step from the inlet at x = 0.
+        '''
+        steps_count = 3
+        with contextlib.redirect_stdout(io.StringIO()):
+            model_config_reader = ModelConfigReader(CONFIG_PATH)
+            simulation_parameters = replace(model_config_reader.simulation_parameters(), stencil="D3Q19")
+            fluid = FluidBuilder(model_config_reader).build(simulation_parameters)
+            baseline_fluid = FluidBuilder(model_config_reader).build(simulation_parameters)
+
+        for _ in range(steps_count):
+            fluid.simulation_step()
+        with mock.patch.object(ConstantVelocityBoundaryConditions, "process_fluid_state",
+                               _baseline_process_fluid_state):
+            for _ in range(steps_count):
+                baseline_fluid.simulation_step()
+
+        populations = fluid.boltzmann_state().cell_populations()
+        baseline_populations = baseline_fluid.boltzmann_state().cell_populations()
+        difference = np.max(np.abs(populations - baseline_populations), axis=(1, 2, 3))
+
+        self.assertGreater(difference[1], 1e-2)
+        self.assertTrue(np.all(difference[1:steps_count + 1] > 0))
+        np.testing.assert_array_equal(populations[steps_count + 1:], baseline_populations[steps_count + 1:])
+
+    def test_coefficients_are_cached_until_boundary_update(self):
+        self._process(direction_major=False)
+        coefficients = self.boundary_conditions.get_coefficients()
+        self._process(direction_major=False)
+        self.assertIs(self.boundary_conditions.get_coefficients(), coefficients)
+
+        cube = BoundaryCube(Vector3Int(7, 0, 0), Vector3Int(8, 6, 4))
+        self.boundary_conditions.update_boundary(
+            BoundaryConditionConstantVelocityDelta(cube, Vector3Float(-0.1, 0.0, 0.0), Vector3Float(-1.0, 0.0, 0.0)))
+        self.assertIsNot(self.boundary_conditions.get_coefficients(), coefficients)
+        self.assertEqual(len(self.boundary_conditions.get_coefficients().cells),
+                         np.count_nonzero(self.boundary_conditions.affected_cells))
+
+
+def _cube(start: tuple[int, int, int], end: tuple[int, int, int]) -> BoundaryCube:
+    return BoundaryCube(Vector3Int(*start), Vector3Int(*end))
+
+
+class TestIncrementalBoundaryUpdates(unittest.TestCase):
+    '''
+    The links and coefficients updated in the changed regions match the ones built from the final geometry.
+    '''
+    def setUp(self):
+        self.shape = (10, 8, 4)
+        self.allowed_velocities = FluidDirectionProvider.get_all_directions()
+        self.fluid_state_matrix = np.random.default_rng(2).random(self.shape + (19,))
+
+    def _fluid_state(self, direction_major: bool) -> BoltzmannFluidState:
+        fluid_state = BoltzmannFluidState.from_fluid_state(self.fluid_state_matrix.copy(), self.allowed_velocities)
+        return fluid_state.to_layout(direction_major)
+
+    def _assert_processed_equal(self, boundary_conditions, expected_boundary_conditions) -> None:
+        for direction_major in (False, True):
+            fluid_state = self._fluid_state(direction_major)
+            expected_fluid_state = self._fluid_state(direction_major)
+
+            boundary_conditions.process_fluid_state(fluid_state)
+            expected_boundary_conditions.process_fluid_state(expected_fluid_state)
+            np.testing.assert_allclose(fluid_state.cell_populations(), expected_fluid_state.cell_populations(),
+                                       rtol=1e-12, atol=1e-12)
+
+    def _no_slip(self, cubes: list[BoundaryCube]) -> NoSlipBoundaryConditions:
+        boundary_conditions = NoSlipBoundaryConditions(self.shape, self.allowed_velocities)
+        for cube in cubes:
+            boundary_conditions.update_boundary(BoundaryConditionNoSlipDelta(cube))
+
+        return boundary_conditions
+
+    def test_no_slip_add_move_and_remove(self):
+        cubes = [_cube((0, 0, 0), (10, 1, 4)), _cube((3, 2, 0), (5, 5, 4)), _cube((8, 3, 1), (10, 6, 3))]
+        boundary_conditions = self._no_slip(cubes)
+        self._assert_processed_equal(boundary_conditions, self._no_slip(cubes))
+        links = boundary_conditions._links
+
+        gate_id = boundary_conditions.update_boundary(BoundaryConditionNoSlipDelta(_cube((0, 4, 0), (1, 8, 4))))
+        self._assert_processed_equal(boundary_conditions, self._no_slip(cubes + [_cube((0, 4, 0), (1, 8, 4))]))
+
+        boundary_conditions.move_boundary(1, _cube((4, 2, 0), (6, 6, 4)))
+        boundary_conditions.move_boundary(gate_id, _cube((9, 4, 0), (10, 8, 4)))
+        self._assert_processed_equal(boundary_conditions,
+                                     self._no_slip([cubes[0], _cube((4, 2, 0), (6, 6, 4)), cubes[2],
+                                                    _cube((9, 4, 0), (10, 8, 4))]))
+
+        boundary_conditions.remove_boundary(0)
+        self._assert_processed_equal(boundary_conditions,
+                                     self._no_slip([_cube((4, 2, 0), (6, 6, 4)), cubes[2],
+                                                    _cube((9, 4, 0), (10, 8, 4))]))
+        self.assertIs(boundary_conditions._links, links)
+
+    def test_removing_overlapping_cube_keeps_other_cube(self):
+        boundary_conditions = self._no_slip([_cube((2, 2, 0), (6, 6, 4)), _cube((4, 4, 0), (8, 8, 4))])
+        boundary_conditions.remove_boundary(1)
+
+        np.testing.assert_array_equal(boundary_conditions.affected_cells,
+                                      self._no_slip([_cube((2, 2, 0), (6, 6, 4))]).affected_cells)
+
+    def test_no_slip_rebuilds_after_untracked_changes(self):
+        boundary_conditions = self._no_slip([_cube((0, 0, 0), (10, 1, 4))])
+        gate_id = boundary_conditions.update_boundary(BoundaryConditionNoSlipDelta(_cube((2, 2, 0), (3, 6, 4))))
+        boundary_conditions.process_fluid_state(self._fluid_state(False))
+
+        for x in range(NoSlipBoundaryConditions.MAX_CHANGED_REGIONS + 1):
+            boundary_conditions.move_boundary(gate_id, _cube((x % 10, 2, 0), (x % 10 + 1, 6, 4)))
+        self.assertIsNone(boundary_conditions.changes_since(boundary_conditions._links.version))
+
+        self._assert_processed_equal(boundary_conditions,
+                                     self._no_slip([_cube((0, 0, 0), (10, 1, 4)), _cube((4, 2, 0), (5, 6, 4))]))
+
+    def test_no_slip_keeps_background_cells(self):
+        background_cells = self._no_slip([_cube((3, 2, 0), (5, 5, 4))]).affected_cells
+        boundary_conditions = NoSlipBoundaryConditions(self.shape, self.allowed_velocities)
+        boundary_conditions.set_cells(background_cells)
+        gate_id = boundary_conditions.update_boundary(BoundaryConditionNoSlipDelta(_cube((4, 4, 0), (7, 7, 4))))
+        boundary_conditions.process_fluid_state(self._fluid_state(False))
+
+        boundary_conditions.remove_boundary(gate_id)
+        self._assert_processed_equal(boundary_conditions, self._no_slip([_cube((3, 2, 0), (5, 5, 4))]))
+
+    def test_invalid_boundary_id(self):
+        boundary_conditions = self._no_slip([_cube((0, 0, 0), (10, 1, 4))])
+
+        with self.assertRaises(ValueError):
+            boundary_conditions.remove_boundary(1)
+
+    def test_constant_velocity_add_move_and_remove(self):
+        deltas = [BoundaryConditionConstantVelocityDelta(_cube((0, 0, 0), (1, 8, 4)), Vector3Float(0.1, 0.02, 0.0),
+                                                         Vector3Float(1.0, 0.0, 0.0)),
+                  BoundaryConditionConstantVelocityDelta(_cube((3, 7, 1), (7, 8, 3)), Vector3Float(0.05, -0.03, 0.01),
+                                                         Vector3Float(0.0, -1.0, 0.0))]
+
+        def build(final_deltas: list) -> ConstantVelocityBoundaryConditions:
+            constant_velocity_boundary_conditions = ConstantVelocityBoundaryConditions(self.shape,
+                                                                                       self.allowed_velocities)
+            for boundary_condition_delta in final_deltas:
+                constant_velocity_boundary_conditions.update_boundary(boundary_condition_delta)
+            return constant_velocity_boundary_conditions
+
+        boundary_conditions = build(deltas)
+        self._assert_processed_equal(boundary_conditions, build(deltas))
+
+        boundary_conditions.move_boundary(0, _cube((2, 0, 0), (3, 8, 4)))
+        moved_delta = BoundaryConditionConstantVelocityDelta(_cube((2, 0, 0), (3, 8, 4)), deltas[0].velocity,
+                                                             deltas[0].normal)
+        self._assert_processed_equal(boundary_conditions, build([moved_delta, deltas[1]]))
+
+        boundary_conditions.remove_boundary(1)
+        self._assert_processed_equal(boundary_conditions, build([moved_delta]))
+        self.assertEqual(len(boundary_conditions.get_coefficients().cells),
+                         np.count_nonzero(boundary_conditions.affected_cells))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import importlib.util
+import unittest
+from unittest import mock
+import numpy as np
+from latticeFixtures import build_fluid, LATTICE_DIMENSIONS
+from model.boltzmannFluidUtils import BoltzmannFluidState
+from model.computeBackend import create_backend, NumpyBackend
+
+
+NUMBA_AVAILABLE = importlib.util.find_spec("numba") is not None
+
+
+class TestNumpyBackend(unittest.TestCase):
+    def test_invalid_backend(self):
+        with self.assertRaises(ValueError):
+            build_fluid(backend="opencl")
+
+    def test_missing_numba_falls_back_to_numpy(self):
+        with mock.patch.dict("sys.modules", {"model.numbaBackend": None}), self.assertWarns(UserWarning):
+            fluid = build_fluid(backend="numba")
+
+        self.assertIsInstance(fluid._backend, NumpyBackend)
+        fluid.simulation_step()
+
+
+@unittest.skipUnless(NUMBA_AVAILABLE, "numba is not installed")
+class TestNumbaBackend(unittest.TestCase):
+    def _assert_matches_numpy_backend(self, **fluid_options):
+        numpy_fluid = build_fluid(**fluid_options)
+        numba_fluid = build_fluid(backend="numba", **fluid_options)
+        self.assertEqual(numba_fluid._backend.NAME, "numba")
+
+        for _ in range(10):
+            numpy_fluid.simulation_step()
+            numba_fluid.simulation_step()
+
+        np.testing.assert_allclose(numba_fluid.boltzmann_state().cell_populations(),
+                                   numpy_fluid.boltzmann_state().cell_populations(), rtol=1e-10, atol=1e-12)
+
+    def test_matches_numpy_backend(self):
+        self._assert_matches_numpy_backend()
+
+    def test_matches_numpy_backend_direction_major(self):
+        self._assert_matches_numpy_backend(direction_major=True)
+
+    def test_matches_numpy_backend_float32(self):
+        numpy_fluid = build_fluid(precision="float32")
+        numba_fluid = build_fluid(precision="float32", backend="numba")
+
+        for _ in range(10):
+            numpy_fluid.simulation_step()
+            numba_fluid.simulation_step()
+
+        self.assertEqual(numba_fluid.boltzmann_state().fluid_state.dtype, np.float32)
+        np.testing.assert_allclose(numba_fluid.boltzmann_state().fluid_state,
+                                   numpy_fluid.boltzmann_state().fluid_state, rtol=1e-4, atol=1e-5)
+
+    def test_operators_match_numpy_backend(self):
+        fluid = build_fluid()
+        fluid.simulation_step()
+        fluid_state = fluid.boltzmann_state()
+        backend_arguments = (LATTICE_DIMENSIONS, fluid._directions, fluid._equilibrium_weights,
+                             fluid._simulation_params)
+        numpy_backend = create_backend("numpy", *backend_arguments)
+        numba_backend = create_backend("numba", *backend_arguments)
+
+        density = numpy_backend.density(fluid_state)
+        velocity = numpy_backend.velocity(fluid_state, density)
+        equilibrium = numpy_backend.equilibrium(density, velocity)
+        np.testing.assert_allclose(numba_backend.density(fluid_state), density, rtol=1e-12)
+        np.testing.assert_allclose(numba_backend.velocity(fluid_state, density), velocity, rtol=1e-12, atol=1e-14)
+        np.testing.assert_allclose(numba_backend.equilibrium(density, velocity), equilibrium, rtol=1e-12)
+
+        numpy_state = BoltzmannFluidState.from_fluid_state(fluid_state.fluid_state.copy(), fluid._directions)
+        numba_state = BoltzmannFluidState.from_fluid_state(fluid_state.fluid_state.copy(), fluid._directions)
+        numpy_backend.relax(numpy_state, equilibrium)
+        numpy_backend.stream(numpy_state)
+        numba_backend.relax(numba_state, equilibrium)
+        numba_backend.stream(numba_state)
+        np.testing.assert_allclose(numba_state.fluid_state, numpy_state.fluid_state, rtol=1e-12, atol=1e-14)
+
+    def test_sparse_kernel_is_not_available(self):
+        with self.assertRaises(ValueError):
+            build_fluid(kernel="sparse", backend="numba")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import numpy as np
+from model import d2q9Tables
+from model.d2q9DirectionProvider import D2Q9DirectionProvider
+from model.fluidDirectionProvider import FluidDirectionProvider
+from model.latticeStencil import get_stencil
+from utilities.DTO.vector3 import Vector3Int
+
+
+class TestD2Q9DirectionProvider(unittest.TestCase):
+    def test_get_direction(self):
+        for i in range(9):
+            direction = D2Q9DirectionProvider.get_direction(i)
+            self.assertIsInstance(direction, Vector3Int)
+            self.assertEqual(direction.get_z(), 0)
+
+        with self.assertRaises(ValueError):
+            D2Q9DirectionProvider.get_direction(9)
+
+    def test_directions_are_the_planar_d3q19_directions(self):
+        directions = D2Q9DirectionProvider.get_all_directions()
+        spatial_directions = FluidDirectionProvider.get_all_directions()
+
+        self.assertEqual(directions.shape, (9, 3))
+        self.assertEqual(len(np.unique(directions, axis=0)), 9)
+        for direction in directions:
+            self.assertTrue(np.any(np.all(spatial_directions == direction, axis=-1)))
+
+    def test_get_reverse_directions_indices(self):
+        directions = D2Q9DirectionProvider.get_all_directions()
+        reverse_indices = D2Q9DirectionProvider.get_reverse_directions_indices()
+
+        np.testing.assert_array_equal(directions[reverse_indices], -directions)
+
+    def test_projection_sums_every_d3q19_direction_once(self):
+        projection = D2Q9DirectionProvider.get_d3q19_projection()
+
+        self.assertEqual(projection.shape, (9, 19))
+        np.testing.assert_array_equal(np.sum(projection, axis=0), np.ones(19))
+        np.testing.assert_array_equal(D2Q9DirectionProvider.get_boundary_multiplicities(), [3, 3, 3, 3, 3, 1, 1, 1, 1])
+
+    def test_weights(self):
+        np.testing.assert_allclose(D2Q9DirectionProvider.get_weights(), [4 / 9] + [1 / 9] * 4 + [1 / 36] * 4)
+
+    def test_directions_match_get_direction(self):
+        for i, direction in enumerate(D2Q9DirectionProvider.get_all_directions()):
+            np.testing.assert_array_equal(direction, D2Q9DirectionProvider.get_direction(i).to_numpy())
+            self.assertEqual(D2Q9DirectionProvider.get_reverse_directions_indices()[i],
+                             D2Q9DirectionProvider.get_reverse_direction_index(i))
+
+    def test_tables_are_shared_and_read_only(self):
+        self.assertIs(D2Q9DirectionProvider.get_all_directions(), d2q9Tables.DIRECTIONS)
+        self.assertIs(D2Q9DirectionProvider.get_reverse_directions_indices(), d2q9Tables.REVERSE_INDICES)
+        self.assertIs(D2Q9DirectionProvider.get_d3q19_projection(), d2q9Tables.D3Q19_PROJECTION)
+        self.assertIs(D2Q9DirectionProvider.get_weights(), d2q9Tables.WEIGHTS)
+        self.assertIs(D2Q9DirectionProvider.get_boundary_multiplicities(), d2q9Tables.BOUNDARY_MULTIPLICITIES)
+        self.assertIs(get_stencil("D2Q9").d3q19_map, d2q9Tables.D3Q19_PROJECTION)
+
+        for table in (d2q9Tables.DIRECTIONS_INT8, d2q9Tables.DIRECTIONS, d2q9Tables.REVERSE_INDICES,
+                      d2q9Tables.D3Q19_PROJECTION, d2q9Tables.WEIGHTS, d2q9Tables.BOUNDARY_MULTIPLICITIES):
+            with self.assertRaises(ValueError):
+                table[0] = 0
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+import numpy as np
+from model import d3q19Tables
+from model.fluidDirectionProvider import FluidDirectionProvider
+from model.latticeStencil import get_stencil
+
+
+class TestD3Q19Tables(unittest.TestCase):
+    def test_directions(self):
+        directions = d3q19Tables.DIRECTIONS_INT8
+
+        self.assertEqual(directions.dtype, np.int8)
+        self.assertEqual(len(np.unique(directions, axis=0)), 19)
+        np.testing.assert_array_equal(np.abs(directions).sum(axis=-1), [0] + [1] * 6 + [2] * 12)
+        np.testing.assert_array_equal(directions[1:7], [[1, 0, 0], [-1, 0, 0], [0, 1, 0], [0, -1, 0], [0, 0, 1],
+                                                        [0, 0, -1]])
+        np.testing.assert_array_equal(directions[7:11], [[-1, -1, 0], [1, -1, 0], [-1, 1, 0], [1, 1, 0]])
+        np.testing.assert_array_equal(d3q19Tables.DIRECTIONS, directions)
+
+    def test_reverse_indices_and_opposite_pairs(self):
+        directions = d3q19Tables.DIRECTIONS_INT8
+        permuted_directions = directions[d3q19Tables.OPPOSITE_PAIR_PERMUTATION]
+
+        np.testing.assert_array_equal(directions[d3q19Tables.REVERSE_INDICES], -directions)
+        np.testing.assert_array_equal(directions[d3q19Tables.OPPOSITE_PAIRS[:, 1]],
+                                      -directions[d3q19Tables.OPPOSITE_PAIRS[:, 0]])
+        np.testing.assert_array_equal(np.sort(d3q19Tables.OPPOSITE_PAIR_PERMUTATION), np.arange(19))
+        np.testing.assert_array_equal(permuted_directions[2::2], -permuted_directions[1::2])
+
+    def test_tables_are_shared_and_read_only(self):
+        self.assertIs(FluidDirectionProvider.get_all_directions(), d3q19Tables.DIRECTIONS)
+        self.assertIs(FluidDirectionProvider.get_reverse_directions_indices(), d3q19Tables.REVERSE_INDICES)
+        self.assertIs(get_stencil("D3Q19").directions, d3q19Tables.DIRECTIONS)
+        self.assertIs(get_stencil("D3Q19").weights, d3q19Tables.WEIGHTS)
+
+        for table in (d3q19Tables.DIRECTIONS_INT8, d3q19Tables.DIRECTIONS, d3q19Tables.REVERSE_INDICES,
+                      d3q19Tables.WEIGHTS, d3q19Tables.OPPOSITE_PAIRS, d3q19Tables.OPPOSITE_PAIR_PERMUTATION):
+            with self.assertRaises(ValueError):
+                table[0] = 0
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from latticeFixtures import build_fluid, PLANAR_LATTICE_DIMENSIONS
+from model.latticeStencil import get_stencil
+from simulation.fieldStore import FieldStoreWriter, FieldStoreReader, FieldExporter
+from simulation.slabDomainRunner import SlabDomainRunner
+from utilities.argsReader import SimulationArgs
+
+
+class TestFieldStore(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._directory.name, "fields")
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_appends_and_reads_frames_across_chunks(self):
+        frames = np.random.default_rng(0).normal(size=(7, 4, 3))
+        for compress in (False, True):
+            path = os.path.join(self._path, str(compress))
+            field_store = FieldStoreWriter(path, {"density": ((4, 3), np.float64)}, frames_per_chunk=3,
+                                           compress=compress)
+            for step, frame in enumerate(frames[:5]):
+                field_store.append(step * 10, {"density": frame})
+
+            field_store = FieldStoreWriter(path, {"density": ((4, 3), np.float64)}, frames_per_chunk=3,
+                                           compress=compress)
+            for step, frame in enumerate(frames[5:], start=5):
+                field_store.append(step * 10, {"density": frame})
+
+            reader = FieldStoreReader(path)
+            density = reader.field("density")
+
+            self.assertEqual(density.shape, (7, 4, 3))
+            np.testing.assert_array_equal(reader.steps, np.arange(7) * 10)
+            np.testing.assert_array_equal(density[:], frames)
+            np.testing.assert_array_equal(density[4, 1:, 2], frames[4, 1:, 2])
+            self.assertEqual(os.path.exists(os.path.join(path, "density", "00000.zlib")), compress)
+
+    def test_rejects_other_fields_on_append(self):
+        FieldStoreWriter(self._path, {"density": ((4, 3), np.float64)})
+
+        with self.assertRaises(ValueError):
+            FieldStoreWriter(self._path, {"density": ((4, 2), np.float64)})
+
+    def test_exports_decimated_z_range(self):
+        fluid = build_fluid()
+        field_exporter = FieldExporter(self._path, (24, 16, 3), fluid.stencil, every_steps=2, dtype=np.float64,
+                                       decimation=2, z_range=(1, 3), include_populations=True)
+
+        field_exporter.on_step(fluid)
+        for _ in range(4):
+            fluid.simulation_step()
+            field_exporter.on_step(fluid)
+
+        reader = FieldStoreReader(self._path)
+        macroscopic_fields = fluid.macroscopic_fields()
+
+        np.testing.assert_array_equal(reader.steps, [0, 2, 4])
+        self.assertEqual(reader.field("velocity").shape, (3, 12, 8, 1, 3))
+        np.testing.assert_allclose(reader.field("density")[-1], macroscopic_fields.density[::2, ::2, 1:3:2])
+        np.testing.assert_allclose(reader.field("velocity")[-1], macroscopic_fields.velocity[::2, ::2, 1:3:2],
+                                   atol=1e-12)
+        np.testing.assert_array_equal(reader.field("populations")[-1],
+                                      fluid.boltzmann_state().cell_populations()[::2, ::2, 1:3:2])
+
+    def test_exports_from_slab_runner(self):
+        simulation_args = SimulationArgs(z=0, config_path=None, steps_per_frame=1, output_path=None,
+                                         number_of_steps=2, draw_on_screen=False, use_density=False,
+                                         export_path=self._path, export_every=1, export_populations=True)
+        reference_fluid = build_fluid()
+
+        with SlabDomainRunner(build_fluid(), 2) as runner:
+            field_exporter = FieldExporter.from_args(simulation_args, runner)
+            runner.simulation_step()
+            field_exporter.on_step(runner)
+            reference_fluid.simulation_step()
+
+        reader = FieldStoreReader(self._path)
+        self.assertEqual(reader.attributes["stencil"], "D3Q19")
+        np.testing.assert_allclose(reader.field("populations")[-1],
+                                   reference_fluid.boltzmann_state().cell_populations(), rtol=1e-10, atol=1e-12)
+        np.testing.assert_allclose(reader.field("density")[-1], reference_fluid.macroscopic_fields().density,
+                                   rtol=1e-10)
+
+    def test_invalid_z_range(self):
+        with self.assertRaises(ValueError):
+            FieldExporter(self._path, (24, 16, 3), get_stencil("D3Q19"), every_steps=1, dtype=np.float64,
+                          z_range=(2, 4))
+
+    def test_exports_populations_of_the_fluid_stencil(self):
+        fluid = build_fluid(lattice_dimensions=PLANAR_LATTICE_DIMENSIONS)
+        field_exporter = FieldExporter(self._path, PLANAR_LATTICE_DIMENSIONS, fluid.stencil, every_steps=1,
+                                       dtype=np.float64, include_populations=True)
+
+        fluid.simulation_step()
+        field_exporter.on_step(fluid)
+
+        reader = FieldStoreReader(self._path)
+        self.assertEqual(reader.attributes["stencil"], "D2Q9")
+        self.assertEqual(reader.field("populations").shape, (1, 24, 16, 1, 9))
+        np.testing.assert_array_equal(reader.field("populations")[-1], fluid.boltzmann_state().cell_populations())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from latticeFixtures import build_fluid, PLANAR_LATTICE_DIMENSIONS
+from model.fluidCheckpoint import FluidCheckpoint
+from simulation.checkpointWriter import CheckpointWriter
+
+
+class TestFluidCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._directory.name, "fluid.ckpt")
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_restart_continues_like_uninterrupted_run(self):
+        fluid = build_fluid(kernel="fused")
+        for _ in range(5):
+            fluid.simulation_step()
+
+        FluidCheckpoint.from_fluid(fluid).write(self._path)
+        restored_fluid = FluidCheckpoint.read(self._path).to_fluid(kernel="fused")
+
+        for _ in range(5):
+            fluid.simulation_step()
+            restored_fluid.simulation_step()
+
+        self.assertEqual(restored_fluid.steps_count, 10)
+        np.testing.assert_array_equal(restored_fluid.boltzmann_state().fluid_state,
+                                      fluid.boltzmann_state().fluid_state)
+
+    def test_restore_with_other_kernel_and_layout(self):
+        fluid = build_fluid(kernel="sparse")
+        for _ in range(3):
+            fluid.simulation_step()
+
+        FluidCheckpoint.from_fluid(fluid).write(self._path)
+        restored_fluid = FluidCheckpoint.read(self._path).to_fluid(direction_major=True)
+
+        np.testing.assert_array_equal(restored_fluid.boltzmann_state().cell_populations(),
+                                      fluid.boltzmann_state().cell_populations())
+        np.testing.assert_array_equal(restored_fluid._constant_velocity_boundary_conditions.velocity,
+                                      fluid._constant_velocity_boundary_conditions.velocity)
+        np.testing.assert_array_equal(restored_fluid._no_slip_boundary_conditions.affected_cells,
+                                      fluid._no_slip_boundary_conditions.affected_cells)
+
+    def test_downcast_to_float32(self):
+        fluid = build_fluid()
+        fluid.simulation_step()
+
+        FluidCheckpoint.from_fluid(fluid, downcast=True).write(self._path)
+        checkpoint = FluidCheckpoint.read(self._path)
+        restored_fluid = checkpoint.to_fluid()
+
+        self.assertEqual(checkpoint.populations.dtype, np.float32)
+        self.assertEqual(restored_fluid.boltzmann_state().fluid_state.dtype, np.float64)
+        np.testing.assert_allclose(restored_fluid.boltzmann_state().fluid_state, fluid.boltzmann_state().fluid_state,
+                                   rtol=1e-6)
+
+    def test_writer_checkpoints_every_interval(self):
+        fluid = build_fluid()
+        checkpoint_writer = CheckpointWriter(self._path, every_steps=2)
+
+        for _ in range(5):
+            fluid.simulation_step()
+            checkpoint_writer.on_step(fluid)
+        checkpoint_writer.close(fluid)
+
+        self.assertEqual(checkpoint_writer.written_checkpoints_count, 2)
+        self.assertEqual(FluidCheckpoint.read(self._path).steps_count, 4)
+
+    def test_writer_checkpoints_on_termination(self):
+        fluid = build_fluid()
+        checkpoint_writer = CheckpointWriter(self._path)
+        fluid.simulation_step()
+
+        checkpoint_writer._request_termination()
+        checkpoint_writer.close(fluid)
+
+        self.assertEqual(FluidCheckpoint.read(self._path).steps_count, 1)
+
+
+    def test_restore_keeps_d2q9_stencil(self):
+        fluid = build_fluid(lattice_dimensions=PLANAR_LATTICE_DIMENSIONS)
+        fluid.simulation_step()
+
+        FluidCheckpoint.from_fluid(fluid).write(self._path)
+        restored_fluid = FluidCheckpoint.read(self._path).to_fluid()
+        fluid.simulation_step()
+        restored_fluid.simulation_step()
+
+        self.assertEqual(restored_fluid._stencil.name, "D2Q9")
+        np.testing.assert_array_equal(restored_fluid.boltzmann_state().fluid_state,
+                                      fluid.boltzmann_state().fluid_state)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+import numpy as np
+from latticeFixtures import build_fluid
+from model.phaseTimer import PhaseTimer
+from simulation.fluidTelemetry import FluidTelemetry
+
+
+class TestFluidTelemetry(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_profiled_steps_match_plain_steps(self):
+        for fluid_options in ({"kernel": "reference"}, {"kernel": "fused"},
+                              {"kernel": "fused", "direction_major": True}, {"kernel": "sparse"}):
+            with self.subTest(**fluid_options):
+                fluid = build_fluid(**fluid_options)
+                profiled_fluid = build_fluid(**fluid_options)
+                phase_timer = PhaseTimer()
+                profiled_fluid.profile_phases(phase_timer)
+
+                for _ in range(3):
+                    fluid.simulation_step()
+                    profiled_fluid.simulation_step()
+
+                np.testing.assert_array_equal(profiled_fluid.boltzmann_state().fluid_state,
+                                              fluid.boltzmann_state().fluid_state)
+                self.assertGreater(phase_timer.totals["collide"], 0)
+                self.assertGreater(phase_timer.totals["stream"], 0)
+
+    def test_samples_every_interval_as_json_lines(self):
+        path = os.path.join(self._directory.name, "metrics.jsonl")
+        fluid = build_fluid(kernel="fused")
+        telemetry = FluidTelemetry(path, every_steps=2)
+        telemetry.attach(fluid)
+
+        for _ in range(5):
+            fluid.simulation_step()
+            telemetry.on_step(fluid)
+            if fluid.steps_count == 4:
+                total_mass, max_population = fluid.total_mass(), fluid.max_population()
+        telemetry.close(fluid)
+
+        with open(path) as metrics_file:
+            samples = [json.loads(line) for line in metrics_file]
+
+        self.assertEqual([sample["step"] for sample in samples], [2, 4])
+        self.assertEqual(samples[-1]["total_mass"], total_mass)
+        self.assertEqual(samples[-1]["max_population"], max_population)
+        self.assertGreater(samples[-1]["max_mach_number"], 0)
+        self.assertGreater(samples[-1]["moments_time"], 0)
+        self.assertIsNone(fluid._phase_timer)
+
+    def test_csv_appends_to_existing_file(self):
+        path = os.path.join(self._directory.name, "metrics.csv")
+        fluid = build_fluid(kernel="sparse")
+
+        for _ in range(2):
+            telemetry = FluidTelemetry(path, every_steps=1)
+            telemetry.attach(fluid)
+            fluid.simulation_step()
+            telemetry.on_step(fluid)
+            telemetry.close(fluid)
+
+        with open(path, newline="") as metrics_file:
+            rows = list(csv.DictReader(metrics_file))
+
+        self.assertEqual([int(row["step"]) for row in rows], [1, 2])
+        self.assertEqual(float(rows[0]["no_slip_time"]), 0.0)
+        self.assertGreater(float(rows[0]["constant_velocity_time"]), 0.0)
+
+    def test_invalid_interval(self):
+        with self.assertRaises(ValueError):
+            FluidTelemetry(os.path.join(self._directory.name, "metrics.jsonl"), every_steps=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
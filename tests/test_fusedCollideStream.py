@@ -0,0 +1,36 @@
+import unittest
+import numpy as np
+from latticeFixtures import build_fluid
+
+
+class TestFusedCollideStreamKernel(unittest.TestCase):
+    def test_matches_reference_kernel(self):
+        reference_fluid = build_fluid()
+        fused_fluid = build_fluid(kernel="fused")
+
+        for _ in range(10):
+            reference_fluid.simulation_step()
+            fused_fluid.simulation_step()
+
+        np.testing.assert_allclose(fused_fluid._fluid_state.fluid_state, reference_fluid._fluid_state.fluid_state,
+                                   rtol=1e-10, atol=1e-12)
+
+    def test_reuses_ping_pong_buffers(self):
+        fluid = build_fluid(kernel="fused")
+
+        fluid.simulation_step()
+        first_buffer = fluid._fluid_state.fluid_state
+        fluid.simulation_step()
+        second_buffer = fluid._fluid_state.fluid_state
+        fluid.simulation_step()
+
+        self.assertIsNot(first_buffer, second_buffer)
+        self.assertIs(fluid._fluid_state.fluid_state, first_buffer)
+
+    def test_invalid_kernel(self):
+        with self.assertRaises(ValueError):
+            build_fluid(kernel="unknown")
+
+
+if __name__ == "__main__":
+    unittest.main()
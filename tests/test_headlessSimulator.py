@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+import unittest
+import numpy as np
+from simulation.frameComposer import FrameComposer
+
+
+REPOSITORY_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEADLESS_RUN = '''
+import sys
+from simulation.headlessSimulator import HeadlessSimulator
+from utilities.argsReader import SimulationArgs
+
+simulation_args = SimulationArgs(z=0, config_path="input/config_scenario_3.json", steps_per_frame=2,
+                                 output_path="output/headless.mp4", number_of_steps=4, draw_on_screen=False,
+                                 use_density=False, kernel="sparse", save_video=False)
+HeadlessSimulator(simulation_args).run()
+print(sorted(module for module in ("pygame", "cv2", "matplotlib") if module in sys.modules))
+'''
+
+
+class TestHeadlessSimulator(unittest.TestCase):
+    def test_runs_without_display_libraries(self):
+        result = subprocess.run([sys.executable, "-c", HEADLESS_RUN], cwd=REPOSITORY_PATH, capture_output=True,
+                                text=True, check=True)
+        output_lines = result.stdout.strip().splitlines()
+
+        self.assertEqual(output_lines[-1], "[]")
+        self.assertTrue(any(line.startswith("Startup time:") for line in output_lines))
+        self.assertTrue(any("steps/s" in line for line in output_lines))
+
+
+class TestFrameComposer(unittest.TestCase):
+    def test_composes_video_frame_with_legend(self):
+        velocity_slice = np.random.default_rng(0).normal(size=(40, 20, 3))
+        frame_composer = FrameComposer(use_density=False, canvas_size=FrameComposer.output_dimensions((40, 20)))
+
+        frame, min_value, max_value = frame_composer.colour_frame(np.ones((40, 20)), velocity_slice)
+        frame_bgr = frame_composer.compose(frame, frame_composer.legend_layout(min_value, max_value))
+
+        self.assertEqual(frame.shape, (40, 20, 3))
+        self.assertEqual(frame_bgr.shape, (800, 1600, 3))
+        self.assertEqual(frame_bgr.dtype, np.uint8)
+
+    def test_hue_lookup_matches_hsv_conversion(self):
+        from matplotlib import colors
+
+        rng = np.random.default_rng(1)
+        hue, value = rng.random((30, 20)), rng.random((30, 20))
+        expected = (colors.hsv_to_rgb(np.stack([hue, np.ones_like(hue), value], axis=-1)) * 255).astype(np.uint8)
+
+        np.testing.assert_allclose(FrameComposer.hsv_to_rgb(hue, value), expected, atol=2)
+
+    def test_legend_texture_is_cached(self):
+        frame_composer = FrameComposer(use_density=True, canvas_size=(800, 1600))
+
+        first_layout = frame_composer.legend_layout(0.0, 1.0)
+        second_layout = frame_composer.legend_layout(2.0, 3.0)
+
+        self.assertIs(first_layout.texture, second_layout.texture)
+        self.assertNotEqual(first_layout.value_labels, second_layout.value_labels)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import numpy as np
+from model.d2q9DirectionProvider import D2Q9DirectionProvider
+from model.fluidDirectionProvider import FluidDirectionProvider
+from model.latticeStencil import (
+    STENCILS,
+    LatticeStencil,
+    get_stencil,
+    get_streaming_plan,
+    default_stencil_name,
+    stencil_for_populations_count
+)
+from utilities.DTO.simulationParameters import SimulationParameters
+
+
+class TestLatticeStencil(unittest.TestCase):
+    def test_registry(self):
+        self.assertEqual(set(STENCILS), {"D2Q9", "D3Q15", "D3Q19", "D3Q27"})
+        self.assertEqual(tuple(STENCILS), SimulationParameters.STENCILS)
+        for name, stencil in STENCILS.items():
+            self.assertEqual(stencil.name, name)
+            self.assertEqual(stencil.populations_count, int(name.split("Q")[1]))
+            self.assertIs(stencil_for_populations_count(stencil.populations_count), stencil)
+
+        with self.assertRaises(ValueError):
+            get_stencil("D3Q13")
+
+    def test_default_stencil(self):
+        self.assertEqual(default_stencil_name((24, 16, 1)), "D2Q9")
+        self.assertEqual(default_stencil_name((24, 16, 3)), "D3Q19")
+
+    def test_weights_are_isotropic(self):
+        for stencil in STENCILS.values():
+            with self.subTest(stencil=stencil.name):
+                directions, weights = stencil.directions, stencil.weights
+                dimensions = 2 if stencil.is_planar else 3
+                second_moment = np.einsum("i,ia,ib->ab", weights, directions, directions)
+
+                self.assertAlmostEqual(weights.sum(), 1)
+                np.testing.assert_allclose(weights @ directions, 0, atol=1e-15)
+                np.testing.assert_allclose(second_moment[:dimensions, :dimensions], np.eye(dimensions) / 3)
+
+    def test_reverse_indices(self):
+        for stencil in STENCILS.values():
+            with self.subTest(stencil=stencil.name):
+                np.testing.assert_array_equal(stencil.directions[stencil.reverse_indices], -stencil.directions)
+
+        np.testing.assert_array_equal(get_stencil("D3Q19").reverse_indices,
+                                      FluidDirectionProvider.get_reverse_directions_indices())
+        np.testing.assert_array_equal(get_stencil("D2Q9").reverse_indices,
+                                      D2Q9DirectionProvider.get_reverse_directions_indices())
+
+    def test_d3q19_map_keeps_mass_and_momentum(self):
+        populations = np.random.default_rng(3).random((4, 19))
+        d3q19_directions = FluidDirectionProvider.get_all_directions()
+
+        for stencil in STENCILS.values():
+            with self.subTest(stencil=stencil.name):
+                mapped_populations = stencil.from_d3q19(populations)
+                momentum_axes = slice(0, 2) if stencil.is_planar else slice(None)
+
+                np.testing.assert_allclose(mapped_populations.sum(axis=-1), populations.sum(axis=-1))
+                np.testing.assert_allclose((mapped_populations @ stencil.directions)[:, momentum_axes],
+                                           (populations @ d3q19_directions)[:, momentum_axes])
+
+        np.testing.assert_array_equal(get_stencil("D3Q19").d3q19_map, np.eye(19))
+        np.testing.assert_array_equal(get_stencil("D2Q9").d3q19_map, D2Q9DirectionProvider.get_d3q19_projection())
+        with self.assertRaises(ValueError):
+            LatticeStencil("D2Q5", D2Q9DirectionProvider.get_all_directions()[:5], [1 / 3] + [1 / 6] * 4, np.ones(5))
+
+    def test_arrays_are_read_only(self):
+        stencil = get_stencil("D3Q27")
+
+        with self.assertRaises(ValueError):
+            stencil.weights[0] = 1
+
+    def test_streaming_plan_matches_roll(self):
+        shape = (5, 4, 3)
+        rng = np.random.default_rng(5)
+
+        for direction_major in (False, True):
+            with self.subTest(direction_major=direction_major):
+                stencil = get_stencil("D3Q15")
+                populations = rng.random((15,) + shape if direction_major else shape + (15,))
+                streamed_populations = np.zeros_like(populations)
+
+                for destination_index, source_index in stencil.streaming_plan(shape, direction_major):
+                    streamed_populations[destination_index] = populations[source_index]
+
+                cell_populations = np.moveaxis(populations, 0, -1) if direction_major else populations
+                cell_streamed_populations = np.moveaxis(streamed_populations, 0, -1) if direction_major \
+                    else streamed_populations
+                for i, (dx, dy, dz) in enumerate(stencil.directions.astype(int)):
+                    np.testing.assert_array_equal(cell_streamed_populations[..., i],
+                                                  np.roll(cell_populations[..., i], (dx, dy, dz), axis=(0, 1, 2)))
+
+        self.assertEqual(get_streaming_plan(shape, get_stencil("D3Q15").directions, False),
+                         get_stencil("D3Q15").streaming_plan(shape, False))
+
+
+if __name__ == "__main__":
+    unittest.main()
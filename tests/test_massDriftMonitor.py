@@ -0,0 +1,41 @@
+import unittest
+import numpy as np
+from latticeFixtures import build_fluid
+from model.massDriftMonitor import MassDriftMonitor, MassDriftSample
+
+
+class TestMassDriftMonitor(unittest.TestCase):
+    def test_single_precision_fluid_allocates_float32(self):
+        fluid = build_fluid(precision="float32")
+        fluid.simulation_step()
+
+        self.assertEqual(fluid._fluid_state.fluid_state.dtype, np.float32)
+        self.assertEqual(fluid._constant_velocity_boundary_conditions.velocity.dtype, np.float32)
+
+    def test_single_precision_fused_kernel_keeps_float32(self):
+        fluid = build_fluid(precision="float32", kernel="fused", direction_major=True)
+        fluid.simulation_step()
+        fluid.simulation_step()
+
+        self.assertEqual(fluid._fluid_state.fluid_state.dtype, np.float32)
+
+    def test_single_precision_drift_is_small(self):
+        mass_drift_monitor = MassDriftMonitor(build_fluid(precision="float32"), build_fluid(), tolerance=1e-4)
+        samples = mass_drift_monitor.run(20)
+
+        self.assertEqual(len(samples), 21)
+        self.assertTrue(mass_drift_monitor.is_within_tolerance())
+        self.assertGreater(mass_drift_monitor.max_relative_drift(), 0)
+
+    def test_same_precision_has_no_drift(self):
+        mass_drift_monitor = MassDriftMonitor(build_fluid(), build_fluid())
+        mass_drift_monitor.run(5)
+
+        self.assertEqual(mass_drift_monitor.max_relative_drift(), 0)
+
+    def test_relative_drift(self):
+        self.assertAlmostEqual(MassDriftSample(1, 99.0, 100.0).relative_drift, 0.01)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import contextlib
+import io
+import tracemalloc
+import unittest
+from simulation.fluidBuilder import FluidBuilder
+from simulation.memoryPlanner import MemoryPlanner
+from utilities.modelConfigReader import ModelConfigReader
+
+
+def _cube(x: int, y: int, width: int, height: int) -> dict:
+    return {"x": x, "y": y, "z": 0, "width": width, "height": height, "depth": 4}
+
+
+CONFIG = {
+    "fluid_box": {"width": 80, "height": 40, "depth": 4, "viscosity": 0.0002, "time_delta": 0.0125,
+                  "cell_length": 0.01},
+    "boundaries": [
+        {"boundary_type": "no-slip", "cube": _cube(0, 0, 80, 1), "data": {}},
+        {"boundary_type": "no-slip", "cube": _cube(0, 39, 80, 1), "data": {}},
+        {"boundary_type": "no-slip", "cube": _cube(30, 10, 10, 20), "data": {}},
+        {"boundary_type": "constant-velocity", "cube": _cube(0, 1, 1, 38),
+         "data": {"velocity": {"x": 0.1, "y": 0.0, "z": 0.0}, "normal_direction": {"x": 1.0, "y": 0.0, "z": 0.0}}},
+        {"boundary_type": "initial", "cube": _cube(0, 0, 80, 40), "data": {"boltzmann_f19": [10.0] + [0.0] * 18}},
+    ],
+}
+
+
+class TestMemoryPlanner(unittest.TestCase):
+    def setUp(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self._model_config_reader = ModelConfigReader(None, CONFIG)
+            self._planner = MemoryPlanner(self._model_config_reader)
+
+    def _measured_peak(self, precision: str, **fluid_options) -> int:
+        with contextlib.redirect_stdout(io.StringIO()):
+            tracemalloc.start()
+            fluid = FluidBuilder(self._model_config_reader).build_with_precision(precision, **fluid_options)
+            for _ in range(2):
+                fluid.simulation_step()
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        return peak_bytes
+
+    def test_predicts_measured_peak(self):
+        for precision in ("float64", "float32"):
+            for kernel in ("reference", "fused", "sparse"):
+                with self.subTest(precision=precision, kernel=kernel):
+                    plan = self._planner.plan(precision, kernel)
+                    ratio = plan.peak_bytes() / self._measured_peak(precision, kernel=kernel)
+
+                    self.assertGreater(ratio, 0.8)
+                    self.assertLess(ratio, 1.4)
+
+    def test_choose_refuses_or_downgrades(self):
+        requested_plan = self._planner.plan()
+        budget_bytes = requested_plan.peak_bytes() * 0.5
+
+        with self.assertRaises(ValueError):
+            self._planner.choose(budget_bytes)
+
+        plan = self._planner.choose(budget_bytes, downgrade=True)
+        self.assertTrue(plan.fits(budget_bytes))
+        self.assertEqual((plan.precision, plan.kernel), ("float64", "fused"))
+        self.assertEqual(self._planner.choose(requested_plan.peak_bytes()).kernel, "reference")
+
+    def test_slab_plans_are_not_downgrades(self):
+        single_plan = self._planner.plan()
+        slab_plan = self._planner.plan(workers=2)
+
+        self.assertGreater(slab_plan.peak_bytes(), single_plan.peak_bytes())
+        self.assertTrue(all(plan.workers == 1 for plan in self._planner.candidates()))
+
+    def test_precision_downgrade_can_be_disabled(self):
+        fused_plan = self._planner.plan(kernel="fused")
+        plans = self._planner.candidates(downgrade_precision=False)
+
+        self.assertTrue(all(plan.precision == "float64" for plan in plans))
+        with self.assertRaises(ValueError):
+            self._planner.choose(fused_plan.peak_bytes() * 0.6, downgrade=True, downgrade_precision=False)
+        self.assertEqual(self._planner.choose(fused_plan.peak_bytes() * 0.6, downgrade=True).precision, "float32")
+
+
+if __name__ == "__main__":
+    unittest.main()
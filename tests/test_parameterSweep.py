@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+import unittest
+from simulation.parameterSweep import ParameterSweep
+from utilities.argsReader import SweepArgs
+
+
+def _boundary(boundary_type: str, x: int, y: int, width: int, height: int, data: dict = None) -> dict:
+    return {"boundary_type": boundary_type,
+            "cube": {"x": x, "y": y, "z": 0, "width": width, "height": height, "depth": 1},
+            "data": data or {}}
+
+
+BASE_CONFIG = {
+    "fluid_box": {"width": 16, "height": 10, "depth": 1, "viscosity": 0.0002, "time_delta": 0.0125,
+                  "cell_length": 0.01},
+    "boundaries": [
+        _boundary("no-slip", 0, 0, 16, 1),
+        _boundary("no-slip", 0, 9, 16, 1),
+        _boundary("no-slip", 8, 3, 2, 3),
+        _boundary("constant-velocity", 0, 1, 1, 8, {"velocity": {"x": 0.1, "y": 0.0, "z": 0.0},
+                                                    "normal_direction": {"x": 1.0, "y": 0.0, "z": 0.0}}),
+        _boundary("initial", 0, 0, 16, 10, {"boltzmann_f19": [10.0] + [0.0] * 18}),
+    ],
+}
+
+
+class TestParameterSweep(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        base_config_path = os.path.join(self._directory.name, "config.json")
+        self._sweep_path = os.path.join(self._directory.name, "sweep.json")
+        self._output_path = os.path.join(self._directory.name, "sweep")
+
+        with open(base_config_path, "w") as base_config_file:
+            json.dump(BASE_CONFIG, base_config_file)
+        with open(self._sweep_path, "w") as sweep_file:
+            json.dump({"base_config": base_config_path, "number_of_steps": 5,
+                       "grid": {"fluid_box.viscosity": [0.0002, 0.0004],
+                                "boundaries.3.data.velocity.x": [0.05, 0.1, 0.15],
+                                "boundaries.2.cube.y": [3, 4]}}, sweep_file)
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_runs_grid_in_batches(self):
+        parameter_sweep = ParameterSweep(SweepArgs(self._sweep_path, self._output_path, 1, 5, None))
+
+        batches = parameter_sweep.batches()
+        report = parameter_sweep.run()
+
+        self.assertEqual([len(batch) for batch in batches], [5, 5, 2])
+        self.assertEqual(report["cases"], 12)
+        with open(os.path.join(self._output_path, "case_00011.json")) as summary_file:
+            summary = json.load(summary_file)
+        self.assertEqual(summary["parameters"], {"fluid_box.viscosity": 0.0004,
+                                                 "boundaries.3.data.velocity.x": 0.15, "boundaries.2.cube.y": 4})
+        self.assertEqual(summary["steps"], 5)
+        self.assertTrue(os.path.exists(os.path.join(self._output_path, "throughput.json")))
+
+    def test_rejects_unknown_parameter(self):
+        with open(self._sweep_path, "w") as sweep_file:
+            json.dump({"base_config": os.path.join(self._directory.name, "config.json"), "number_of_steps": 5,
+                       "grid": {"fluid_box.density": [1.0]}}, sweep_file)
+
+        with self.assertRaises(ValueError):
+            ParameterSweep(SweepArgs(self._sweep_path, self._output_path, 1, 5, None)).cases()
+
+
+if __name__ == "__main__":
+    unittest.main()
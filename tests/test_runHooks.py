@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+from latticeFixtures import build_fluid
+from simulation.runHooks import RunHooks
+from utilities.argsReader import SimulationArgs
+
+
+class TestRunHooks(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def _simulation_args(self, **options) -> SimulationArgs:
+        return SimulationArgs(z=0, config_path=None, steps_per_frame=1, output_path=None, number_of_steps=3,
+                              draw_on_screen=False, use_density=False, **options)
+
+    def test_runs_requested_hooks(self):
+        checkpoint_path = os.path.join(self._directory.name, "checkpoint.npz")
+        simulation_args = self._simulation_args(checkpoint_path=checkpoint_path, checkpoint_every=2,
+                                                export_path=os.path.join(self._directory.name, "fields"),
+                                                export_every=1,
+                                                metrics_path=os.path.join(self._directory.name, "metrics.jsonl"),
+                                                metrics_every=1)
+        fluid = build_fluid()
+
+        run_hooks = RunHooks.from_args(simulation_args, fluid)
+        for _ in range(3):
+            fluid.simulation_step()
+            run_hooks.on_step(fluid)
+        run_hooks.close(fluid)
+
+        self.assertFalse(run_hooks.termination_requested)
+        self.assertTrue(os.path.exists(checkpoint_path))
+        self.assertEqual(run_hooks.field_exporter.exported_frames_count(), 4)
+        self.assertEqual(run_hooks.telemetry.samples_count, 3)
+
+    def test_no_hooks_without_paths(self):
+        fluid = build_fluid()
+
+        run_hooks = RunHooks.from_args(self._simulation_args(), fluid)
+        fluid.simulation_step()
+        run_hooks.on_step(fluid)
+        run_hooks.close(fluid)
+
+        self.assertIsNone(run_hooks.checkpoint_writer)
+        self.assertIsNone(run_hooks.field_exporter)
+        self.assertIsNone(run_hooks.telemetry)
+        self.assertFalse(run_hooks.termination_requested)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import numpy as np
+from latticeFixtures import build_fluid
+from model.boltzmannFluidUtils import BoltzmannFluidState
+from model.fluidDirectionProvider import FluidDirectionProvider
+from model.phaseTimer import PhaseTimer
+from model.sharedLattice import SharedLatticeBuffer, SharedLatticeHandle
+
+
+def _attached_total_mass(handle: SharedLatticeHandle) -> float:
+    shared_buffer = SharedLatticeBuffer.attach(handle)
+    fluid_state = BoltzmannFluidState.from_shared_buffer(shared_buffer, FluidDirectionProvider.get_all_directions())
+    total_mass = fluid_state.total_mass()
+
+    del fluid_state
+    shared_buffer.close()
+
+    return total_mass
+
+
+class TestSharedLattice(unittest.TestCase):
+    def _assert_shared_state_matches_private(self, **fluid_options):
+        private_fluid = build_fluid(**fluid_options)
+        shared_fluid = build_fluid(**fluid_options)
+        handle = shared_fluid.share_state()
+        shared_buffer = SharedLatticeBuffer.attach(handle)
+
+        try:
+            for _ in range(5):
+                private_fluid.simulation_step()
+                shared_fluid.simulation_step()
+
+            np.testing.assert_array_equal(shared_buffer.current_state(), private_fluid.boltzmann_state().fluid_state)
+            self.assertEqual(shared_buffer.publications_count(), 6)
+        finally:
+            shared_buffer.close()
+            shared_fluid.release_shared_state()
+
+        np.testing.assert_array_equal(shared_fluid.boltzmann_state().fluid_state,
+                                      private_fluid.boltzmann_state().fluid_state)
+
+    def test_reference_kernel(self):
+        self._assert_shared_state_matches_private()
+
+    def test_fused_kernel_steps_in_shared_slots(self):
+        self._assert_shared_state_matches_private(kernel="fused", direction_major=True)
+
+    def test_fused_kernel_does_not_write_published_slot(self):
+        for direction_major in (False, True):
+            with self.subTest(direction_major=direction_major):
+                fluid = build_fluid(kernel="fused", direction_major=direction_major)
+                shared_buffer = SharedLatticeBuffer.attach(fluid.share_state())
+
+                try:
+                    fluid.simulation_step()
+                    published_state = shared_buffer.current_state().copy()
+
+                    fluid.collide_and_stream()
+                    np.testing.assert_array_equal(shared_buffer.current_state(), published_state)
+                    fluid.apply_boundary_conditions()
+                    fluid.boltzmann_state().publish()
+
+                    published_state = shared_buffer.current_state().copy()
+                    fluid._backend.profiled_collide_and_stream(fluid.boltzmann_state(), PhaseTimer())
+                    np.testing.assert_array_equal(shared_buffer.current_state(), published_state)
+                finally:
+                    shared_buffer.close()
+                    fluid.release_shared_state()
+
+    def test_attached_views_are_read_only(self):
+        fluid = build_fluid()
+        shared_buffer = SharedLatticeBuffer.attach(fluid.share_state())
+
+        try:
+            with self.assertRaises(ValueError):
+                shared_buffer.current_state()[0, 0, 0, 0] = 1
+        finally:
+            shared_buffer.close()
+            fluid.release_shared_state()
+
+    def test_attach_from_another_process(self):
+        fluid = build_fluid()
+        handle = fluid.share_state()
+        fluid.simulation_step()
+
+        try:
+            with multiprocessing.get_context("spawn").Pool(1) as pool:
+                total_mass = pool.apply(_attached_total_mass, (handle,))
+            self.assertAlmostEqual(total_mass, fluid.total_mass())
+        finally:
+            fluid.release_shared_state()
+
+    def test_independent_reader_does_not_remove_block(self):
+        fluid = build_fluid()
+        handle = fluid.share_state()
+        fluid.simulation_step()
+        reader_script = ("import sys; from model.sharedLattice import SharedLatticeBuffer, SharedLatticeHandle; "
+                         f"shared_buffer = SharedLatticeBuffer.attach({handle!r}); "
+                         "print(float(shared_buffer.current_state().sum())); shared_buffer.close()")
+
+        try:
+            reader = subprocess.run([sys.executable, "-c", reader_script], capture_output=True, text=True,
+                                    cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), check=True)
+
+            self.assertAlmostEqual(float(reader.stdout), fluid.total_mass())
+            self.assertNotIn("leaked", reader.stderr)
+        finally:
+            fluid.release_shared_state()
+
+    def test_memory_mapped_file(self):
+        fluid = build_fluid()
+
+        with tempfile.TemporaryDirectory() as directory:
+            handle = fluid.share_state(os.path.join(directory, "lattice.bin"))
+            fluid.simulation_step()
+
+            self.assertAlmostEqual(_attached_total_mass(handle), fluid.total_mass())
+            fluid.release_shared_state()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+import numpy as np
+from latticeFixtures import build_fluid
+from simulation.slabDomainRunner import SlabDomainRunner
+
+
+class TestSlabDomainRunner(unittest.TestCase):
+    def _assert_matches_single_fluid(self, workers_count: int, **fluid_options):
+        reference_fluid = build_fluid(**fluid_options)
+
+        with SlabDomainRunner(build_fluid(**fluid_options), workers_count) as runner:
+            runner.run(10)
+            for _ in range(10):
+                reference_fluid.simulation_step()
+
+            np.testing.assert_allclose(runner.boltzmann_state().cell_populations(),
+                                       reference_fluid.boltzmann_state().cell_populations(), rtol=1e-10, atol=1e-12)
+            self.assertAlmostEqual(runner.total_mass(), reference_fluid.total_mass())
+
+    def test_single_slab_wraps_around_periodic_edge(self):
+        self._assert_matches_single_fluid(1)
+
+    def test_boundary_cubes_crossing_slab_edges(self):
+        # Slabs start at x = 0, 5, 10, 15 and 20: the initial jet and the obstacle at x = 22 cross slab edges
+        self._assert_matches_single_fluid(5)
+
+    def test_fused_kernel_direction_major(self):
+        self._assert_matches_single_fluid(3, kernel="fused", direction_major=True)
+
+    def test_sparse_kernel_is_not_supported(self):
+        with self.assertRaises(ValueError):
+            SlabDomainRunner(build_fluid(kernel="sparse"), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+import numpy as np
+from latticeFixtures import build_fluid, LATTICE_DIMENSIONS
+
+
+class TestSparseLatticeKernel(unittest.TestCase):
+    def test_matches_reference_kernel(self):
+        reference_fluid = build_fluid()
+        sparse_fluid = build_fluid(kernel="sparse")
+
+        for _ in range(10):
+            reference_fluid.simulation_step()
+            sparse_fluid.simulation_step()
+
+        np.testing.assert_allclose(sparse_fluid.boltzmann_state().fluid_state,
+                                   reference_fluid._fluid_state.fluid_state, rtol=1e-10, atol=1e-12)
+        self.assertAlmostEqual(sparse_fluid.total_mass(), reference_fluid.total_mass())
+
+    def test_stores_only_active_cells(self):
+        fluid = build_fluid(kernel="sparse", direction_major=True)
+        fluid.simulation_step()
+
+        sparse_kernel = fluid._sparse_kernel
+        solid_cells_count = np.count_nonzero(fluid._no_slip_boundary_conditions.affected_cells)
+        self.assertIsNone(fluid._fluid_state)
+        self.assertEqual(sparse_kernel.cells_count, int(np.prod(LATTICE_DIMENSIONS)) - solid_cells_count)
+        self.assertEqual(sparse_kernel._populations.shape, (19, sparse_kernel.cells_count))
+        self.assertEqual(fluid.boltzmann_state().fluid_state.shape, (19,) + LATTICE_DIMENSIONS)
+
+    def test_boundary_update_after_start_rebuilds_kernel(self):
+        fluid = build_fluid(kernel="sparse")
+        fluid.simulation_step()
+        mass = fluid.total_mass()
+
+        fluid.prepare_boundary_conditions()
+
+        self.assertIsNone(fluid._sparse_kernel)
+        self.assertAlmostEqual(fluid.total_mass(), mass)
+        fluid.simulation_step()
+        self.assertIsNotNone(fluid._sparse_kernel)
+
+
+if __name__ == "__main__":
+    unittest.main()
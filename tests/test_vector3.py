@@ -0,0 +1,108 @@
+import unittest
+import numpy as np
+from utilities.DTO.vector3 import Vector3Int, Vector3Float, Vector3Array
+from utilities.DTO.boundaryConditionDTO import BoundaryCube
+
+
+class TestVector3(unittest.TestCase):
+    def test_arithmetic(self):
+        vector = Vector3Int(1, 2, 3)
+
+        self.assertEqual((vector + Vector3Int(1, 1, 1)).to_tuple(), (2, 3, 4))
+        self.assertEqual((vector - Vector3Int(1, 1, 1)).to_tuple(), (0, 1, 2))
+        self.assertEqual((vector * 2).to_tuple(), (2, 4, 6))
+        self.assertEqual((vector // 2).to_tuple(), (0, 1, 1))
+        self.assertIsInstance(vector + vector, Vector3Int)
+        self.assertEqual((Vector3Float(3.0, 0.0, 4.0) / 5).to_tuple(), (0.6, 0.0, 0.8))
+        self.assertEqual(Vector3Float(3.0, 0.0, 4.0).length(), 5.0)
+
+    def test_reflected_operators(self):
+        vector = Vector3Int(1, 2, 3)
+
+        self.assertEqual(2 * vector, Vector3Int(2, 4, 6))
+        self.assertEqual((1, 1, 1) + vector, Vector3Int(2, 3, 4))
+        self.assertEqual((1, 1, 1) - vector, Vector3Int(0, -1, -2))
+        self.assertEqual(0.5 * Vector3Float(2.0, 4.0, 6.0), Vector3Float(1.0, 2.0, 3.0))
+
+    def test_int_vectors_reject_non_integral_results(self):
+        vector = Vector3Int(1, 2, 3)
+
+        with self.assertRaises(ValueError):
+            vector * 2.5
+        with self.assertRaises(ValueError):
+            2.0 * vector
+        with self.assertRaises(ValueError):
+            vector + (0.5, 0, 0)
+        with self.assertRaises(ValueError):
+            vector // np.float64(2)
+
+    def test_equality_requires_same_type(self):
+        vector = Vector3Int(1, 2, 3)
+
+        self.assertEqual(vector, Vector3Int(1, 2, 3))
+        self.assertEqual(hash(vector), hash(Vector3Int(1, 2, 3)))
+        self.assertNotEqual(vector, Vector3Float(1.0, 2.0, 3.0))
+        self.assertNotEqual(vector, (1, 2, 3))
+        self.assertNotEqual((1, 2, 3), vector)
+        self.assertNotEqual(hash(vector), hash((1, 2, 3)))
+        self.assertEqual(len({vector, Vector3Float(1.0, 2.0, 3.0), (1, 2, 3)}), 3)
+
+    def test_conversion(self):
+        vector = Vector3Int(np.int32(1), 2, 3)
+
+        self.assertIsInstance(vector.get_x(), int)
+        self.assertEqual(vector, Vector3Int.from_numpy(np.array([1, 2, 3], dtype=np.int32)))
+        self.assertEqual(vector.to_numpy().dtype, np.int32)
+        self.assertIsInstance(Vector3Float(1, 0, 0).get_x(), float)
+        with self.assertRaises(ValueError):
+            Vector3Int.from_numpy(np.array([1, 2], dtype=np.int32))
+        with self.assertRaises(ValueError):
+            Vector3Float.from_numpy(np.array([1, 2, 3]))
+        with self.assertRaises(AttributeError):
+            vector.x = 1
+
+
+class TestVector3Array(unittest.TestCase):
+    def test_from_records(self):
+        records = [{"x": 1, "y": 2, "z": 3, "width": 4, "height": 5, "depth": 6}] * 3
+
+        positions = Vector3Array.from_records(records, np.int32)
+        sizes = Vector3Array.from_records(records, np.int32, ("width", "height", "depth"))
+
+        self.assertEqual(len(positions), 3)
+        self.assertEqual(list(positions + sizes), [Vector3Int(5, 7, 9)] * 3)
+        self.assertEqual(positions[1], Vector3Int(1, 2, 3))
+        self.assertEqual(Vector3Array.from_records([], np.float64).to_numpy().shape, (0, 3))
+
+    def test_normalized(self):
+        vectors = Vector3Array(np.array([[3.0, 0.0, 4.0], [0.0, 2.0, 0.0]]))
+
+        np.testing.assert_allclose(vectors.lengths(), [5, 2])
+        self.assertEqual(list(vectors.normalized()), [Vector3Float(0.6, 0.0, 0.8), Vector3Float(0.0, 1.0, 0.0)])
+
+    def test_int_arrays_reject_non_integral_products(self):
+        vectors = Vector3Array(np.array([[1, 2, 3]], dtype=np.int32))
+
+        self.assertEqual(list(2 * vectors), [Vector3Int(2, 4, 6)])
+        with self.assertRaises(ValueError):
+            vectors * 2.5
+
+    def test_invalid_arrays(self):
+        with self.assertRaises(ValueError):
+            Vector3Array(np.zeros((2, 2), dtype=np.int32))
+        with self.assertRaises(ValueError):
+            Vector3Array(np.zeros((2, 3), dtype=np.int64))
+
+    def test_boundary_cubes_from_arrays(self):
+        start_positions = Vector3Array(np.array([[0, 0, 0], [2, 3, 4]], dtype=np.int32))
+        end_positions = Vector3Array(np.array([[1, 1, 1], [2, 5, 6]], dtype=np.int32))
+
+        cubes = BoundaryCube.from_arrays(start_positions, end_positions)
+
+        self.assertEqual(cubes[1], BoundaryCube(Vector3Int(2, 3, 4), Vector3Int(2, 5, 6)))
+        with self.assertRaisesRegex(ValueError, "start_position.y"):
+            BoundaryCube.from_arrays(end_positions, Vector3Array(np.array([[1, 0, 1], [2, 5, 6]], dtype=np.int32)))
+
+
+if __name__ == "__main__":
+    unittest.main()
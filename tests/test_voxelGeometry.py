@@ -0,0 +1,151 @@
+import contextlib
+import copy
+import io
+import os
+import tempfile
+import unittest
+import numpy as np
+from model.voxelGeometry import load_geometry, read_stl, read_voxel_mask, voxelise_mesh, write_voxel_mask
+from simulation.fluidBuilder import FluidBuilder
+from simulation.memoryPlanner import MemoryPlanner
+from utilities.modelConfigReader import ModelConfigReader
+
+
+BOX_FACES = np.array([(0, 1, 3), (0, 3, 2), (4, 6, 7), (4, 7, 5), (0, 4, 5), (0, 5, 1),
+                      (2, 3, 7), (2, 7, 6), (0, 2, 6), (0, 6, 4), (1, 5, 7), (1, 7, 3)])
+
+
+def _box_mesh(lower_corner, upper_corner) -> np.ndarray:
+    corners = np.array([[upper_corner[axis] if vertex >> axis & 1 else lower_corner[axis] for axis in range(3)]
+                        for vertex in range(8)], dtype=np.float64)
+    return corners[BOX_FACES]
+
+
+def _write_binary_stl(path: str, triangles: np.ndarray) -> None:
+    with open(path, "wb") as file:
+        file.write(b"\0" * 80)
+        file.write(np.uint32(len(triangles)).tobytes())
+        records = np.zeros(len(triangles), dtype=[("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)),
+                                                  ("attribute", "<u2")])
+        records["vertices"] = triangles
+        file.write(records.tobytes())
+
+
+def _write_ascii_stl(path: str, triangles: np.ndarray) -> None:
+    with open(path, "w") as file:
+        file.write("solid box\n")
+        for triangle in triangles:
+            file.write("facet normal 0 0 0\nouter loop\n")
+            for vertex in triangle:
+                file.write(f"vertex {vertex[0]} {vertex[1]} {vertex[2]}\n")
+            file.write("endloop\nendfacet\n")
+        file.write("endsolid box\n")
+
+
+CONFIG = {
+    "fluid_box": {"width": 24, "height": 16, "depth": 3, "viscosity": 0.0002, "time_delta": 0.0125,
+                  "cell_length": 0.01},
+    "boundaries": [
+        {"boundary_type": "no-slip", "cube": {"x": 0, "y": 0, "z": 0, "width": 24, "height": 1, "depth": 3},
+         "data": {}},
+        {"boundary_type": "constant-velocity",
+         "cube": {"x": 0, "y": 1, "z": 0, "width": 1, "height": 15, "depth": 3},
+         "data": {"velocity": {"x": 0.1, "y": 0.0, "z": 0.0}, "normal_direction": {"x": 1.0, "y": 0.0, "z": 0.0}}},
+        {"boundary_type": "initial", "cube": {"x": 0, "y": 0, "z": 0, "width": 24, "height": 16, "depth": 3},
+         "data": {"boltzmann_f19": [10.0] + [0.0] * 18}},
+    ],
+}
+
+
+class TestVoxelGeometry(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self._directory.name, name)
+
+    def test_voxel_files_round_trip(self):
+        shape = (9, 7, 5)
+        mask = np.random.default_rng(2).random(shape) < 0.3
+
+        for name in ("mask.bits", "mask.rle"):
+            for first_cell in (False, True):
+                with self.subTest(name=name, first_cell=first_cell):
+                    mask[0, 0, 0] = first_cell
+                    write_voxel_mask(self._path(name), mask)
+
+                    np.testing.assert_array_equal(read_voxel_mask(self._path(name), shape), mask)
+                    with self.assertRaises(ValueError):
+                        read_voxel_mask(self._path(name), (9, 7, 6))
+
+        with self.assertRaises(ValueError):
+            write_voxel_mask(self._path("mask.npy"), mask)
+
+    def test_voxelise_box(self):
+        expected_mask = np.zeros((10, 12, 8), dtype=bool)
+        expected_mask[2:7, 3:9, 1:5] = True
+
+        np.testing.assert_array_equal(voxelise_mesh(_box_mesh((2, 3, 1), (7, 9, 5)), (10, 12, 8)), expected_mask)
+
+        expected_mask[:] = False
+        expected_mask[:7, :10, :] = True
+        np.testing.assert_array_equal(voxelise_mesh(_box_mesh((-2, -3, -1), (7.3, 9.6, 20)), (10, 12, 8)),
+                                      expected_mask)
+
+    def test_voxelise_sphere(self):
+        shape, center, radius = (40, 40, 40), np.array([20.0, 19.0, 21.0]), 12.0
+        polar_angles, azimuths = np.meshgrid(np.linspace(0, np.pi, 121), np.linspace(0, 2 * np.pi, 241), indexing="ij")
+        vertices = np.stack([np.sin(polar_angles) * np.cos(azimuths), np.sin(polar_angles) * np.sin(azimuths),
+                             np.cos(polar_angles)], axis=-1) * radius + center
+        a, b, c, d = vertices[:-1, :-1], vertices[1:, :-1], vertices[1:, 1:], vertices[:-1, 1:]
+        triangles = np.concatenate([np.stack([a, b, c], axis=-2), np.stack([a, c, d], axis=-2)]).reshape(-1, 3, 3)
+
+        cell_centers = np.moveaxis(np.indices(shape), 0, -1) + 0.5
+        expected_mask = np.sum((cell_centers - center) ** 2, axis=-1) < radius ** 2
+
+        self.assertLessEqual(np.count_nonzero(voxelise_mesh(triangles, shape) != expected_mask), 10)
+
+    def test_read_stl(self):
+        triangles = _box_mesh((1, 2, 0), (4, 5, 2))
+        _write_binary_stl(self._path("binary.stl"), triangles)
+        _write_ascii_stl(self._path("ascii.stl"), triangles)
+
+        np.testing.assert_array_equal(read_stl(self._path("binary.stl")), triangles)
+        np.testing.assert_array_equal(read_stl(self._path("ascii.stl")), triangles)
+
+        expected_mask = np.zeros((10, 10, 6), dtype=bool)
+        expected_mask[3:9, 5:11, 1:5] = True
+        np.testing.assert_array_equal(load_geometry(self._path("ascii.stl"), (10, 10, 6), 2.0, (1.0, 1.0, 1.0)),
+                                      expected_mask)
+
+    def test_builder_places_cubes_on_geometry(self):
+        _write_binary_stl(self._path("obstacle.stl"), _box_mesh((0.8, 0.5, 0.0), (1.4, 1.1, 0.3)))
+        geometry_config = dict(copy.deepcopy(CONFIG), geometry={"path": self._path("obstacle.stl"), "scale": 10.0,
+                                                                "offset": {"x": 0.0, "y": 0.0, "z": 0.0}})
+        cube_config = copy.deepcopy(CONFIG)
+        cube_config["boundaries"].insert(0, {"boundary_type": "no-slip", "data": {},
+                                             "cube": {"x": 8, "y": 5, "z": 0, "width": 6, "height": 6, "depth": 3}})
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            geometry_fluid = FluidBuilder(ModelConfigReader(None, geometry_config)).build(kernel="fused")
+            cube_fluid = FluidBuilder(ModelConfigReader(None, cube_config)).build(kernel="fused")
+            geometry_planner = MemoryPlanner(ModelConfigReader(None, geometry_config))
+            cube_planner = MemoryPlanner(ModelConfigReader(None, cube_config))
+
+        for _ in range(5):
+            geometry_fluid.simulation_step()
+            cube_fluid.simulation_step()
+
+        np.testing.assert_array_equal(geometry_fluid._no_slip_boundary_conditions.affected_cells,
+                                      cube_fluid._no_slip_boundary_conditions.affected_cells)
+        np.testing.assert_allclose(geometry_fluid.boltzmann_state().fluid_state,
+                                   cube_fluid.boltzmann_state().fluid_state, rtol=1e-12, atol=1e-14)
+        self.assertEqual(geometry_planner.plan("float64", "fused").peak_bytes(),
+                         cube_planner.plan("float64", "fused").peak_bytes())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,22 +1,40 @@
 from dataclasses import dataclass
+import numpy as np
 from utilities.DTO.D3Q19 import D3Q19ParticleFunction
-from utilities.DTO.vector3 import Vector3Int, Vector3Float
+from utilities.DTO.vector3 import Vector3Int, Vector3Float, Vector3Array
 
 
-@dataclass
+@dataclass(slots=True)
 class BoundaryCube:
     start_position: Vector3Int
     end_position: Vector3Int
 
+    AXES = ("x", "y", "z")
+
     def __post_init__(self):
-        if self.start_position.get_x() > self.end_position.get_x():
-            raise ValueError("start_position.x must be smaller than end_position.x.")
+        for axis, start, end in zip(BoundaryCube.AXES, self.start_position.to_tuple(), self.end_position.to_tuple()):
+            if start > end:
+                raise ValueError(f"start_position.{axis} must be smaller than end_position.{axis}.")
+
+    @staticmethod
+    def from_arrays(start_positions: Vector3Array, end_positions: Vector3Array) -> list['BoundaryCube']:
+        '''
+        Builds one cube from every row of the start and end positions. The corners are validated for all cubes at
+        once, with the same errors as a single cube, so the cubes are built without running __post_init__ again.
+        '''
+        inverted_axes = np.any(start_positions.vectors > end_positions.vectors, axis=0)
+        for axis, inverted in zip(BoundaryCube.AXES, inverted_axes):
+            if inverted:
+                raise ValueError(f"start_position.{axis} must be smaller than end_position.{axis}.")
 
-        if self.start_position.get_y() > self.end_position.get_y():
-            raise ValueError("start_position.y must be smaller than end_position.y.")
+        cubes = []
+        for start_position, end_position in zip(start_positions, end_positions):
+            cube = object.__new__(BoundaryCube)
+            cube.start_position = start_position
+            cube.end_position = end_position
+            cubes.append(cube)
 
-        if self.start_position.get_z() > self.end_position.get_z():
-            raise ValueError("start_position.z must be smaller than end_position.z.")
+        return cubes
 
     def __str__(self):
         return f"BoundaryCube({self.start_position}, {self.end_position})"
@@ -46,3 +64,14 @@ class BoundaryConditionConstantVelocityDelta(BoundaryConditionDelta):
 @dataclass
 class BoundaryConditionInitialDelta(BoundaryConditionDelta):
     boltzmann_f19: D3Q19ParticleFunction
+
+
+@dataclass
+class BoundaryConditionNoSlipGeometry:
+    '''
+    A no-slip geometry loaded from a voxel occupancy file or an STL mesh, see voxelGeometry. The mesh is scaled by the
+    number of cells per mesh unit and shifted by the offset in cells.
+    '''
+    path: str
+    scale: float = 1.0
+    offset: Vector3Float = Vector3Float(0.0, 0.0, 0.0)
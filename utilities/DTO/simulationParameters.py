@@ -1,3 +1,4 @@
+import numpy as np
 from dataclasses import dataclass
 
 
@@ -8,3 +9,40 @@ class SimulationParameters:
     cell_length: float
     speed_of_sound: float
     relaxation_time: float
+    precision: str = "float64"
+    stencil: str = None
+
+    PRECISIONS = ("float32", "float64")
+    # The stencil registry of model/latticeStencil.py is built from these names, in this order.
+    STENCILS = ("D2Q9", "D3Q15", "D3Q19", "D3Q27")
+
+    def __post_init__(self):
+        if self.precision not in SimulationParameters.PRECISIONS:
+            raise ValueError(f"precision must be one of {', '.join(SimulationParameters.PRECISIONS)}, "
+                             f"but is {self.precision}.")
+        if self.stencil is not None and self.stencil not in SimulationParameters.STENCILS:
+            raise ValueError(f"stencil must be one of {', '.join(SimulationParameters.STENCILS)}, "
+                             f"but is {self.stencil}.")
+
+    @staticmethod
+    def from_physical(viscosity: float, time_delta: float, cell_length: float, precision: str = "float64",
+                      stencil: str = None) -> 'SimulationParameters':
+        '''
+        Derives the relaxation time and the lattice speed of sound from the viscosity, time step and cell length.
+        '''
+        relaxation_time = (time_delta / cell_length ** 2 * 6 * viscosity + 1) / 2
+        speed_of_sound = cell_length / time_delta / (3 ** 0.5)
+
+        return SimulationParameters(viscosity, time_delta, cell_length, speed_of_sound, relaxation_time, precision,
+                                    stencil)
+
+    @classmethod
+    def example_config(cls, precision: str = "float64") -> 'SimulationParameters':
+        '''
+        The parameters of the example configurations in input/: a viscosity of 0.0002, 12.5 ms steps and 1 cm cells.
+        '''
+        return cls.from_physical(viscosity=0.0002, time_delta=0.0125, cell_length=0.01, precision=precision)
+
+    @property
+    def dtype(self) -> np.dtype:
+        return np.dtype(self.precision)
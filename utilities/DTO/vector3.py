@@ -1,119 +1,214 @@
+from itertools import chain
+from operator import itemgetter
 import numpy as np
 
 
-class Vector3Int:
-    _vector: np.ndarray[np.int32]
+class _Vector3(tuple):
+    '''
+    A 3D vector stored as a tuple of Python numbers, without an instance dict. Vectors are immutable, compared by
+    value and only validated when they are converted from a NumPy array, so building many of them, e.g. for the
+    boundary cubes of a large geometry, stays cheap. Use Vector3Array for bulk operations.
 
-    @staticmethod
-    def _check_vector(vector):
+    The arithmetic operators are element-wise, unlike the ones of tuple, and a vector is only equal to a vector of the
+    same type, not to a plain tuple or a vector of the other type.
+    '''
+    __slots__ = ()
+
+    DTYPE: np.dtype
+    _convert: type
+
+    @classmethod
+    def _check_vector(cls, vector: np.ndarray):
         if vector.shape != (3,):
             raise ValueError(f"vector must be a 3D vector, but is {vector.shape}")
 
-        if vector.dtype != np.int32:
-            raise ValueError(f"vector must be of type int32, but is {vector.dtype}")
+        if vector.dtype != cls.DTYPE:
+            raise ValueError(f"vector must be of type {np.dtype(cls.DTYPE)}, but is {vector.dtype}")
 
-    def __init__(self, x: int, y: int, z: int) -> None:
-        self._vector = np.array([np.int32(x), np.int32(y), np.int32(z)], dtype=np.int32)
-        Vector3Int._check_vector(self._vector)
+    def __new__(cls, x, y, z):
+        convert = cls._convert
+        return tuple.__new__(cls, (convert(x), convert(y), convert(z)))
 
-    @staticmethod
-    def from_numpy(vector: np.ndarray[np.int32]):
-        Vector3Int._check_vector(vector)
-        x, y, z = vector
+    @classmethod
+    def _from_values(cls, values: tuple | list):
+        '''
+        Builds a vector from 3 numbers that already have the type of the vector, without converting them.
+        '''
+        return tuple.__new__(cls, values)
+
+    @classmethod
+    def _from_result(cls, x, y, z):
+        '''
+        Builds a vector from the components computed by an operator.
+        '''
+        return cls(x, y, z)
+
+    @classmethod
+    def from_numpy(cls, vector: np.ndarray):
+        cls._check_vector(vector)
+        return cls._from_values(vector.tolist())
 
-        return Vector3Int(x, y, z)
-        
     def __add__(self, other):
-        return Vector3Int.from_numpy(self._vector + other._vector)
-    
+        x, y, z = self
+        other_x, other_y, other_z = other
+        return self._from_result(x + other_x, y + other_y, z + other_z)
+
+    __radd__ = __add__
+
     def __sub__(self, other):
-        return Vector3Int.from_numpy(self._vector - other._vector)
-    
+        x, y, z = self
+        other_x, other_y, other_z = other
+        return self._from_result(x - other_x, y - other_y, z - other_z)
+
+    def __rsub__(self, other):
+        x, y, z = self
+        other_x, other_y, other_z = other
+        return self._from_result(other_x - x, other_y - y, other_z - z)
+
     def __mul__(self, other):
-        return Vector3Int.from_numpy(self._vector * other)
-    
+        x, y, z = self
+        return self._from_result(x * other, y * other, z * other)
+
+    __rmul__ = __mul__
+
     def __floordiv__(self, other):
-        return Vector3Int.from_numpy(self._vector // other)
-    
-    def __str__(self):
-        return f"Vector3({self._vector})"
+        x, y, z = self
+        return self._from_result(x // other, y // other, z // other)
 
-    def get_x(self) -> int:
-        return int(self._vector[0])
+    def __eq__(self, other):
+        return type(other) is type(self) and tuple.__eq__(self, other)
 
-    def get_y(self) -> int:
-        return int(self._vector[1])
+    def __ne__(self, other):
+        return not self.__eq__(other)
 
-    def get_z(self) -> int:
-        return int(self._vector[2])
+    def __hash__(self):
+        return hash((type(self), tuple.__hash__(self)))
 
-    def to_tuple(self) -> tuple[int, int, int]:
-        x = int(self._vector[0])
-        y = int(self._vector[1])
-        z = int(self._vector[2])
-        return x, y, z
+    def __str__(self):
+        return f"Vector3({self.to_numpy()})"
 
-    def to_numpy(self) -> np.ndarray[np.int32]:
-        return self._vector
+    def __repr__(self):
+        return f"{type(self).__name__}{tuple(self)}"
 
 
-class Vector3Float:
-    _vector: np.ndarray[np.float64]
+class Vector3Int(_Vector3):
+    __slots__ = ()
 
-    @staticmethod
-    def _check_vector(vector):
-        if vector.shape != (3,):
-            raise ValueError(f"vector must be a 3D vector, but is {vector.shape}")
+    DTYPE = np.int32
+    _convert = int
 
-        if vector.dtype != np.float64:
-            raise ValueError(f"vector must be of type float64, but is {vector.dtype}")
+    @classmethod
+    def _from_result(cls, x, y, z):
+        for value in (x, y, z):
+            if not isinstance(value, (int, np.integer)):
+                raise ValueError(f"Vector3Int components must be integers, but are {(x, y, z)}")
 
-    def __init__(self, x: int, y: int, z: int) -> None:
-        self._vector = np.array([x, y, z])
-        Vector3Float._check_vector(self._vector)
+        return cls(x, y, z)
 
-    @staticmethod
-    def from_numpy(vector: np.ndarray[np.float64]):
-        Vector3Float._check_vector(vector)
-        x, y, z = vector
+    def get_x(self) -> int:
+        return self[0]
 
-        return Vector3Float(x, y, z)
+    def get_y(self) -> int:
+        return self[1]
 
-    def __add__(self, other):
-        return Vector3Float.from_numpy(self._vector + other._vector)
+    def get_z(self) -> int:
+        return self[2]
 
-    def __sub__(self, other):
-        return Vector3Float.from_numpy(self._vector - other._vector)
+    def to_tuple(self) -> tuple[int, int, int]:
+        return tuple(self)
 
-    def __mul__(self, other):
-        return Vector3Float.from_numpy(self._vector * other)
+    def to_numpy(self) -> np.ndarray[np.int32]:
+        return np.array(self, dtype=np.int32)
 
-    def __truediv__(self, other):
-        return Vector3Float.from_numpy(self._vector / other)
 
-    def __floordiv__(self, other):
-        return Vector3Float.from_numpy(self._vector // other)
+class Vector3Float(_Vector3):
+    __slots__ = ()
 
-    def __str__(self):
-        return f"Vector3({self._vector})"
+    DTYPE = np.float64
+    _convert = float
+
+    def __truediv__(self, other):
+        x, y, z = self
+        return Vector3Float(x / other, y / other, z / other)
 
     def get_x(self) -> float:
-        return float(self._vector[0])
+        return self[0]
 
     def get_y(self) -> float:
-        return float(self._vector[1])
+        return self[1]
 
     def get_z(self) -> float:
-        return float(self._vector[2])
+        return self[2]
 
     def to_tuple(self) -> tuple[float, float, float]:
-        x = float(self._vector[0])
-        y = float(self._vector[1])
-        z = float(self._vector[2])
-        return x, y, z
+        return tuple(self)
 
     def to_numpy(self) -> np.ndarray[np.float64]:
-        return self._vector
+        return np.array(self, dtype=np.float64)
 
     def length(self) -> float:
-        return np.linalg.norm(self._vector)
+        x, y, z = self
+        return (x * x + y * y + z * z) ** 0.5
+
+
+class Vector3Array:
+    '''
+    A batch of 3D vectors as one (n, 3) array of int32 or float64, for operations on many vectors at once. Indexing
+    returns a Vector3Int or a Vector3Float.
+    '''
+    __slots__ = ("vectors",)
+
+    ELEMENT_TYPES = {np.dtype(np.int32): Vector3Int, np.dtype(np.float64): Vector3Float}
+
+    def __init__(self, vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors)
+        if vectors.ndim != 2 or vectors.shape[1] != 3:
+            raise ValueError(f"vectors must be of shape (n, 3), but are {vectors.shape}")
+
+        if vectors.dtype not in Vector3Array.ELEMENT_TYPES:
+            raise ValueError(f"vectors must be of type int32 or float64, but are {vectors.dtype}")
+
+        self.vectors = vectors
+
+    @staticmethod
+    def from_records(records: list[dict], dtype: np.dtype, keys: tuple[str, str, str] = ("x", "y", "z")) \
+            -> 'Vector3Array':
+        '''
+        Builds the array from one mapping per vector, e.g. the cubes of a configuration file.
+        '''
+        components = chain.from_iterable(map(itemgetter(*keys), records))
+
+        return Vector3Array(np.fromiter(components, dtype=dtype, count=3 * len(records)).reshape(-1, 3))
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def __getitem__(self, index: int) -> Vector3Int | Vector3Float:
+        return Vector3Array.ELEMENT_TYPES[self.vectors.dtype]._from_values(self.vectors[index].tolist())
+
+    def __iter__(self):
+        return map(Vector3Array.ELEMENT_TYPES[self.vectors.dtype]._from_values, self.vectors.tolist())
+
+    def __add__(self, other: 'Vector3Array') -> 'Vector3Array':
+        return Vector3Array(self.vectors + other.vectors)
+
+    def __sub__(self, other: 'Vector3Array') -> 'Vector3Array':
+        return Vector3Array(self.vectors - other.vectors)
+
+    def __mul__(self, other) -> 'Vector3Array':
+        vectors = self.vectors * other
+        if vectors.dtype.kind != self.vectors.dtype.kind:
+            raise ValueError(f"vectors of type {self.vectors.dtype} cannot be multiplied by {other}")
+
+        return Vector3Array(vectors.astype(self.vectors.dtype, copy=False))
+
+    __rmul__ = __mul__
+
+    def lengths(self) -> np.ndarray[np.float64]:
+        return np.linalg.norm(self.vectors, axis=-1)
+
+    def normalized(self) -> 'Vector3Array':
+        return Vector3Array(self.vectors / self.lengths()[:, np.newaxis])
+
+    def to_numpy(self) -> np.ndarray:
+        return self.vectors
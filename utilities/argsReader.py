@@ -11,6 +11,68 @@ class SimulationArgs:
     number_of_steps: int
     draw_on_screen: bool
     use_density: bool
+    kernel: str = "reference"
+    direction_major: bool = False
+    drift_check_steps: int = 0
+    drift_tolerance: float = 1e-4
+    backend: str = "numpy"
+    workers: int = 1
+    save_video: bool = True
+    frame_queue_size: int = 4
+    drop_frames: bool = False
+    checkpoint_path: str = None
+    checkpoint_every: int = 0
+    checkpoint_float32: bool = False
+    restart_path: str = None
+    export_path: str = None
+    export_every: int = 10
+    export_decimation: int = 1
+    export_z_range: tuple[int, int] = None
+    export_populations: bool = False
+    metrics_path: str = None
+    metrics_every: int = 100
+    memory_budget: float = None
+    memory_downgrade: bool = False
+
+
+@dataclass
+class SweepArgs:
+    sweep_path: str
+    output_path: str
+    workers: int
+    ensemble_size: int
+    number_of_steps: int
+
+
+@dataclass
+class BenchmarkArgs:
+    lattice_shapes: list[tuple[int, int, int]]
+    obstacle_fractions: list[float]
+    precision: str
+    repeats: int
+    output_path: str
+    baseline_path: str
+    tolerance: float
+
+
+@dataclass
+class PlanArgs:
+    config_path: str
+    precision: str
+    kernel: str
+    direction_major: bool
+    backend: str
+    workers: int
+    memory_budget: float
+
+
+def _lattice_shape(value: str) -> tuple[int, int, int]:
+    try:
+        width, height, depth = (int(length) for length in value.split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid lattice shape: {value}. Expected WIDTHxHEIGHTxDEPTH, e.g. 64x32x4.")
+
+    return width, height, depth
 
 
 class ArgsReader:
@@ -24,11 +86,87 @@ class ArgsReader:
         parser.add_argument('--number-of-steps', '-n', type=int, default='10000')
         parser.add_argument('--no-screen', '-ns', action='store_true')
         parser.add_argument('--use-density', '-d', action='store_true')
+        parser.add_argument('--kernel', '-k', type=str, default='reference', choices=['reference', 'fused', 'sparse'])
+        parser.add_argument('--direction-major', '-dm', action='store_true')
+        parser.add_argument('--drift-check-steps', '-dc', type=int, default='0')
+        parser.add_argument('--drift-tolerance', '-dt', type=float, default='1e-4')
+        parser.add_argument('--backend', '-b', type=str, default='numpy', choices=['numpy', 'numba'])
+        parser.add_argument('--workers', '-w', type=int, default='1')
+        parser.add_argument('--no-video', '-nv', action='store_true')
+        parser.add_argument('--frame-queue-size', '-fq', type=int, default='4')
+        parser.add_argument('--drop-frames', '-df', action='store_true')
+        parser.add_argument('--checkpoint', '-cp', type=str, default=None)
+        parser.add_argument('--checkpoint-every', '-ce', type=int, default='0')
+        parser.add_argument('--checkpoint-float32', '-cf', action='store_true')
+        parser.add_argument('--restart', '-r', type=str, default=None)
+        parser.add_argument('--export', '-e', type=str, default=None)
+        parser.add_argument('--export-every', '-ee', type=int, default='10')
+        parser.add_argument('--export-decimation', '-ed', type=int, default='1')
+        parser.add_argument('--export-z', '-ez', type=int, nargs=2, default=None)
+        parser.add_argument('--export-populations', '-ep', action='store_true')
+        parser.add_argument('--metrics', '-m', type=str, default=None)
+        parser.add_argument('--metrics-every', '-me', type=int, default='100')
+        parser.add_argument('--memory-budget', '-mb', type=float, default=None)
+        parser.add_argument('--memory-downgrade', '-md', action='store_true')
 
         args = parser.parse_args()
 
-        return SimulationArgs(args.zaxis, args.config, args.steps_per_frame,
-                              'output/' + args.output + '.mp4',
-                              args.number_of_steps, not args.no_screen,
-                              args.use_density)
+        return SimulationArgs(z=args.zaxis, config_path=args.config, steps_per_frame=args.steps_per_frame,
+                              output_path='output/' + args.output + '.mp4', number_of_steps=args.number_of_steps,
+                              draw_on_screen=not args.no_screen, use_density=args.use_density, kernel=args.kernel,
+                              direction_major=args.direction_major, drift_check_steps=args.drift_check_steps,
+                              drift_tolerance=args.drift_tolerance, backend=args.backend, workers=args.workers,
+                              save_video=not args.no_video, frame_queue_size=args.frame_queue_size,
+                              drop_frames=args.drop_frames, checkpoint_path=args.checkpoint,
+                              checkpoint_every=args.checkpoint_every, checkpoint_float32=args.checkpoint_float32,
+                              restart_path=args.restart, export_path=args.export, export_every=args.export_every,
+                              export_decimation=args.export_decimation,
+                              export_z_range=tuple(args.export_z) if args.export_z is not None else None,
+                              export_populations=args.export_populations, metrics_path=args.metrics,
+                              metrics_every=args.metrics_every, memory_budget=args.memory_budget,
+                              memory_downgrade=args.memory_downgrade)
+
+    @staticmethod
+    def read_sweep_args(argv: list[str]) -> SweepArgs:
+        parser = argparse.ArgumentParser(prog="main.py sweep")
+        parser.add_argument('sweep', type=str)
+        parser.add_argument('--output', '-o', type=str, default='sweep')
+        parser.add_argument('--workers', '-w', type=int, default='1')
+        parser.add_argument('--ensemble-size', '-es', type=int, default='8')
+        parser.add_argument('--number-of-steps', '-n', type=int, default=None)
+
+        args = parser.parse_args(argv)
+
+        return SweepArgs(args.sweep, 'output/' + args.output, args.workers, args.ensemble_size, args.number_of_steps)
+
+    @staticmethod
+    def read_benchmark_args(argv: list[str]) -> BenchmarkArgs:
+        parser = argparse.ArgumentParser(prog="main.py benchmark")
+        parser.add_argument('--lattice', '-l', type=_lattice_shape, nargs='+', default=[(64, 32, 4), (128, 64, 8)])
+        parser.add_argument('--obstacle-fractions', '-of', type=float, nargs='+', default=[0.0, 0.1, 0.3])
+        parser.add_argument('--precision', '-p', type=str, default='float64', choices=['float32', 'float64'])
+        parser.add_argument('--repeats', '-r', type=int, default='5')
+        parser.add_argument('--output', '-o', type=str, default='benchmark')
+        parser.add_argument('--baseline', '-bl', type=str, default=None)
+        parser.add_argument('--tolerance', '-t', type=float, default='0.2')
+
+        args = parser.parse_args(argv)
+
+        return BenchmarkArgs(args.lattice, args.obstacle_fractions, args.precision, args.repeats,
+                             'output/' + args.output + '.json', args.baseline, args.tolerance)
+
+    @staticmethod
+    def read_plan_args(argv: list[str]) -> PlanArgs:
+        parser = argparse.ArgumentParser(prog="main.py plan")
+        parser.add_argument('--config', '-c', type=str, default='input/config.json')
+        parser.add_argument('--precision', '-p', type=str, default=None, choices=['float32', 'float64'])
+        parser.add_argument('--kernel', '-k', type=str, default='reference', choices=['reference', 'fused', 'sparse'])
+        parser.add_argument('--direction-major', '-dm', action='store_true')
+        parser.add_argument('--backend', '-b', type=str, default='numpy', choices=['numpy', 'numba'])
+        parser.add_argument('--workers', '-w', type=int, default='1')
+        parser.add_argument('--memory-budget', '-mb', type=float, default=None)
+
+        args = parser.parse_args(argv)
 
+        return PlanArgs(args.config, args.precision, args.kernel, args.direction_major, args.backend, args.workers,
+                        args.memory_budget)
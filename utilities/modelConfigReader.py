@@ -2,19 +2,27 @@ import json
 import numpy as np
 from typing import Generator
 from utilities.DTO.D3Q19 import D3Q19ParticleFunction
-from utilities.DTO.vector3 import Vector3Int, Vector3Float
+from utilities.DTO.vector3 import Vector3Int, Vector3Float, Vector3Array
 from utilities.DTO.boundaryConditionDTO import (
     BoundaryConditionConstantVelocityDelta,
     BoundaryConditionInitialDelta,
     BoundaryCube,
     BoundaryConditionDelta,
     BoundaryConditionNoSlipDelta,
+    BoundaryConditionNoSlipGeometry,
 )
 from utilities.DTO.simulationParameters import SimulationParameters
 
 
 class ModelConfigReader:
-    def __init__(self, file_path: str) -> None:
+    def __init__(self, file_path: str, json_content: dict = None) -> None:
+        '''
+        Reads the configuration file, or uses the given, already parsed configuration instead.
+        '''
+        if json_content is not None:
+            self._json_content = json_content
+            return
+
         try:
             with open(file_path, "r") as file:
                 self._json_content = json.load(file)
@@ -29,32 +37,32 @@ class ModelConfigReader:
             print(f"An error occurred: {str(e)}")
 
     def boundary_conditions(self) -> Generator[BoundaryConditionDelta, None, None]:
-        for boundary_condition in self._json_content["boundaries"]:
-            cube_json = boundary_condition["cube"]
-            data_json = boundary_condition["data"]
+        '''
+        The cubes of all boundaries, and the velocities and normals of the constant velocity boundaries, are read into
+        Vector3Arrays and converted in bulk, so that geometries with many boundaries load in linear time.
+        '''
+        boundaries_json = self._json_content["boundaries"]
+        cubes_json = [boundary_condition["cube"] for boundary_condition in boundaries_json]
+        cube_start_positions = Vector3Array.from_records(cubes_json, np.int32)
+        cube_end_positions = cube_start_positions + Vector3Array.from_records(cubes_json, np.int32,
+                                                                             ("width", "height", "depth"))
+        boundary_cubes = BoundaryCube.from_arrays(cube_start_positions, cube_end_positions)
 
-            cube_start_position = Vector3Int(cube_json["x"], cube_json["y"], cube_json["z"])
-            cube_end_position = cube_start_position + Vector3Int(cube_json["width"], cube_json["height"], cube_json["depth"])
+        constant_velocity_data_json = [boundary_condition["data"] for boundary_condition in boundaries_json
+                                       if boundary_condition["boundary_type"] == "constant-velocity"]
+        velocities_json = [data_json["velocity"] for data_json in constant_velocity_data_json]
+        normals_json = [data_json["normal_direction"] for data_json in constant_velocity_data_json]
+        velocities = iter(Vector3Array.from_records(velocities_json, np.float64))
+        normals = iter(Vector3Array.from_records(normals_json, np.float64).normalized())
 
-            boundary_cube = BoundaryCube(cube_start_position, cube_end_position)
+        for boundary_condition, boundary_cube in zip(boundaries_json, boundary_cubes):
+            data_json = boundary_condition["data"]
 
             match boundary_condition["boundary_type"]:
                 case "no-slip":
                     yield BoundaryConditionNoSlipDelta(boundary_cube)
                 case "constant-velocity":
-                    velocity_json = data_json["velocity"]
-                    normal_direction_json = data_json["normal_direction"]
-
-                    velocity_json = Vector3Float(velocity_json["x"], velocity_json["y"], velocity_json["z"])
-                    normal_direction = Vector3Float(normal_direction_json["x"],
-                                                    normal_direction_json["y"],
-                                                    normal_direction_json["z"])
-
-                    yield BoundaryConditionConstantVelocityDelta(
-                        boundary_cube,
-                        velocity_json,
-                        normal_direction / normal_direction.length()
-                    )
+                    yield BoundaryConditionConstantVelocityDelta(boundary_cube, next(velocities), next(normals))
                 case "initial":
                     yield BoundaryConditionInitialDelta(
                         boundary_cube, D3Q19ParticleFunction(data_json["boltzmann_f19"])
@@ -62,6 +70,18 @@ class ModelConfigReader:
                 case _:
                     raise ValueError("Invalid boundary condition type.")
 
+    def no_slip_geometry(self) -> BoundaryConditionNoSlipGeometry | None:
+        '''
+        The optional "geometry" section, a file with the no-slip cells that the boundary cubes are placed on.
+        '''
+        geometry_json = self._json_content.get("geometry")
+        if geometry_json is None:
+            return None
+
+        offset_json = geometry_json.get("offset", {"x": 0.0, "y": 0.0, "z": 0.0})
+        return BoundaryConditionNoSlipGeometry(str(geometry_json["path"]), float(geometry_json.get("scale", 1.0)),
+                                               Vector3Float(offset_json["x"], offset_json["y"], offset_json["z"]))
+
     def lattice_dimensions(self) -> Vector3Int:
         box_config_json = self._json_content["fluid_box"]
         width = np.int32(box_config_json["width"])
@@ -75,11 +95,11 @@ class ModelConfigReader:
         viscosity = float(box_config_json["viscosity"])
         time_delta = float(box_config_json["time_delta"])
         cell_length = float(box_config_json["cell_length"])
+        precision = str(box_config_json.get("precision", "float64"))
+        stencil = box_config_json.get("stencil")
 
-        relaxation_time = (time_delta / cell_length ** 2 * 6 * viscosity + 1) / 2
-        print(f"Relaxation time: {relaxation_time}")
-
-        speed_of_sound = cell_length / time_delta / (3 ** 0.5)
-        print(f"Speed of sound: {speed_of_sound}")
+        simulation_params = SimulationParameters.from_physical(viscosity, time_delta, cell_length, precision, stencil)
+        print(f"Relaxation time: {simulation_params.relaxation_time}")
+        print(f"Speed of sound: {simulation_params.speed_of_sound}")
 
-        return SimulationParameters(viscosity, time_delta, cell_length, speed_of_sound, relaxation_time)
+        return simulation_params